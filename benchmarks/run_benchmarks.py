@@ -0,0 +1,319 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Apr 14 10:41:52 2025
+
+@author: Ukjae
+
+initial / hydro 스크립트 벤치마크
+합성 입력 (synthetic_inputs.py)을 지정한 크기로 만든 뒤 각 함수를 별도 프로세스에서 실행하고
+실행 시간 (wall time), 최대 메모리 (peak RSS), 기록한 파일 크기 (bytes written)를 측정
+
+  python run_benchmarks.py --boxes 200 --layers 6 --groups 60 --years 1 --output results.json
+  python run_benchmarks.py --baseline results.json      # 이전 결과와 비교, 느려지면 종료 코드 1
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import platform
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+for _sub in ('initial', 'hydro'):
+    _path = os.path.join(BENCH_DIR, os.pardir, _sub)
+    if _path not in sys.path:
+        sys.path.append(_path)
+
+import numpy as np
+
+import synthetic_inputs
+
+CASES = ['make_map_data_init', 'generate_vars_init', 'make_init_csv', 'make_init_nc', 'get_init_nc',
+         'write_avs_monthly', 'write_trans_monthly']
+
+DEFAULT_SCALE = {
+    'boxes': 100,       # box 개수 (face 개수는 격자 구조로 결정)
+    'layers': 6,        # 물층 수 (hydro level 수와 같음)
+    'groups': 40,       # 기능 그룹 수
+    'cohorts': 10,      # 그룹별 최대 코호트 수
+    'tracers': 20,      # AttributeTemplate의 추가 필수 tracer 수
+    'years': 1,         # hydro 연도 수
+    'dt': 43200,        # hydro 시간 간격 (초)
+    'workers': 1,       # hydro writer 작업 프로세스 수
+    'seed': 0,
+}
+START_YEAR = 2019
+
+
+def cum_depths_for(layers, max_depth=3000.0):
+    return [0] + [int(d) for d in np.round(np.geomspace(10.0, max_depth, layers))]
+
+
+# ---------------------------------------------------------------------------
+# peak_rss_mb: 현재 프로세스 (와 종료된 하위 프로세스)의 최대 메모리 (MB)
+# Linux는 /proc/self/status의 VmHWM 사용 (ru_maxrss는 exec 이전 부모 프로세스의 값이 남음)
+# resource 모듈이 없는 Windows에서는 psutil의 peak_wset 사용, 둘 다 없으면 None
+# ---------------------------------------------------------------------------
+def _vm_hwm_mb():
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+            return psutil.Process().memory_info().peak_wset / 1024 ** 2
+        except (ImportError, AttributeError):
+            return None
+    unit = 1024 ** 2 if sys.platform == 'darwin' else 1024  # macOS는 byte, Linux는 KB
+    own = _vm_hwm_mb()
+    if own is None:
+        own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * unit / 1024 ** 2
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * unit / 1024 ** 2
+    return max(own, children)
+
+
+def _dir_bytes(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+# ---------------------------------------------------------------------------
+# prepare_inputs: 합성 입력 파일 생성 (측정 대상 아님)
+# 반환: 입력 파일 경로와 크기 정보 dict
+# ---------------------------------------------------------------------------
+def prepare_inputs(input_dir, scale):
+    os.makedirs(input_dir, exist_ok=True)
+    inputs = {
+        'bgm_file': os.path.join(input_dir, 'synthetic.bgm'),
+        'grp_file': os.path.join(input_dir, 'groups.csv'),
+        'att_file': os.path.join(input_dir, 'AttributeTemplate.csv'),
+        'mat_dir': os.path.join(input_dir, 'hydro'),
+        'cum_depths': cum_depths_for(scale['layers']),
+        'years': list(range(START_YEAR, START_YEAR + scale['years'])),
+    }
+    geometry = synthetic_inputs.write_bgm(inputs['bgm_file'], scale['boxes'], seed=scale['seed'])
+    synthetic_inputs.write_groups(inputs['grp_file'], scale['groups'], scale['cohorts'], seed=scale['seed'])
+    synthetic_inputs.write_attribute_template(inputs['att_file'], scale['tracers'], seed=scale['seed'])
+    inputs['numfaces'] = geometry['numfaces']
+    for year in inputs['years']:
+        synthetic_inputs.write_hydro_mat(inputs['mat_dir'], year, scale['boxes'], geometry['numfaces'],
+                                         scale['layers'], dt=scale['dt'], bgm_file=inputs['bgm_file'],
+                                         seed=scale['seed'])
+
+    # get_init_nc 입력 파일은 미리 생성
+    init_dir = os.path.join(input_dir, 'init')
+    os.makedirs(init_dir, exist_ok=True)
+    _run_in_dir(init_dir, inputs, lambda: _init_nc(inputs, 'bench'))
+    inputs['nc_file'] = os.path.join(init_dir, 'bench.nc')
+    return inputs
+
+
+def _run_in_dir(path, inputs, func):
+    # make_init_csv는 현재 폴더의 AttributeTemplate.csv를 읽음
+    cwd = os.getcwd()
+    shutil.copy(inputs['att_file'], os.path.join(path, 'AttributeTemplate.csv'))
+    os.chdir(path)
+    try:
+        return func()
+    finally:
+        os.chdir(cwd)
+
+
+def _init_nc(inputs, csv_name):
+    from Atlantis_init_tools import make_init_csv, make_init_nc
+    make_init_csv(inputs['grp_file'], inputs['bgm_file'], inputs['cum_depths'], csv_name)
+    make_init_nc(inputs['bgm_file'], inputs['cum_depths'], f"{csv_name}_init.csv", f"{csv_name}_horiz.csv",
+                 f"{csv_name}.nc")
+
+
+# ---------------------------------------------------------------------------
+# 측정 대상 함수 (작업 프로세스 안에서 out_dir을 현재 폴더로 두고 실행)
+# ---------------------------------------------------------------------------
+def _case_make_map_data_init(inputs, scale):
+    from Atlantis_init_tools import make_map_data_init
+    make_map_data_init(inputs['bgm_file'], inputs['cum_depths'])
+
+
+def _case_generate_vars_init(inputs, scale):
+    import pandas as pd
+    from Atlantis_init_tools import generate_vars_init
+    df_atts = pd.read_csv(inputs['att_file'], header=0, dtype=str)
+    generate_vars_init(inputs['grp_file'], inputs['cum_depths'], df_atts)
+
+
+def _case_make_init_csv(inputs, scale):
+    from Atlantis_init_tools import make_init_csv
+    make_init_csv(inputs['grp_file'], inputs['bgm_file'], inputs['cum_depths'], 'bench')
+
+
+def _case_make_init_nc(inputs, scale):
+    from Atlantis_init_tools import make_init_nc
+    init_dir = os.path.dirname(inputs['nc_file'])
+    make_init_nc(inputs['bgm_file'], inputs['cum_depths'], os.path.join(init_dir, 'bench_init.csv'),
+                 os.path.join(init_dir, 'bench_horiz.csv'), 'bench.nc')
+
+
+def _case_get_init_nc(inputs, scale):
+    from Atlantis_init_tools import get_init_nc
+    get_init_nc(inputs['nc_file'], 'bench_output.csv')
+
+
+def _case_write_avs_monthly(inputs, scale):
+    from Atlantis_hydro_tools import make_hydro_grid, open_mat_array
+    from get_avs_monthly_fianl import write_avs_monthly
+    for year in inputs['years']:
+        year_dir = os.path.join(inputs['mat_dir'], str(year))
+        temp = open_mat_array(os.path.join(year_dir, f"av_temp_{year}.mat"), 'av_temp', 'float32')
+        salt = open_mat_array(os.path.join(year_dir, f"av_salt_{year}.mat"), 'av_salt', 'float32')
+        grid = make_hydro_grid(year, {'temp': temp, 'salt': salt}, dt=scale['dt'])
+        write_avs_monthly(temp, salt, grid, os.getcwd(), n_workers=scale['workers'])
+
+
+def _case_write_trans_monthly(inputs, scale):
+    import scipy.io
+    from Atlantis_hydro_tools import make_hydro_grid, open_mat_array
+    from get_trans_monthly_final import write_trans_monthly
+    face_data = scipy.io.loadmat(os.path.join(inputs['mat_dir'], 'bgm_v2.mat'))
+    for year in inputs['years']:
+        trans = open_mat_array(os.path.join(inputs['mat_dir'], str(year), f"trans_new_{year}.mat"), 'T', 'float32')
+        grid = make_hydro_grid(year, {'trans': trans}, dt=scale['dt'])
+        write_trans_monthly(trans, face_data['pt1'], face_data['pt2'], face_data['lr'], grid, os.getcwd(),
+                            n_workers=scale['workers'])
+
+
+def _run_case(case, inputs, scale, out_dir):
+    # 작업 프로세스: 한 가지 함수만 실행하고 측정값 반환 (출력은 벤치마크 표를 위해 숨김)
+    import io
+    import contextlib
+    func = globals()[f"_case_{case}"]
+    with contextlib.redirect_stdout(io.StringIO()):
+        _run_in_dir(out_dir, inputs, lambda: None)
+        before = _dir_bytes(out_dir)
+        cwd = os.getcwd()
+        os.chdir(out_dir)
+        try:
+            start = time.perf_counter()
+            func(inputs, scale)
+            wall = time.perf_counter() - start
+        finally:
+            os.chdir(cwd)
+    return {'wall_s': wall, 'peak_rss_mb': peak_rss_mb(), 'bytes_written': _dir_bytes(out_dir) - before}
+
+
+# ---------------------------------------------------------------------------
+# run_benchmarks: case마다 새 프로세스 (spawn)에서 repeat번 실행하여 가장 빠른 결과를 기록
+# (메모리 측정이 이전 case의 영향을 받지 않도록 프로세스를 재사용하지 않음)
+# 반환: 결과 dict 목록
+# ---------------------------------------------------------------------------
+def run_benchmarks(scale=None, cases=CASES, repeat=3, work_dir=None, keep=False):
+    scale = dict(DEFAULT_SCALE, **(scale or {}))
+    unknown = [case for case in cases if case not in CASES]
+    if unknown:
+        raise ValueError(f"알 수 없는 벤치마크: {unknown} (가능: {CASES})")
+    work_dir = work_dir or tempfile.mkdtemp(prefix='atlantis_bench_')
+    ctx = multiprocessing.get_context('spawn')
+
+    try:
+        start = time.perf_counter()
+        inputs = prepare_inputs(os.path.join(work_dir, 'inputs'), scale)
+        print(f"합성 입력 생성: {time.perf_counter() - start:.1f}초 (box {scale['boxes']}, face {inputs['numfaces']}, "
+              f"layer {scale['layers']}, group {scale['groups']}, year {scale['years']})")
+
+        results = []
+        for case in cases:
+            runs = []
+            for i in range(repeat):
+                out_dir = os.path.join(work_dir, 'runs', f"{case}_{i}")
+                os.makedirs(out_dir, exist_ok=True)
+                with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+                    runs.append(pool.submit(_run_case, case, inputs, scale, out_dir).result())
+                shutil.rmtree(out_dir, ignore_errors=True)
+            best = min(runs, key=lambda r: r['wall_s'])
+            peaks = [r['peak_rss_mb'] for r in runs if r['peak_rss_mb'] is not None]
+            results.append({'case': case, 'wall_s': best['wall_s'],
+                            'peak_rss_mb': max(peaks) if peaks else None,
+                            'bytes_written': best['bytes_written'], 'repeat': repeat, 'scale': scale})
+            rss = f"{results[-1]['peak_rss_mb']:.1f} MB" if peaks else "-"
+            print(f"{case:22s} {best['wall_s']:9.3f} s  {rss:>12s}  {best['bytes_written']:>14,d} bytes")
+    finally:
+        if not keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+# ---------------------------------------------------------------------------
+# compare_results: 기준 결과 (같은 scale)와 비교해 tolerance 비율 이상 느려지거나
+# 메모리 / 기록 크기가 늘어난 항목 목록 반환
+# ---------------------------------------------------------------------------
+def compare_results(results, baseline, tolerance=0.2):
+    base = {(r['case'], json.dumps(r['scale'], sort_keys=True)): r for r in baseline}
+    regressions = []
+    for r in results:
+        ref = base.get((r['case'], json.dumps(r['scale'], sort_keys=True)))
+        if ref is None:
+            continue
+        for key in ('wall_s', 'peak_rss_mb', 'bytes_written'):
+            if r[key] is None or ref[key] is None or ref[key] <= 0:
+                continue
+            ratio = r[key] / ref[key]
+            if ratio > 1.0 + tolerance:
+                regressions.append({'case': r['case'], 'metric': key, 'baseline': ref[key], 'current': r[key],
+                                    'ratio': ratio})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Atlantis initial / hydro 벤치마크")
+    for key, value in DEFAULT_SCALE.items():
+        parser.add_argument(f"--{key}", type=int, default=value)
+    parser.add_argument('--cases', nargs='+', choices=CASES, default=CASES)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--work-dir', help="입력 / 출력 파일 폴더 (기본: 임시 폴더, 종료 후 삭제)")
+    parser.add_argument('--keep', action='store_true', help="입력 / 출력 파일을 지우지 않음")
+    parser.add_argument('--output', help="결과를 저장할 JSON 파일")
+    parser.add_argument('--baseline', help="비교할 이전 결과 JSON 파일")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="허용 증가 비율 (기본 0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    scale = {key: getattr(args, key) for key in DEFAULT_SCALE}
+    results = run_benchmarks(scale, args.cases, args.repeat, args.work_dir, args.keep)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'platform': platform.platform(), 'python': platform.python_version(),
+                       'results': results}, f, indent=1)
+        print(f"결과 저장: {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        regressions = compare_results(results, baseline, args.tolerance)
+        for reg in regressions:
+            print(f"성능 저하: {reg['case']} {reg['metric']} {reg['baseline']:.4g} -> {reg['current']:.4g} "
+                  f"({reg['ratio']:.2f}배)")
+        if regressions:
+            return 1
+        print("기준 결과 대비 성능 저하 없음")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Apr 14 09:05:27 2025
+
+@author: Ukjae
+
+벤치마크용 합성 입력 파일 생성
+  - BGM (격자 형태의 box / face, 가장자리 면은 경계 box와 연결)
+  - 기능 그룹 CSV, AttributeTemplate.csv
+  - hydro .mat (av_temp / av_salt / trans_new, bgm_v2.mat)
+크기 (box, layer, 그룹, 코호트, 추가 tracer, 연도, 시간 간격)는 인자로 지정
+"""
+
+import os
+import numpy as np
+import pandas as pd
+import scipy.io
+
+
+# ---------------------------------------------------------------------------
+# write_bgm: nx x ny 격자의 box (box i는 [x, x+1] x [y, y+1] 사각형)와 이웃 box 사이의 face로
+# 이루어진 BGM 파일 생성. island_frac 비율의 box는 botz > 0 (섬)
+# face 방향: pt1 -> pt2 를 바라볼 때 왼쪽 box = lr[0] (transport +ve 방향)
+# 반환: {'numboxes', 'numfaces', 'botz'}
+# ---------------------------------------------------------------------------
+def write_bgm(bgm_file, n_boxes, max_depth=3000.0, island_frac=0.05, seed=0):
+    rng = np.random.default_rng(seed)
+    nx = int(np.ceil(np.sqrt(n_boxes)))
+    pos = [(i % nx, i // nx) for i in range(n_boxes)]
+    index = {p: i for i, p in enumerate(pos)}
+
+    # face 목록: (p1, p2, left, right)
+    faces = []
+    for i, (x, y) in enumerate(pos):
+        right = index.get((x + 1, y))
+        if right is not None:
+            # 세로 면, 위쪽 방향: 왼쪽이 현재 box
+            faces.append(((x + 1, y), (x + 1, y + 1), i, right))
+        above = index.get((x, y + 1))
+        if above is not None:
+            # 가로 면, -x 방향: 왼쪽이 아래 box
+            faces.append(((x + 1, y + 1), (x, y + 1), i, above))
+
+    box_faces = {i: [] for i in range(n_boxes)}
+    for j, (_, _, left, right) in enumerate(faces):
+        box_faces[left].append((j, right))
+        box_faces[right].append((j, left))
+
+    botz = -rng.uniform(5.0, max_depth, n_boxes)
+    islands = rng.random(n_boxes) < island_frac
+    botz[islands] = rng.uniform(1.0, 10.0, islands.sum())
+
+    lines = ["# synthetic bgm", "projection proj=lonlat", f"nbox {n_boxes}", f"nface {len(faces)}",
+             f"maxwcbotz {-max_depth}"]
+    for i, (x, y) in enumerate(pos):
+        conn = box_faces[i]
+        lines += [
+            f"box{i}.label Box{i}",
+            f"box{i}.inside {x + 0.5} {y + 0.5}",
+            f"box{i}.nconn {len(conn)}",
+            f"box{i}.iface " + " ".join(str(j) for j, _ in conn),
+            f"box{i}.ibox " + " ".join(str(b) for _, b in conn),
+            f"box{i}.ilength " + " ".join("1000" for _ in conn),
+            f"box{i}.botz {botz[i]:.2f}",
+            f"box{i}.area 1e6",
+            f"box{i}.vertmix 0.000001",
+            f"box{i}.horizmix 1",
+        ]
+        for vx, vy in ((x, y), (x + 1, y), (x + 1, y + 1), (x, y + 1), (x, y)):
+            lines.append(f"box{i}.vert {vx} {vy}")
+    for j, (p1, p2, left, right) in enumerate(faces):
+        lines += [
+            f"face{j}.p1 {p1[0]} {p1[1]}",
+            f"face{j}.p2 {p2[0]} {p2[1]}",
+            f"face{j}.length 1000",
+            f"face{j}.cs {p2[1] - p1[1]} {p1[0] - p2[0]}",
+            f"face{j}.lr {left} {right}",
+        ]
+    ny = (n_boxes + nx - 1) // nx
+    for vx, vy in ((0, 0), (nx, 0), (nx, ny), (0, ny), (0, 0)):
+        lines.append(f"bnd_vert {vx} {vy}")
+
+    with open(bgm_file, 'w') as f:
+        f.write("\n".join(lines) + "\n")
+    return {'numboxes': n_boxes, 'numfaces': len(faces), 'botz': botz}
+
+
+# ---------------------------------------------------------------------------
+# write_groups: 기능 그룹 CSV (Code, Index, IsTurnedOn, Name, GroupType, IsCover, NumCohorts, IsSiliconDep)
+# GroupType은 GROUP_TYPES를 순서대로 반복, NumCohorts는 1 ~ max_cohorts
+# ---------------------------------------------------------------------------
+GROUP_TYPES = ['FISH', 'BIRD', 'SHARK', 'MAMMAL', 'REPTILE', 'FISH_INVERT', 'DINOFLAG', 'SM_PHY', 'LG_PHY',
+               'MICROPHTYBENTHOS', 'CORAL', 'SEAGRASS', 'PWN', 'CEP', 'LAB_DET', 'PL_BACT', 'LG_ZOO']
+_EPIBENTHOS_TYPES = ['MICROPHTYBENTHOS', 'CORAL', 'SEAGRASS']
+
+
+def write_groups(grp_file, n_groups, max_cohorts=10, seed=0):
+    rng = np.random.default_rng(seed)
+    group_type = [GROUP_TYPES[i % len(GROUP_TYPES)] for i in range(n_groups)]
+    df_grp = pd.DataFrame({
+        'Code': [f"G{i:03d}" for i in range(n_groups)],
+        'Index': np.arange(n_groups),
+        'IsTurnedOn': 1,
+        'Name': [f"Group{i}" for i in range(n_groups)],
+        'GroupType': group_type,
+        'IsCover': [int(t in ('CORAL', 'SEAGRASS')) for t in group_type],
+        'NumCohorts': rng.integers(1, max_cohorts + 1, n_groups),
+        'IsSiliconDep': (rng.random(n_groups) < 0.2).astype(int),
+    })
+    df_grp.to_csv(grp_file, index=False)
+    return df_grp
+
+
+# ---------------------------------------------------------------------------
+# write_attribute_template: AttributeTemplate.csv 생성 (컬럼은 initial/AttributeTemplate.csv와 동일)
+# 필수 물리 변수 + 그룹 종류별 {GroupType}_N 및 Nums3D 등 템플릿 + n_tracers 개의 추가 필수 tracer
+# ---------------------------------------------------------------------------
+TEMPLATE_COLUMNS = ['name', 'required', 'dimensions', 'dimnames', 'bmtype', 'units', 'long_name', 'dtype',
+                    'sumtype', 'inwc', 'insed', 'dissol', 'decay', 'partic', 'fill.value', 'passive', 'svel',
+                    'xvel', 'psize', 'b_dens', 'i_conc', 'f_conc', 'wc.hor.pattern', 'wc.ver.pattern',
+                    'sediment', 'wc.hor.scalar']
+
+
+def _template_row(name, required, dimnames, bmtype, units, long_name, hor, ver, sediment=0, scalar=0):
+    row = dict.fromkeys(TEMPLATE_COLUMNS, 'NA')
+    row.update({'name': name, 'required': required, 'dimensions': 2 if 'z' in dimnames else 1,
+                'dimnames': dimnames, 'bmtype': bmtype, 'units': units, 'long_name': long_name,
+                'dtype': 0, 'sumtype': 0, 'wc.hor.pattern': hor, 'wc.ver.pattern': ver,
+                'sediment': sediment, 'wc.hor.scalar': scalar})
+    return row
+
+
+def write_attribute_template(att_file, n_tracers=20, group_types=GROUP_TYPES, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = [
+        _template_row('volume', 'TRUE', '[ z b ]', 'phys', 'm3', 'Volume', 'calculated', 'calculated', 1, 1),
+        _template_row('nominal_dz', 'TRUE', '[ z b ]', 'phys', 'm', 'Thickness', 'calculated', 'calculated', 1, 1),
+        _template_row('dz', 'TRUE', '[ z b ]', 'phys', 'm', 'Thickness', 'calculated', 'calculated', 1, 1),
+        _template_row('numlayers', 'TRUE', '[ b ]', 'phys', '1', 'Number of layers', 'calculated', 'none', 0, 1),
+        _template_row('topk', 'TRUE', '[ b ]', 'phys', '1', 'Sediment top index', 'constant', 'none'),
+        _template_row('porosity', 'TRUE', '[ z b ]', 'phys', '1', 'Porosity', 'constant', 'uniform'),
+    ]
+    for i in range(n_tracers):
+        rows.append(_template_row(f"Tracer{i}", 'TRUE', '[ z b ]', 'tracer', 'mg N m-3', f"Synthetic tracer {i}",
+                                  'custom' if i % 4 == 0 else 'constant', 'uniform',
+                                  round(float(rng.uniform(0, 10)), 3), round(float(rng.uniform(0, 10)), 3)))
+    for group_type in group_types:
+        if group_type in _EPIBENTHOS_TYPES:
+            rows.append(_template_row(f"{group_type}_N", 'FALSE', '[ b ]', 'epibenthos', 'mg N m-2', 'Nitrogen',
+                                      'custom', 'none'))
+        else:
+            rows.append(_template_row(f"{group_type}_N", 'FALSE', '[ z b ]', 'tracer', 'mg N m-3', 'Nitrogen',
+                                      'custom', 'uniform', 0, 1))
+    rows += [
+        _template_row('Nums3D', 'FALSE', '[ z b ]', 'tracer', 'individuals', 'Numbers of XXX', 'constant', 'uniform'),
+        _template_row('ResN3D', 'FALSE', '[ z b ]', 'tracer', 'mg N', 'Reserve N', 'constant', 'uniform'),
+        _template_row('StructN3D', 'FALSE', '[ z b ]', 'tracer', 'mg N', 'Structural N', 'constant', 'uniform'),
+        _template_row('Cover', 'FALSE', '[ b ]', 'epibenthos', '%', 'Percent cover by XXX', 'custom', 'none'),
+        _template_row('Si3D', 'FALSE', '[ z b ]', 'tracer', 'mg Si m-3', 'XXX Silicon', 'constant', 'uniform'),
+        _template_row('Light3D', 'FALSE', '[ z b ]', 'tracer', 'PSU', 'Light Adaptation of XXX', 'constant',
+                      'uniform'),
+    ]
+    df_atts = pd.DataFrame(rows, columns=TEMPLATE_COLUMNS)
+    df_atts.to_csv(att_file, index=False)
+    return df_atts
+
+
+# ---------------------------------------------------------------------------
+# write_hydro_mat: {mat_dir}/{year}/av_temp_{year}.mat, av_salt_{year}.mat, trans_new_{year}.mat 와
+# {mat_dir}/bgm_v2.mat (pt1, pt2, lr) 생성. 배열 형상은 [boxes 또는 faces, time, level]
+# (MATLAB v5 비압축 -> open_mat_array에서 memmap으로 열림)
+# bgm_file을 주면 face 좌표 / lr을 BGM에서 가져옴
+# ---------------------------------------------------------------------------
+def write_hydro_mat(mat_dir, year, n_boxes, n_faces, n_levels, dt=43200, bgm_file=None, seed=0):
+    rng = np.random.default_rng(seed + year)
+    n_time = len(pd.date_range(f"{year}-01-01", f"{year + 1}-01-01", freq=f"{dt}s", inclusive='left'))
+    year_dir = os.path.join(mat_dir, str(year))
+    os.makedirs(year_dir, exist_ok=True)
+
+    # 메모리 사용을 줄이기 위해 변수 하나씩 생성 / 저장
+    temp = rng.normal(15.0, 3.0, (n_boxes, n_time, n_levels))
+    scipy.io.savemat(os.path.join(year_dir, f"av_temp_{year}.mat"), {'av_temp': temp})
+    del temp
+    salt = rng.normal(33.0, 1.0, (n_boxes, n_time, n_levels))
+    scipy.io.savemat(os.path.join(year_dir, f"av_salt_{year}.mat"), {'av_salt': salt})
+    del salt
+    trans = rng.normal(0.0, 1.0, (n_faces, n_time, n_levels))
+    scipy.io.savemat(os.path.join(year_dir, f"trans_new_{year}.mat"), {'T': trans})
+    del trans
+
+    if bgm_file is not None:
+        from Atlantis_init_tools import read_bgm
+        faces = read_bgm(bgm_file)['faces']
+        face_data = {'pt1': faces[['p1_x', 'p1_y']].to_numpy(), 'pt2': faces[['p2_x', 'p2_y']].to_numpy(),
+                     'lr': faces[['left', 'right']].to_numpy().astype(int)}
+    else:
+        face_data = {'pt1': rng.normal(size=(n_faces, 2)), 'pt2': rng.normal(size=(n_faces, 2)),
+                     'lr': rng.integers(0, n_boxes, (n_faces, 2))}
+    scipy.io.savemat(os.path.join(mat_dir, 'bgm_v2.mat'), face_data)
+    return {'n_time': n_time, 'year_dir': year_dir}
@@ -0,0 +1,607 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Apr  1 10:12:41 2025
+
+@author: Ukjae
+
+hydro 스크립트들이 함께 사용하는 공용 함수 모음
+"""
+import os
+import sys
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+
+
+# ---------------------------------------------------------------------------
+# use_initial_modules: initial 디렉터리를 import 경로에 추가
+# BGM 해석 (Atlantis_init_tools.read_bgm)과 실행 기록 (Atlantis_trace)은 initial의 모듈을 사용하므로
+# hydro 스크립트는 이 모듈을 먼저 import한 뒤 필요한 함수를 해당 모듈에서 직접 import
+# ---------------------------------------------------------------------------
+def use_initial_modules():
+    init_dir = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'initial'))
+    if init_dir not in sys.path:
+        sys.path.append(init_dir)
+    return init_dir
+
+
+use_initial_modules()
+
+# ---------------------------------------------------------------------------
+# share_array / attach_array: 월별 작업 프로세스에 큰 배열을 복사(pickle)하지 않고
+# 메모리 매핑된 .npy 파일로 전달. share_array는 부모 프로세스에서 한 번 호출하고,
+# 작업 프로세스는 spec(파일 경로)만 받아 읽기 전용 memmap view로 엶
+# (Windows spawn / Linux fork 모두 동일하게 동작하고, 페이지는 OS 캐시를 공유)
+# ---------------------------------------------------------------------------
+def share_array(arr, tmp_dir=None):
+    # open_mat_array로 연 배열은 이미 파일에 있으므로 작업 프로세스가 직접 다시 엶
+    source = getattr(arr, 'mat_source', None)
+    if source is not None:
+        return {'mat': source[0], 'name': source[1], 'precision': getattr(arr, 'precision', 'float64')}
+    share_dir = tempfile.mkdtemp(prefix='atlantis_share_', dir=tmp_dir)
+    path = os.path.join(share_dir, 'array.npy')
+    if isinstance(arr, _PackedArray):
+        # int16 압축 배열은 압축된 그대로 전달
+        np.save(path, arr.data)
+        return {'path': path, 'scale': arr.scale, 'offset': arr.offset}
+    np.save(path, np.asarray(arr))
+    return {'path': path}
+
+
+def attach_array(spec):
+    if 'mat' in spec:
+        return open_mat_array(spec['mat'], spec['name'], spec.get('precision', 'float64'))
+    if 'scale' in spec:
+        return _PackedArray(np.load(spec['path'], mmap_mode='r'), spec['scale'], spec['offset'])
+    return np.load(spec['path'], mmap_mode='r')
+
+
+def release_array(spec):
+    if 'mat' in spec:
+        return
+    shutil.rmtree(os.path.dirname(spec['path']), ignore_errors=True)
+
+
+def default_workers(n_tasks):
+    return max(1, min(n_tasks, os.cpu_count() or 1))
+
+
+# ---------------------------------------------------------------------------
+# month_slices: 시간 축을 월별 연속 구간 (month, start, stop, subset_days)으로 분할
+# subset_days: 각 월의 첫째 날 기준 경과일 (day). 월별 자료는 time 축의
+# [start:stop] slice로 읽으므로 boolean mask 복사본이 생기지 않음
+# ---------------------------------------------------------------------------
+def month_slices(time_vector, year):
+    time_vector = pd.DatetimeIndex(time_vector)
+    if not time_vector.is_monotonic_increasing:
+        raise ValueError("time_vector는 시간 순서대로 정렬되어 있어야 합니다.")
+    slices = []
+    for month in range(1, 13):
+        month_start = pd.Timestamp(year=year, month=month, day=1)
+        start = int(time_vector.searchsorted(month_start, side='left'))
+        stop = int(time_vector.searchsorted(month_start + pd.offsets.MonthBegin(1), side='left'))
+        if stop <= start:
+            continue  # 해당 월 자료가 없으면 건너뜀
+        elapsed = time_vector[start:stop] - month_start
+        subset_days = np.asarray(elapsed.days + elapsed.seconds / 86400.0)
+        slices.append((month, start, stop, subset_days))
+    return slices
+
+
+# ---------------------------------------------------------------------------
+# make_hydro_grid: 시간 / 공간 정보 (descriptor dict)를 입력 배열과 BGM 파일에서 생성
+# arrays: {'temp': [boxes, time, level], 'salt': ..., 'trans': [faces, time, level]} (None은 무시)
+# 시간 축은 연초부터 time 개수 x dt (초, 기본 HYDRO_DT = 43200 = 12시간)
+# time 개수 x dt가 1년을 넘거나 box / face / level / time 개수가 서로 (또는 BGM, 지정값과) 다르면 ValueError
+# 1년보다 짧으면 (예: 12시간 간격 729개) 경고만 출력
+# 반환 dict:
+#   year, dt, n_time, n_boxes, n_faces, n_levels, time_vector, months (month_slices 결과),
+#   time_units, chunks {'avs': (time, boxes, level), 'trans': (time, faces, level)},
+#   bgm_file 을 주면 pt1, pt2 ([faces, 2] 좌표), lr ([faces, 2] 왼쪽/오른쪽 box),
+#   topology (make_face_topology 결과) 추가
+# ---------------------------------------------------------------------------
+_GRID_COUNTS = {'temp': 'n_boxes', 'salt': 'n_boxes', 'trans': 'n_faces'}
+GRID_CHUNK_BYTES = 1 << 20
+HYDRO_DT = 43200
+
+
+def _read_bgm(bgm_file):
+    # BGM 해석은 initial/Atlantis_init_tools.load_bgm 사용 (ATLANTIS_BGM_CACHE를 지정하면 캐시, 없으면 read_bgm)
+    from Atlantis_init_tools import load_bgm
+    return load_bgm(bgm_file)
+
+
+def year_seconds(year):
+    return (pd.Timestamp(year=year + 1, month=1, day=1) - pd.Timestamp(year=year, month=1, day=1)).total_seconds()
+
+
+def time_chunk(dt, record_bytes, target_bytes=GRID_CHUNK_BYTES):
+    # 하루치 시간 단계를 한 chunk로 묶되 chunk 크기는 target_bytes 이하
+    steps_per_day = max(1, int(86400 // dt))
+    return int(max(1, min(steps_per_day, target_bytes // max(record_bytes, 1))))
+
+
+def make_hydro_grid(year, arrays, dt=None, bgm_file=None, n_boxes=None, n_faces=None):
+    grid = {'year': year, 'n_boxes': n_boxes, 'n_faces': n_faces, 'n_levels': None, 'n_time': None}
+
+    def set_count(key, value, source):
+        if grid[key] is None:
+            grid[key] = int(value)
+        elif grid[key] != value:
+            raise ValueError(f"{source}의 {key} ({value})이 다른 입력 ({grid[key]})과 다릅니다.")
+
+    if bgm_file is not None:
+        topology = make_face_topology(bgm_file)
+        set_count('n_boxes', topology['n_boxes'], bgm_file)
+        set_count('n_faces', topology['n_faces'], bgm_file)
+        grid['pt1'], grid['pt2'], grid['lr'] = topology['pt1'], topology['pt2'], topology['lr']
+        grid['topology'] = topology
+
+    for name, arr in arrays.items():
+        if arr is None:
+            continue
+        if len(arr.shape) != 3:
+            raise ValueError(f"{name} 배열은 3차원 ([{_GRID_COUNTS[name][2:]}, time, level])이어야 합니다: {arr.shape}")
+        set_count(_GRID_COUNTS[name], arr.shape[0], name)
+        set_count('n_time', arr.shape[1], name)
+        set_count('n_levels', arr.shape[2], name)
+
+    if grid['n_time'] is None:
+        raise ValueError("time 개수를 정할 입력 배열이 없습니다.")
+    if dt is None:
+        dt = HYDRO_DT
+    expected = year_seconds(year) / dt
+    if grid['n_time'] > expected:
+        raise ValueError(f"{year}년 time 개수 {grid['n_time']}가 dt={dt}초 기준 1년 ({expected:g}개)을 넘습니다.")
+    if grid['n_time'] < expected:
+        print(f"경고: {year}년 time 개수 {grid['n_time']}가 dt={dt}초 기준 1년 ({expected:g}개)보다 적습니다.")
+
+    grid['dt'] = dt
+    grid['time_vector'] = pd.date_range(start=f"{year}-01-01 00:00:00", periods=grid['n_time'], freq=f"{dt}s")
+    grid['months'] = month_slices(grid['time_vector'], year)
+    grid['time_units'] = f"days since {year}-01-01 00:00:00"
+    grid['chunks'] = {}
+    for kind, count_key in (('avs', 'n_boxes'), ('trans', 'n_faces')):
+        if grid[count_key] is not None and grid['n_levels'] is not None:
+            record_bytes = 4 * grid[count_key] * grid['n_levels']
+            grid['chunks'][kind] = (time_chunk(dt, record_bytes), grid[count_key], grid['n_levels'])
+    return grid
+
+
+# ---------------------------------------------------------------------------
+# make_face_topology: BGM의 box / face 연결 구조를 희소 행렬 (scipy.sparse CSR)로 정리
+#   incidence [boxes, faces] : 왼쪽 box (lr[:, 0]) +1, 오른쪽 box (lr[:, 1]) -1
+#                              (transport +ve = pt1 -> pt2 를 바라볼 때 왼쪽 box로 유입)
+#   box_faces [boxes, faces] : box.iface 목록 (box 쪽에 기록된 연결 정보, 값 1)
+# incidence @ T[faces, time * level] 한 번으로 모든 box / 시간 / 층의 순유입량 계산
+# bgm: BGM 파일 경로 또는 read_bgm 결과
+# 반환 dict: n_boxes, n_faces, pt1, pt2, lr (없는 값은 -1), length, inside, botz, incidence, box_faces
+# ---------------------------------------------------------------------------
+def make_face_topology(bgm):
+    if isinstance(bgm, str):
+        bgm = _read_bgm(bgm)
+    n_boxes, n_faces = bgm['numboxes'], bgm['numfaces']
+    faces, boxes = bgm['faces'], bgm['boxes']
+
+    lr = faces[['left', 'right']].to_numpy(dtype=float)
+    lr = np.where(np.isfinite(lr), lr, -1).astype(int)
+    valid = (lr >= 0) & (lr < n_boxes)
+    face_ids = np.arange(n_faces)
+    incidence = sp.csr_matrix(
+        (np.concatenate([np.ones(valid[:, 0].sum()), -np.ones(valid[:, 1].sum())]),
+         (np.concatenate([lr[valid[:, 0], 0], lr[valid[:, 1], 1]]),
+          np.concatenate([face_ids[valid[:, 0]], face_ids[valid[:, 1]]]))),
+        shape=(n_boxes, n_faces))
+    incidence.sum_duplicates()
+    incidence.eliminate_zeros()  # 왼쪽 = 오른쪽 box인 면은 순유입량에 기여하지 않음
+
+    iface = [np.asarray(a, dtype=int) for a in bgm['box_iface']]
+    rows = np.repeat(np.arange(n_boxes), [len(a) for a in iface])
+    cols = np.concatenate(iface) if len(rows) else np.zeros(0, dtype=int)
+    keep = (cols >= 0) & (cols < n_faces)
+    box_faces = sp.csr_matrix((np.ones(keep.sum()), (rows[keep], cols[keep])), shape=(n_boxes, n_faces))
+    box_faces.data[:] = 1.0  # 같은 면이 두 번 적혀 있어도 1
+
+    return {
+        'n_boxes': n_boxes,
+        'n_faces': n_faces,
+        'pt1': faces[['p1_x', 'p1_y']].to_numpy(dtype=float),
+        'pt2': faces[['p2_x', 'p2_y']].to_numpy(dtype=float),
+        'lr': lr,
+        'length': faces['length'].to_numpy(dtype=float),
+        'inside': boxes[['inside_x', 'inside_y']].to_numpy(dtype=float),
+        'botz': boxes['botz'].to_numpy(dtype=float),
+        'incidence': incidence,
+        'box_faces': box_faces,
+    }
+
+
+# ---------------------------------------------------------------------------
+# check_face_topology: face 정보가 BGM 구조와 맞는지 확인
+#   invalid_lr   : lr이 없는 box 번호      self_loop : 왼쪽 = 오른쪽 box
+#   unlisted     : lr의 box가 iface 목록에 해당 면을 적지 않음
+#   extra_iface  : iface 목록에 있지만 lr에는 없는 box-면 연결
+#   orientation  : 왼쪽 box의 inside 점이 pt1 -> pt2 오른쪽에 있음 (또는 오른쪽 box가 왼쪽)
+#                  (오목한 box는 inside 점이 면의 연장선 반대편에 있을 수 있으므로 참고용)
+# pt1, pt2, lr (예: bgm_v2.mat 값)을 주면 BGM과 비교
+#   pt_mismatch  : 좌표 차이 > atol,  lr_mismatch : lr 다름,  lr_swapped : 왼쪽/오른쪽이 뒤바뀜 (부호 반대)
+# 반환: {'ok', 'issues': {이름: face 번호 배열}}
+# ---------------------------------------------------------------------------
+def check_face_topology(topology, pt1=None, pt2=None, lr=None, atol=1e-6):
+    t_lr = topology['lr']
+    n_boxes = topology['n_boxes']
+    issues = {}
+    issues['invalid_lr'] = np.flatnonzero(((t_lr < 0) | (t_lr >= n_boxes)).any(axis=1))
+    issues['self_loop'] = np.flatnonzero(t_lr[:, 0] == t_lr[:, 1])
+
+    # lr 연결 (|incidence|)과 box.iface 연결 비교
+    connected = abs(topology['incidence'])
+    connected.data[:] = 1.0
+    diff = (connected - topology['box_faces']).tocoo()
+    issues['unlisted'] = np.unique(diff.col[diff.data > 0])
+    issues['extra_iface'] = np.unique(diff.col[diff.data < 0])
+
+    # inside 점이 면의 어느 쪽에 있는지 (외적 부호)
+    p1, p2, inside = topology['pt1'], topology['pt2'], topology['inside']
+    side = np.full(t_lr.shape, np.nan)
+    for k in range(2):
+        ok = (t_lr[:, k] >= 0) & (t_lr[:, k] < n_boxes)
+        q = inside[t_lr[ok, k]]
+        side[ok, k] = ((p2[ok, 0] - p1[ok, 0]) * (q[:, 1] - p1[ok, 1])
+                       - (p2[ok, 1] - p1[ok, 1]) * (q[:, 0] - p1[ok, 0]))
+    issues['orientation'] = np.flatnonzero((side[:, 0] < 0) | (side[:, 1] > 0))
+
+    if pt1 is not None or pt2 is not None:
+        mismatch = np.zeros(topology['n_faces'], dtype=bool)
+        for given, own in ((pt1, p1), (pt2, p2)):
+            if given is not None:
+                mismatch |= ~np.isclose(np.asarray(given, dtype=float), own, atol=atol, rtol=0).all(axis=1)
+        issues['pt_mismatch'] = np.flatnonzero(mismatch)
+    if lr is not None:
+        lr = np.asarray(lr).astype(int)
+        issues['lr_mismatch'] = np.flatnonzero((lr != t_lr).any(axis=1))
+        issues['lr_swapped'] = np.flatnonzero((lr[:, 0] == t_lr[:, 1]) & (lr[:, 1] == t_lr[:, 0])
+                                              & (t_lr[:, 0] != t_lr[:, 1]))
+
+    for name, ids in issues.items():
+        if len(ids):
+            print(f"face 확인 - {name}: {len(ids)}개 {ids[:20].tolist()}{' ...' if len(ids) > 20 else ''}")
+    return {'ok': not any(len(ids) for ids in issues.values()), 'issues': issues}
+
+
+# ---------------------------------------------------------------------------
+# box_net_flux: face transport [faces, time, level] -> box별 순유입량 [boxes, time, level]
+# (+ 유입, - 유출, 단위는 transport와 같음). NaN (육지 층)은 0으로 취급
+# time_block을 주면 time 구간씩 나눠 계산 (lazy .mat 배열의 메모리 사용량 제한), None이면 한 번에 계산
+# gross=True 이면 box에 연결된 면 |transport| 합 (교환량)도 함께 반환
+# ---------------------------------------------------------------------------
+def _box_flux_blocks(trans, topology, time_block, gross=False):
+    # time 구간마다 (start, stop, 순유입량 [boxes, block, level], 교환량 또는 None) 반환
+    n_faces, n_time, n_levels = trans.shape
+    if n_faces != topology['n_faces']:
+        raise ValueError(f"transport의 face 개수 ({n_faces})가 BGM ({topology['n_faces']})과 다릅니다.")
+    n_boxes = topology['n_boxes']
+    incidence = topology['incidence']
+    connected = abs(incidence)
+    for start, stop in _time_blocks(n_time, time_block or max(n_time, 1)):
+        block = np.nan_to_num(np.asarray(trans[:, start:stop, :], dtype=np.float64)).reshape(n_faces, -1)
+        net = (incidence @ block).reshape(n_boxes, stop - start, n_levels)
+        total = (connected @ np.abs(block)).reshape(n_boxes, stop - start, n_levels) if gross else None
+        yield start, stop, net, total
+
+
+def box_net_flux(trans, topology, time_block=None, gross=False):
+    n_faces, n_time, n_levels = trans.shape
+    n_boxes = topology['n_boxes']
+    net = np.empty((n_boxes, n_time, n_levels))
+    total = np.empty((n_boxes, n_time, n_levels)) if gross else None
+    for start, stop, net_block, total_block in _box_flux_blocks(trans, topology, time_block, gross=gross):
+        net[:, start:stop, :] = net_block
+        if gross:
+            total[:, start:stop, :] = total_block
+    return (net, total) if gross else net
+
+
+# ---------------------------------------------------------------------------
+# transport_balance: box별 수송량 수지 요약 (DataFrame, box 당 한 행)
+#   n_faces        : 연결된 면 수
+#   mean_net       : 수직 합 (water column) 순유입량의 시간 평균
+#   max_abs_net    : 수직 합 순유입량 절댓값의 최대
+#   mean_gross     : 수직 합 교환량 (연결된 면 |transport| 합 / 2, 유입 = 유출이면 유입량)의 시간 평균
+#   rel_imbalance  : mean(|순유입량|) / mean_gross  (0이면 유입 = 유출)
+#   max_layer_net  : 층별 순유입량 절댓값의 최대 (층 사이 수직 흐름이 없으면 이 값도 작아야 함)
+#   net_volume     : dt를 주면 1년 누적 순유입 부피 (transport 단위 x 초)
+#   island         : botz >= 0 (교환량이 0이어야 하는 box)
+# time_block (기본 _PACK_TIME_BLOCK) 구간씩 읽어 box별 합계 / 최댓값만 누적 (box x time x level 배열을 만들지 않음)
+# ---------------------------------------------------------------------------
+def transport_balance(trans, topology, dt=None, time_block=None):
+    n_boxes = topology['n_boxes']
+    n_time = trans.shape[1]
+    sum_net, sum_abs_net, sum_gross = np.zeros(n_boxes), np.zeros(n_boxes), np.zeros(n_boxes)
+    max_abs_net, max_layer_net = np.zeros(n_boxes), np.zeros(n_boxes)
+    for _, _, net, total in _box_flux_blocks(trans, topology, time_block or _PACK_TIME_BLOCK, gross=True):
+        column_net = net.sum(axis=2)
+        sum_net += column_net.sum(axis=1)
+        sum_abs_net += np.abs(column_net).sum(axis=1)
+        sum_gross += total.sum(axis=(1, 2)) / 2.0
+        max_abs_net = np.maximum(max_abs_net, np.abs(column_net).max(axis=1))
+        max_layer_net = np.maximum(max_layer_net, np.abs(net).max(axis=(1, 2)))
+    n = max(n_time, 1)
+    mean_gross = sum_gross / n
+    mean_abs_net = sum_abs_net / n
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rel = np.where(mean_gross > 0, mean_abs_net / mean_gross, 0.0)
+    report = pd.DataFrame({
+        'box': np.arange(n_boxes),
+        'n_faces': np.diff(abs(topology['incidence']).indptr),
+        'mean_net': sum_net / n,
+        'max_abs_net': max_abs_net,
+        'mean_gross': mean_gross,
+        'rel_imbalance': rel,
+        'max_layer_net': max_layer_net,
+        'island': topology['botz'] >= 0,
+    })
+    if dt is not None:
+        report['net_volume'] = sum_net * float(dt)
+    return report
+
+
+# ---------------------------------------------------------------------------
+# output_options: 월별 writer의 자료 변수 (temperature, salinity, verticalflux, transport)에
+# 넘길 createVariable 옵션 (압축 / chunk). kind: 'avs' 또는 'trans'
+#   fast       : 비압축, chunk = 하루치 시간 단계 x 전체 box(face) x level (Atlantis의 시간 단계별 읽기)
+#   compressed : fast와 같은 chunk + zlib / shuffle 압축
+#   timeseries : zlib / shuffle 압축, chunk = 한 달 전체 시간 x box(face) 묶음 x level (box별 시계열 읽기)
+# ---------------------------------------------------------------------------
+OUTPUT_PROFILES = {
+    'fast': {'chunking': 'step', 'zlib': False},
+    'compressed': {'chunking': 'step', 'zlib': True, 'complevel': 4, 'shuffle': True},
+    'timeseries': {'chunking': 'series', 'zlib': True, 'complevel': 4, 'shuffle': True},
+}
+
+
+def output_options(grid, kind, profile='fast'):
+    if profile not in OUTPUT_PROFILES:
+        raise ValueError(f"알 수 없는 출력 profile: {profile} (가능: {list(OUTPUT_PROFILES)})")
+    opts = dict(OUTPUT_PROFILES[profile])
+    chunking = opts.pop('chunking')
+    if chunking == 'step':
+        opts['chunksizes'] = grid['chunks'][kind]
+    else:
+        count = grid['n_boxes' if kind == 'avs' else 'n_faces']
+        t_len = max(stop - start for _, start, stop, _ in grid['months'])
+        block = max(1, min(count, GRID_CHUNK_BYTES // (4 * t_len * grid['n_levels'])))
+        opts['chunksizes'] = (t_len, block, grid['n_levels'])
+    return opts
+
+
+# ---------------------------------------------------------------------------
+# open_mat_array: .mat 파일의 변수 하나를 전체 로드하지 않고 지연(lazy) 접근
+#   - MATLAB v7.3 (HDF5)     : h5py 데이터셋을 MATLAB 차원 순서로 감싼 _H5MatArray
+#   - MATLAB v5 (비압축 저장) : 데이터 위치를 찾아 np.memmap (Fortran 순서)
+#   - 그 밖 (v7 압축 등)      : scipy.io.loadmat으로 해당 변수만 로드
+# 반환 배열은 arr[:, start:stop, :] 처럼 필요한 구간만 읽을 수 있음
+# precision으로 읽는 시점에 자료형을 줄임 (narrow_array 참고)
+# ---------------------------------------------------------------------------
+_MAT5_DTYPES = {1: 'i1', 2: 'u1', 3: 'i2', 4: 'u2', 5: 'i4', 6: 'u4',
+                7: 'f4', 9: 'f8', 12: 'i8', 13: 'u8'}
+_MAT5_MATRIX = 14
+_MAT5_NUMERIC_CLASSES = range(6, 16)  # double, single, int8 ... uint64
+
+
+class _H5MatArray:
+    # HDF5 데이터셋은 MATLAB 배열의 차원이 뒤집혀 저장되므로 인덱스와 결과를 다시 뒤집음
+    def __init__(self, mat_file, var_name):
+        try:
+            import h5py
+        except ImportError:
+            raise ImportError(f"MATLAB v7.3 파일을 읽으려면 h5py 패키지가 필요합니다: {mat_file}")
+        self._file = h5py.File(mat_file, 'r')
+        self._ds = self._file[var_name]
+        self.shape = tuple(reversed(self._ds.shape))
+        self.ndim = len(self.shape)
+        self.dtype = self._ds.dtype
+        self.mat_source = (mat_file, var_name)
+
+    def __getitem__(self, key):
+        if not isinstance(key, tuple):
+            key = (key,)
+        if Ellipsis in key:
+            i = key.index(Ellipsis)
+            key = key[:i] + (slice(None),) * (self.ndim - len(key) + 1) + key[i + 1:]
+        key = key + (slice(None),) * (self.ndim - len(key))
+        return np.transpose(self._ds[tuple(reversed(key))])
+
+    def __array__(self, dtype=None, copy=None):
+        data = self[...]
+        return data if dtype is None else data.astype(dtype)
+
+    def close(self):
+        self._file.close()
+
+
+def _mat5_memmap(mat_file, var_name):
+    with open(mat_file, 'rb') as f:
+        header = f.read(128)
+        if len(header) < 128 or header[126:128] not in (b'IM', b'MI'):
+            return None
+        endian = '<' if header[126:128] == b'IM' else '>'
+        file_size = os.fstat(f.fileno()).st_size
+        pos = 128
+        while pos + 8 <= file_size:
+            f.seek(pos)
+            dtype, nbytes = np.frombuffer(f.read(8), dtype=endian + 'u4')
+            dtype, nbytes = int(dtype), int(nbytes)
+            if dtype >> 16:
+                # small data element (4바이트 태그 + 4바이트 데이터)
+                pos += 8
+                continue
+            next_pos = pos + 8 + nbytes + (-nbytes % 8)
+            if dtype != _MAT5_MATRIX:
+                # 압축 요소(miCOMPRESSED)는 memmap 불가 -> 건너뜀
+                pos = next_pos
+                continue
+
+            def read_sub(offset):
+                # (타입, 데이터 바이트, 데이터 시작 위치, 다음 하위 요소 위치)
+                f.seek(offset)
+                sub_type, sub_bytes = (int(v) for v in np.frombuffer(f.read(8), dtype=endian + 'u4'))
+                if sub_type >> 16:
+                    return sub_type & 0xFFFF, sub_type >> 16, offset + 4, offset + 8
+                return sub_type, sub_bytes, offset + 8, offset + 8 + sub_bytes + (-sub_bytes % 8)
+
+            _, _, flags_at, sub = read_sub(pos + 8)
+            f.seek(flags_at)
+            flags = int(np.frombuffer(f.read(4), dtype=endian + 'u4')[0])
+            mat_class, is_complex = flags & 0xFF, bool(flags & 0x0800)
+            dims_type, dims_bytes, dims_at, sub = read_sub(sub)
+            f.seek(dims_at)
+            dims = np.frombuffer(f.read(dims_bytes), dtype=endian + _MAT5_DTYPES[dims_type])
+            _, name_bytes, name_at, sub = read_sub(sub)
+            f.seek(name_at)
+            name = f.read(name_bytes).decode('ascii', errors='replace')
+            if name == var_name:
+                if mat_class not in _MAT5_NUMERIC_CLASSES or is_complex:
+                    return None
+                data_type, data_bytes, data_at, _ = read_sub(sub)
+                if data_type not in _MAT5_DTYPES:
+                    return None
+                arr = np.memmap(mat_file, dtype=endian + _MAT5_DTYPES[data_type], mode='r',
+                                offset=data_at, shape=tuple(int(d) for d in dims), order='F')
+                arr.mat_source = (mat_file, var_name)
+                return arr
+            pos = next_pos
+    return None
+
+
+def open_mat_array(mat_file, var_name, precision='float64'):
+    with open(mat_file, 'rb') as f:
+        header = f.read(128)
+    if header.startswith(b'MATLAB 7.3'):
+        arr = _H5MatArray(mat_file, var_name)
+    else:
+        arr = _mat5_memmap(mat_file, var_name)
+        if arr is None:
+            import scipy.io
+            arr = scipy.io.loadmat(mat_file, variable_names=[var_name])[var_name]
+    return narrow_array(arr, precision)
+
+
+# ---------------------------------------------------------------------------
+# narrow_array: hydro 배열 ([boxes 또는 faces, time, level])의 자료형 축소
+#   'float64' : 원본 그대로
+#   'float32' : 읽는 구간마다 float32로 변환 (NetCDF 'f' 변수에 기록되는 값과 같음, 중간 배열 크기 1/2)
+#   'int16'   : 전체를 int16 + scale/offset으로 압축해 메모리에 보관 (1/4), 구간을 읽을 때 float32로 복원
+#               NaN은 -32768로 저장했다가 NaN으로 복원, ±inf가 있으면 ValueError
+# ---------------------------------------------------------------------------
+PRECISIONS = ('float64', 'float32', 'int16')
+_INT16_FILL = -32768
+_PACK_TIME_BLOCK = 256
+
+
+class _CastArray:
+    # 지연 접근 배열 (memmap / HDF5)을 읽는 구간마다 dtype으로 변환
+    def __init__(self, base, dtype):
+        self._base = base
+        self.shape = tuple(base.shape)
+        self.ndim = len(self.shape)
+        self.dtype = np.dtype(dtype)
+        self.precision = self.dtype.name
+        self.mat_source = getattr(base, 'mat_source', None)
+
+    def __getitem__(self, key):
+        return np.asarray(self._base[key], dtype=self.dtype)
+
+    def __array__(self, dtype=None, copy=None):
+        data = self[...]
+        return data if dtype is None else data.astype(dtype)
+
+
+class _PackedArray:
+    # int16 압축 자료. 읽은 구간은 float32로 복원
+    def __init__(self, data, scale, offset):
+        self.data = data
+        self.scale = float(scale)
+        self.offset = float(offset)
+        self.shape = tuple(data.shape)
+        self.ndim = len(self.shape)
+        self.dtype = np.dtype(np.float32)
+        self.precision = 'int16'
+
+    def __getitem__(self, key):
+        packed = np.asarray(self.data[key])
+        values = packed.astype(np.float32) * np.float32(self.scale) + np.float32(self.offset)
+        return np.where(packed == _INT16_FILL, np.float32(np.nan), values)
+
+    def __array__(self, dtype=None, copy=None):
+        data = self[...]
+        return data if dtype is None else data.astype(dtype)
+
+
+def _time_blocks(n_time, block=_PACK_TIME_BLOCK):
+    return [(start, min(n_time, start + block)) for start in range(0, n_time, block)]
+
+
+def pack_int16(arr):
+    # time 구간씩 읽어 최솟값/최댓값을 구한 뒤 [-32766, 32766] 범위로 양자화
+    blocks = _time_blocks(arr.shape[1])
+    lo, hi = np.inf, -np.inf
+    for start, stop in blocks:
+        block = np.asarray(arr[:, start:stop, :], dtype=np.float64)
+        if np.isinf(block).any():
+            raise ValueError(f"int16으로 압축할 배열에 ±inf 값이 있습니다 (time {start}~{stop - 1}). "
+                             f"precision='float32'를 사용하세요.")
+        if np.isfinite(block).any():
+            lo, hi = min(lo, np.nanmin(block)), max(hi, np.nanmax(block))
+    if lo > hi:
+        lo = hi = 0.0
+    offset = (hi + lo) / 2.0
+    scale = (hi - lo) / 65532.0 or 1.0
+    data = np.empty(arr.shape, dtype=np.int16)
+    for start, stop in blocks:
+        block = np.asarray(arr[:, start:stop, :], dtype=np.float64)
+        packed = np.round((block - offset) / scale)
+        data[:, start:stop, :] = np.where(np.isnan(block), _INT16_FILL, packed)
+    return _PackedArray(data, scale, offset)
+
+
+def narrow_array(arr, precision='float64'):
+    if precision not in PRECISIONS:
+        raise ValueError(f"알 수 없는 precision: {precision} (가능: {PRECISIONS})")
+    if precision == 'float64':
+        return arr
+    if precision == 'int16':
+        return pack_int16(arr)
+    if type(arr) is np.ndarray:
+        # 이미 메모리에 있는 배열 (loadmat)은 한 번에 변환
+        return arr.astype(np.float32)
+    return _CastArray(arr, np.float32)
+
+
+# ---------------------------------------------------------------------------
+# quantization_report: 원본과 축소 배열의 최대 양자화 오차를 변수별로 계산 (time 구간씩 비교)
+# pairs: {변수명: (원본 배열, narrow_array 결과)}
+# 반환: DataFrame (variable, precision, min, max, max_abs_error, max_rel_error)
+#   max_rel_error는 자료 범위 (max - min) 대비 비율
+# ---------------------------------------------------------------------------
+def quantization_report(pairs):
+    rows = []
+    for name, (original, narrowed) in pairs.items():
+        lo, hi, max_err = np.inf, -np.inf, 0.0
+        for start, stop in _time_blocks(original.shape[1]):
+            ref = np.asarray(original[:, start:stop, :], dtype=np.float64)
+            val = np.asarray(narrowed[:, start:stop, :], dtype=np.float64)
+            if not np.array_equal(np.isnan(ref), np.isnan(val)):
+                raise ValueError(f"{name}: 축소 후 NaN 위치가 원본과 다릅니다.")
+            finite = np.isfinite(ref)
+            if finite.any():
+                lo, hi = min(lo, ref[finite].min()), max(hi, ref[finite].max())
+                max_err = max(max_err, float(np.abs(ref[finite] - val[finite]).max()))
+        value_range = hi - lo if hi > lo else 0.0
+        rows.append({'variable': name, 'precision': getattr(narrowed, 'precision', np.dtype(narrowed.dtype).name),
+                     'min': lo, 'max': hi, 'max_abs_error': max_err,
+                     'max_rel_error': max_err / value_range if value_range else 0.0})
+    return pd.DataFrame(rows)
@@ -6,74 +6,33 @@ Modified on Wed Mar 19 2025
 """
 
 import os
-import scipy.io
 import netCDF4 as nc
 import numpy as np
-import pandas as pd
-
-# 기본 변수 설정
-year = 2019
-
-# 데이터 파일 경로 설정
-base_path = r"D:\Dropbox\y2025\01_Atlantis\05_hycom"
-fpath = os.path.join(base_path, str(year))
-fnameTemp = f"av_temp_{year}.mat"
-fnameSalt = f"av_salt_{year}.mat"
-
-# .mat 파일 로드
-mat_file_name1 = os.path.join(fpath, fnameTemp)
-av_temp_data = scipy.io.loadmat(mat_file_name1)
-mat_file_name2 = os.path.join(fpath, fnameSalt)
-av_salt_data = scipy.io.loadmat(mat_file_name2)
-
-# mat 파일 내 변수 (형상: [boxes, time, level]로 가정)
-temp = av_temp_data['av_temp']
-salt = av_salt_data['av_salt']
-vflux = salt * 0  # 강제 0으로 초기화
-
-# 차원 정보
-n_time = np.size(temp, 1)  # 729 (12시간 간격 1년치)
-n_boxes = 232
-n_levels = 6
-
-
-# 12시간 간격의 날짜·시간 시리즈 생성 
-start_time = pd.to_datetime(f"{year}-01-01 00:00:00")
-end_time = pd.to_datetime(f"{year}-12-31 12:00:00")
-time_vector = pd.date_range(start=start_time, end=end_time, freq="12H")
-
-if len(time_vector) != n_time:
-    print(f"Warning: 예상 time 스탭 {n_time}개와 생성된 스탭 {len(time_vector)}개가 일치하지 않습니다.")
-
-
-# mat 파일에서 불러온 데이터는 [boxes, time, level] 형태이므로, 최종 NetCDF에 맞게 [time, boxes, level]로 전치
-temp_full = np.transpose(temp, (1, 0, 2))
-salt_full = np.transpose(salt, (1, 0, 2))
-vflux_full = np.transpose(vflux, (1, 0, 2))
-
-# 월별로 분할하여 NetCDF 파일로 저장 (월별 파일명 예: avs_2021_01.nc)
-for month in range(1, 13):
-    # time_vector에서 해당 월에 해당하는 인덱스 추출
-    month_mask = time_vector.month == month
-    month_indices = np.where(month_mask)[0]
-    if len(month_indices) == 0:
-        continue  # 해당 월 데이터가 없으면 건너뜀
-
-    subset_time_vector = time_vector[month_mask]
-
-    # 각 월의 첫째 날을 기준으로 경과일(day) 계산
-    month_ref_time = pd.to_datetime(f"{year}-{month:02d}-01 00:00:00")
-    subset_days = (subset_time_vector - month_ref_time).days + (subset_time_vector - month_ref_time).seconds / 86400.0
-    
-    subset_temp = temp_full[month_mask, :, :]  # shape: (n_time_month, boxes, levels)
-    subset_salt = salt_full[month_mask, :, :]
-    subset_vflux = vflux_full[month_mask, :, :]
-
-    # NetCDF 파일 생성 (예: "avs_2021_01.nc", "avs_2021_02.nc", …)
-    nc_filename = os.path.join(fpath, f"avs_{year}_{month:02d}.nc")
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from Atlantis_hydro_tools import (share_array, attach_array, release_array, default_workers,
+                                 make_hydro_grid, output_options, open_mat_array)
+# Atlantis_trace는 initial 디렉터리 모듈 (Atlantis_hydro_tools를 import할 때 경로 추가)
+from Atlantis_trace import traced, count_file, with_parent
+
+# ---------------------------------------------------------------------------
+# write_avs_month: 한 달치 수온/염분 자료를 NetCDF 파일로 저장
+# subset_temp, subset_salt: [boxes, time, level] 배열의 해당 월 부분 (전치하지 않음)
+# vertical flux는 항상 0: 월 전체 배열 대신 chunk 하나 크기의 0 배열을 time chunk마다 기록
+# (fill value로만 두면 netCDF4가 읽을 때 전부 mask 하므로 0을 직접 쓰고 _FillValue는 두지 않음)
+# 수온 / 염분의 NaN (물이 없는 층: BGM botz 아래, 섬 box)은 _FillValue (-10e20)로 기록
+# dt (초), time_units는 make_hydro_grid 결과, var_opts (압축 / chunk)는 output_options 결과
+# ---------------------------------------------------------------------------
+@traced('hydro.write_avs_month', 'nc_filename')
+def write_avs_month(nc_filename, subset_days, subset_temp, subset_salt, dt=43200,
+                    time_units='days since 2019-01-01 00:00:00', var_opts=None):
+    n_boxes  = subset_temp.shape[0]
+    n_levels = subset_temp.shape[2]
+
     if os.path.exists(nc_filename):
         os.remove(nc_filename)
     ds = nc.Dataset(nc_filename, 'w', format='NETCDF4')
+    var_opts = var_opts or {}
 
     # 차원 생성
     ds.createDimension('time', None)
@@ -84,15 +43,17 @@ for month in range(1, 13):
     time_var = ds.createVariable('time', 'd', ('time',))
     level_var = ds.createVariable('level', 'i', ('level',))
     boxes_var = ds.createVariable('boxes', 'i', ('boxes',))
-    temperature_var = ds.createVariable('temperature', 'f', ('time', 'boxes', 'level',))
-    salinity_var = ds.createVariable('salinity', 'f', ('time', 'boxes', 'level',))
-    verticalflux_var = ds.createVariable('verticalflux', 'f', ('time', 'boxes', 'level',))
+    temperature_var = ds.createVariable('temperature', 'f', ('time', 'boxes', 'level',), fill_value=-10e20,
+                                        **var_opts)
+    salinity_var = ds.createVariable('salinity', 'f', ('time', 'boxes', 'level',), fill_value=-10e20, **var_opts)
+    verticalflux_var = ds.createVariable('verticalflux', 'f', ('time', 'boxes', 'level',), fill_value=False,
+                                         **var_opts)
 
     # 변수 속성 지정
     time_var.long_name = 'time'
-    time_var.units = 'days since 2019-01-01 00:00:00'
+    time_var.units = time_units
     time_var.calendar = 'gregorian'
-    time_var.dt = 43200  # 12시간 간격이므로 0.5일
+    time_var.dt = dt  # 초 단위
 
     boxes_var.long_name = 'Box IDs'
 
@@ -101,24 +62,102 @@ for month in range(1, 13):
 
     temperature_var.long_name = 'temperature volume averaged'
     temperature_var.units = 'degree_C'
-    temperature_var.FillValue = -10e20
 
     salinity_var.long_name = 'salinity volume averaged'
     salinity_var.units = '1e-3'
-    salinity_var.FillValue = -10e20
 
     verticalflux_var.long_name = 'vertical flux averaged over floor of box'
     verticalflux_var.positive = 'upward'
     verticalflux_var.units = 'm^3/s'
-    verticalflux_var.FillValue = -10e20
 
-    # 변수 데이터 할당
+    # 변수 데이터 할당 ([boxes, time, level] -> [time, boxes, level] 은 월 단위로만 전치)
     boxes_var[:] = np.arange(n_boxes)
     level_var[:] = np.arange(1, n_levels + 1)
     time_var[:] = subset_days
-    temperature_var[:, :, :] = subset_temp
-    salinity_var[:, :, :] = subset_salt
-    verticalflux_var[:, :, :] = subset_vflux
+    temperature_var[:, :, :] = np.ma.masked_invalid(np.transpose(subset_temp, (1, 0, 2)))
+    salinity_var[:, :, :] = np.ma.masked_invalid(np.transpose(subset_salt, (1, 0, 2)))
+    n_time = len(subset_days)
+    block = var_opts.get('chunksizes', (n_time,))[0] or n_time
+    zeros = np.zeros((min(block, n_time), n_boxes, n_levels), dtype=np.float32)
+    for start in range(0, n_time, block):
+        stop = min(n_time, start + block)
+        verticalflux_var[start:stop, :, :] = zeros[:stop - start]
 
     ds.close()
-    print(f"Saved month {month:02d} data to {nc_filename}")
+    count_file('bytes_written', nc_filename)
+
+
+def _avs_month_worker(temp_spec, salt_spec, start, stop, nc_filename, subset_days, write_kw):
+    # 작업 프로세스: 메모리 매핑된 temp/salt ([boxes, time, level])에서 해당 월 구간만 읽어 저장
+    temp = attach_array(temp_spec)
+    salt = attach_array(salt_spec)
+    write_avs_month(nc_filename, subset_days, temp[:, start:stop, :], salt[:, start:stop, :], **write_kw)
+    return nc_filename
+
+
+# ---------------------------------------------------------------------------
+# write_avs_monthly: 12개월 avs_{year}_{month}.nc 파일을 프로세스 풀로 동시에 생성
+# temp, salt: .mat 원본 형상 [boxes, time, level], grid: make_hydro_grid 결과 (시간 축, dt, chunk)
+# 각 월은 time 축의 연속 구간 slice로 읽음 (boolean mask 복사본 없음)
+# n_workers=1 이면 현재 프로세스에서 순서대로 실행, months로 일부 월만 생성 가능
+# profile: 'fast' | 'compressed' | 'timeseries' (Atlantis_hydro_tools.OUTPUT_PROFILES)
+# ---------------------------------------------------------------------------
+@traced('hydro.write_avs_monthly', 'fpath', 'profile')
+def write_avs_monthly(temp, salt, grid, fpath, n_workers=None, months=None, profile='fast'):
+    year = grid['year']
+    write_kw = {'dt': grid['dt'], 'time_units': grid['time_units'], 'var_opts': output_options(grid, 'avs', profile)}
+    jobs = []
+    for month, start, stop, subset_days in grid['months']:
+        if months is not None and month not in months:
+            continue
+        # NetCDF 파일 생성 (예: "avs_2021_01.nc", "avs_2021_02.nc", …)
+        nc_filename = os.path.join(fpath, f"avs_{year}_{month:02d}.nc")
+        jobs.append((month, start, stop, nc_filename, subset_days))
+
+    n_workers = n_workers or default_workers(len(jobs))
+    if n_workers == 1:
+        for month, start, stop, nc_filename, subset_days in jobs:
+            write_avs_month(nc_filename, subset_days, temp[:, start:stop, :], salt[:, start:stop, :], **write_kw)
+            print(f"Saved month {month:02d} data to {nc_filename}")
+        return [job[3] for job in jobs]
+
+    temp_spec = share_array(temp)
+    salt_spec = share_array(salt)
+    try:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            futures = {pool.submit(with_parent(_avs_month_worker), temp_spec, salt_spec, start, stop,
+                                   nc_filename, subset_days, write_kw): month
+                       for month, start, stop, nc_filename, subset_days in jobs}
+            for future in as_completed(futures):
+                print(f"Saved month {futures[future]:02d} data to {future.result()}")
+    finally:
+        release_array(temp_spec)
+        release_array(salt_spec)
+    return [job[3] for job in jobs]
+
+
+if __name__ == "__main__":
+    # 기본 변수 설정
+    year = 2019
+    n_workers = None  # None이면 CPU 코어 수 (최대 12)
+
+    # 데이터 파일 경로 설정
+    base_path = r"D:\Dropbox\y2025\01_Atlantis\05_hycom"
+    fpath = os.path.join(base_path, str(year))
+    fnameTemp = f"av_temp_{year}.mat"
+    fnameSalt = f"av_salt_{year}.mat"
+
+    # .mat 파일 열기 (전체를 메모리에 올리지 않고 월별 구간만 읽음)
+    mat_file_name1 = os.path.join(fpath, fnameTemp)
+    mat_file_name2 = os.path.join(fpath, fnameSalt)
+
+    # mat 파일 내 변수 (형상: [boxes, time, level]로 가정)
+    # 읽는 시점에 float32로 변환 (NetCDF 'f' 변수와 같은 값)
+    temp = open_mat_array(mat_file_name1, 'av_temp', precision='float32')
+    salt = open_mat_array(mat_file_name2, 'av_salt', precision='float32')
+
+    # 차원 / 시간 축 정보 (dt는 HYDRO_DT = 12시간, time 개수가 1년을 넘으면 ValueError, 모자라면 경고)
+    grid = make_hydro_grid(year, {'temp': temp, 'salt': salt})
+
+    # 월별로 분할하여 NetCDF 파일로 저장 (월별 파일명 예: avs_2021_01.nc)
+    write_avs_monthly(temp, salt, grid, fpath, n_workers=n_workers)
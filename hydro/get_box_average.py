@@ -0,0 +1,534 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Apr 16 10:41:05 2025
+
+@author: Ukjae
+
+격자 해양 모델 출력 (HYCOM 형식 NetCDF: time, depth, lat, lon)에서
+av_temp_{year}.mat, av_salt_{year}.mat, trans_new_{year}.mat 을 직접 생성 (MATLAB 단계 대체)
+
+  1. BGM box 다각형 / face 선분과 cum_depths 층으로 격자 cell -> box(face) x 층 희소 가중치 행렬을 한 번 계산
+     - box 평균   : cell 면적 x 층과 겹치는 두께 (box 안에 중심이 있는 cell)
+     - face 수송량 : face를 따라 나눈 구간마다 가장 가까운 cell의 (u, v) x 왼쪽 법선 길이 (m) x 두께 (m)
+  2. time 구간씩 읽어 희소 행렬 곱으로 box 평균 수온/염분과 face 수송량 (m^3/s) 계산
+같은 BGM / 층 / 격자라면 가중치는 여러 연도에 그대로 사용 (get_box_weights)
+가중치는 BGM 내용 해시 + 격자 좌표 해시 + cum_depths 를 키로 하는 비압축 .npz (CSR)로 저장하고,
+다음 실행에서는 다시 계산하지 않고 memory map으로 엶
+출력 형상은 기존 .mat과 같음: av_temp / av_salt [boxes, time, level], T [faces, time, level] (level 0 = 표층)
+물이 있는 box 층 (BGM botz 위)은 모두 값을 채움
+  - 격자 cell 중심이 하나도 없는 (격자보다 작은) box는 box 안쪽 점에 가장 가까운 cell 사용
+  - 모델 수심이 BGM보다 얕아 자료가 없는 층은 같은 box의 가장 가까운 위 층 값 (위에 없으면 아래 층)
+botz 아래 층과 섬 box만 NaN -> avs 파일에는 temperature / salinity의 _FillValue (-10e20)로 기록
+"""
+
+import os
+import glob
+import struct
+import hashlib
+import zipfile
+import tempfile
+import threading
+import numpy as np
+import pandas as pd
+import scipy.io
+import scipy.sparse as sp
+import netCDF4
+
+from Atlantis_hydro_tools import make_face_topology, year_seconds
+# Atlantis_trace는 initial 디렉터리 모듈 (Atlantis_hydro_tools를 import할 때 경로 추가)
+from Atlantis_trace import traced, count, count_file
+from Atlantis_init_tools import load_bgm
+
+# HYCOM 변수 / 좌표 이름 (다른 모델은 var_names로 지정)
+HYCOM_VARS = {'temp': 'water_temp', 'salt': 'salinity', 'u': 'water_u', 'v': 'water_v'}
+_COORD_NAMES = {
+    'lon': ('lon', 'longitude', 'x'),
+    'lat': ('lat', 'latitude', 'y'),
+    'depth': ('depth', 'z', 'lev', 'level'),
+    'time': ('time', 't', 'MT'),
+}
+BOXAVG_CHUNK_BYTES = 64 * 1024 ** 2
+_M_PER_DEG_LAT = 110574.0
+_M_PER_DEG_LON = 111320.0
+# netCDF4 / libnetcdf는 thread-safe 하지 않으므로 이 모듈의 모든 Dataset 열기 / 읽기는 이 lock 안에서
+_NC_LOCK = threading.RLock()
+
+
+# ---------------------------------------------------------------------------
+# read_ocean_grid: NetCDF 파일의 lon / lat / depth 좌표 (1차원 정규 격자)
+# 반환 dict: lon, lat, depth (양수, 아래 방향), names (실제 좌표 변수 이름)
+# ---------------------------------------------------------------------------
+def _find_coord(ds, kind):
+    for name in _COORD_NAMES[kind]:
+        if name in ds.variables:
+            return name
+    raise ValueError(f"{ds.filepath()}에서 {kind} 좌표를 찾을 수 없습니다 (후보: {_COORD_NAMES[kind]}).")
+
+
+def read_ocean_grid(nc_file):
+    with _NC_LOCK, netCDF4.Dataset(nc_file) as ds:
+        names = {kind: _find_coord(ds, kind) for kind in ('lon', 'lat', 'depth')}
+        grid = {kind: np.asarray(ds.variables[name][:], dtype=float) for kind, name in names.items()}
+    for kind in ('lon', 'lat'):
+        if grid[kind].ndim != 1:
+            raise ValueError(f"{nc_file}: {kind} 좌표가 1차원이 아닙니다 (곡선 격자는 지원하지 않음).")
+        if len(grid[kind]) > 1 and np.any(np.diff(grid[kind]) <= 0):
+            raise ValueError(f"{nc_file}: {kind} 좌표가 증가하는 순서가 아닙니다.")
+    grid['depth'] = np.abs(grid['depth'])
+    grid['names'] = names
+    return grid
+
+
+# ---------------------------------------------------------------------------
+# points_in_polygon: 점 (x, y)들이 다각형 안에 있는지 (ray casting, 변마다 전체 점을 한 번에 계산)
+# ---------------------------------------------------------------------------
+def points_in_polygon(x, y, poly):
+    inside = np.zeros(np.shape(x), dtype=bool)
+    px, py = poly[:, 0], poly[:, 1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for k in range(len(poly)):
+            x1, y1, x2, y2 = px[k - 1], py[k - 1], px[k], py[k]
+            crosses = (y1 > y) != (y2 > y)
+            x_cross = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+            inside ^= crosses & (x < x_cross)
+    return inside
+
+
+def _bgm_to_lonlat(bgm, grid_lon):
+    # BGM 좌표 -> (lon, lat). projection이 lonlat이 아니면 pyproj로 변환
+    projection = bgm['header'].get('projection', 'proj=lonlat')
+    if 'lonlat' in projection or 'longlat' in projection or 'latlong' in projection:
+        def to_lonlat(xy):
+            return np.asarray(xy, dtype=float).reshape(-1, 2).copy()
+    else:
+        try:
+            from pyproj import Transformer
+        except ImportError:
+            raise ImportError(f"BGM projection ({projection})을 경위도로 바꾸려면 pyproj 패키지가 필요합니다.")
+        proj = ' '.join(p if p.startswith('+') else f"+{p}" for p in projection.split())
+        transformer = Transformer.from_crs(proj, 'EPSG:4326', always_xy=True)
+
+        def to_lonlat(xy):
+            xy = np.asarray(xy, dtype=float).reshape(-1, 2)
+            return np.column_stack(transformer.transform(xy[:, 0], xy[:, 1]))
+
+    wrap = np.nanmax(grid_lon) > 180.0
+    def convert(xy):
+        lonlat = to_lonlat(xy)
+        if wrap:
+            # 격자가 0 ~ 360 경도이면 BGM 경도도 같은 범위로
+            lonlat[:, 0] = np.where(lonlat[:, 0] < 0, lonlat[:, 0] + 360.0, lonlat[:, 0])
+        return lonlat
+    return convert
+
+
+def _layer_overlap(depth, tops, bottoms):
+    # 모델 층 (depth 중심, 경계는 중간점)과 Atlantis 층 [tops, bottoms]이 겹치는 두께 (m): [len(tops), len(depth)]
+    edges = np.empty(len(depth) + 1)
+    edges[0] = 0.0
+    edges[1:-1] = (depth[1:] + depth[:-1]) / 2.0
+    edges[-1] = depth[-1] + (depth[-1] - depth[-2] if len(depth) > 1 else depth[-1])
+    top = np.maximum(tops[:, None], edges[None, :-1])
+    bot = np.minimum(bottoms[:, None], edges[None, 1:])
+    return np.clip(bot - top, 0.0, None)
+
+
+def _nearest_index(coord, values):
+    idx = np.clip(np.searchsorted(coord, values), 1, len(coord) - 1)
+    return np.where(np.abs(values - coord[idx - 1]) <= np.abs(coord[idx] - values), idx - 1, idx)
+
+
+# ---------------------------------------------------------------------------
+# make_box_weights: 격자 cell -> box / face x 층 희소 가중치 행렬 계산
+# bgm_file, cum_depths (make_map_data_init과 같은 누적 깊이, 0부터), ocean_grid (read_ocean_grid 결과)
+# 행 순서는 box * n_layers + layer (face도 같음), 열은 읽는 창 (window) 안의 depth * n_cell + cell
+# box 층 두께는 botz까지, face 층 두께는 양쪽 box 중 얕은 쪽 botz까지 (섬 box는 0)
+# cell 중심이 하나도 없는 box는 box 안쪽 점 (inside, 없으면 꼭짓점 평균)에 가장 가까운 cell 하나 사용
+# face_samples: face 하나를 나누는 구간 수 (None이면 격자 간격의 절반 정도가 되도록)
+# 반환 dict: n_boxes, n_faces, n_layers, n_depth, window (j0, j1, i0, i1),
+#            box (가중치), box_cells (box별 cell 수, 가장 가까운 cell을 쓴 box는 0),
+#            box_wet ([boxes, layers] 물이 있는 층), face_u, face_v (u, v에 곱할 m^2), grid_shape
+# ---------------------------------------------------------------------------
+@traced('boxavg.weights', 'bgm_file')
+def make_box_weights(bgm_file, cum_depths, ocean_grid, face_samples=None):
+    bgm = load_bgm(bgm_file)  # ATLANTIS_BGM_CACHE를 지정하면 BGM 캐시 사용
+    topology = make_face_topology(bgm)
+    lon, lat, depth = ocean_grid['lon'], ocean_grid['lat'], ocean_grid['depth']
+    to_lonlat = _bgm_to_lonlat(bgm, lon)
+
+    cum = np.asarray(cum_depths, dtype=float)
+    n_layers = len(cum) - 1
+    n_boxes, n_faces = topology['n_boxes'], topology['n_faces']
+    wet_depth = np.nan_to_num(-topology['botz'], nan=0.0).clip(min=0.0)
+
+    polygons = [to_lonlat(v) for v in bgm['box_vert']]
+    inside_pts = to_lonlat(topology['inside'])
+    pt1, pt2 = to_lonlat(topology['pt1']), to_lonlat(topology['pt2'])
+
+    # 모든 box / face를 포함하는 격자 창 (한 cell 여유)
+    points = np.vstack([p for p in polygons if len(p)] + [pt1, pt2])
+    points = points[np.isfinite(points).all(axis=1)]
+    j0 = max(0, int(np.searchsorted(lat, points[:, 1].min())) - 1)
+    j1 = min(len(lat), int(np.searchsorted(lat, points[:, 1].max())) + 1)
+    i0 = max(0, int(np.searchsorted(lon, points[:, 0].min())) - 1)
+    i1 = min(len(lon), int(np.searchsorted(lon, points[:, 0].max())) + 1)
+    wlon, wlat = lon[i0:i1], lat[j0:j1]
+    n_x, n_cell = len(wlon), len(wlon) * len(wlat)
+    n_depth = len(depth)
+
+    # 격자 cell 면적 (m^2, 경위도 간격 x cos(lat))
+    dlon = np.gradient(lon)[i0:i1] if len(lon) > 1 else np.ones(n_x)
+    dlat = np.gradient(lat)[j0:j1] if len(lat) > 1 else np.ones(len(wlat))
+    cell_area = (dlat[:, None] * _M_PER_DEG_LAT) * (dlon[None, :] * _M_PER_DEG_LON * np.cos(np.radians(wlat))[:, None])
+    cell_lon, cell_lat = np.meshgrid(wlon, wlat)
+
+    # box 평균 가중치: 행 box * n_layers + layer, 열 depth * n_cell + cell
+    layer_dz = _layer_overlap(depth, np.repeat(cum[None, :-1], n_boxes, 0).ravel(),
+                              np.minimum(wet_depth[:, None], cum[None, 1:]).ravel()).reshape(n_boxes, n_layers, n_depth)
+    box_wet = layer_dz.sum(axis=2) > 0
+    rows, cols, vals = [], [], []
+    box_cells = np.zeros(n_boxes, dtype=int)
+    nearest = []
+    for b, poly in enumerate(polygons):
+        if len(poly) < 3 or wet_depth[b] <= 0:
+            continue
+        lo, hi = poly.min(axis=0), poly.max(axis=0)
+        jj = np.flatnonzero((wlat >= lo[1]) & (wlat <= hi[1]))
+        ii = np.flatnonzero((wlon >= lo[0]) & (wlon <= hi[0]))
+        cells = np.zeros(0, dtype=int)
+        if len(jj) and len(ii):
+            sub = np.ix_(jj, ii)
+            inside = points_in_polygon(cell_lon[sub], cell_lat[sub], poly)
+            cells = (jj[:, None] * n_x + ii[None, :])[inside]
+        box_cells[b] = len(cells)
+        if not len(cells):
+            x, y = inside_pts[b] if np.isfinite(inside_pts[b]).all() else np.nanmean(poly, axis=0)
+            cells = _nearest_index(wlat, np.array([y])) * n_x + _nearest_index(wlon, np.array([x]))
+            nearest.append(b)
+        layer, k = np.nonzero(layer_dz[b])
+        if not len(layer):
+            continue
+        area = cell_area.ravel()[cells]
+        rows.append(np.repeat(b * n_layers + layer, len(cells)))
+        cols.append((k[:, None] * n_cell + cells[None, :]).ravel())
+        vals.append((layer_dz[b, layer, k][:, None] * area[None, :]).ravel())
+    box = sp.csr_matrix((np.concatenate(vals) if vals else np.zeros(0),
+                         (np.concatenate(rows) if rows else np.zeros(0, int),
+                          np.concatenate(cols) if cols else np.zeros(0, int))),
+                        shape=(n_boxes * n_layers, n_depth * n_cell))
+
+    # face 수송량 가중치: 구간마다 가장 가까운 cell의 u에 -dy (m), v에 dx (m) (왼쪽 법선 x 길이) x 두께
+    lr = topology['lr']
+    face_depth = np.where((lr >= 0).all(axis=1), np.minimum(wet_depth[lr[:, 0]], wet_depth[lr[:, 1]]), 0.0)
+    face_dz = _layer_overlap(depth, np.repeat(cum[None, :-1], n_faces, 0).ravel(),
+                             np.minimum(face_depth[:, None], cum[None, 1:]).ravel()).reshape(n_faces, n_layers, n_depth)
+    spacing = min(np.median(np.abs(np.diff(wlon))) if n_x > 1 else 1.0,
+                  np.median(np.abs(np.diff(wlat))) if len(wlat) > 1 else 1.0)
+    rows, cols, u_vals, v_vals = [], [], [], []
+    for f in range(n_faces):
+        layer, k = np.nonzero(face_dz[f])
+        if not len(layer) or not np.isfinite([pt1[f], pt2[f]]).all():
+            continue
+        seg = pt2[f] - pt1[f]
+        n_seg = face_samples or max(1, int(np.ceil(np.hypot(*seg) / (spacing / 2.0))))
+        frac = (np.arange(n_seg) + 0.5) / n_seg
+        s_lon, s_lat = pt1[f, 0] + frac * seg[0], pt1[f, 1] + frac * seg[1]
+        dx = seg[0] / n_seg * _M_PER_DEG_LON * np.cos(np.radians(s_lat))
+        dy = np.full(n_seg, seg[1] / n_seg * _M_PER_DEG_LAT)
+        cells = _nearest_index(wlat, s_lat) * n_x + _nearest_index(wlon, s_lon)
+        dz = face_dz[f, layer, k]
+        rows.append(np.repeat(f * n_layers + layer, n_seg))
+        cols.append((k[:, None] * n_cell + cells[None, :]).ravel())
+        u_vals.append((dz[:, None] * -dy[None, :]).ravel())
+        v_vals.append((dz[:, None] * dx[None, :]).ravel())
+    shape = (n_faces * n_layers, n_depth * n_cell)
+    rows = np.concatenate(rows) if rows else np.zeros(0, int)
+    cols = np.concatenate(cols) if cols else np.zeros(0, int)
+    face_u = sp.csr_matrix((np.concatenate(u_vals) if u_vals else np.zeros(0), (rows, cols)), shape=shape)
+    face_v = sp.csr_matrix((np.concatenate(v_vals) if v_vals else np.zeros(0), (rows, cols)), shape=shape)
+
+    if nearest:
+        print(f"격자 cell 중심이 하나도 없는 box {len(nearest)}개 (가장 가까운 cell 사용): {nearest}")
+    return {'n_boxes': n_boxes, 'n_faces': n_faces, 'n_layers': n_layers, 'n_depth': n_depth,
+            'window': (j0, j1, i0, i1), 'grid_shape': (n_depth, len(lat), len(lon)),
+            'box': box, 'box_cells': box_cells, 'box_wet': box_wet, 'face_u': face_u, 'face_v': face_v}
+
+
+# ---------------------------------------------------------------------------
+# get_box_weights: 가중치를 캐시에서 읽거나 계산해서 저장
+#   키 = BGM 파일 내용 해시 + 격자 (lon, lat, depth) 해시 + cum_depths + 캐시 버전
+#   cache_dir (또는 환경 변수 ATLANTIS_WEIGHTS_CACHE)의 boxw_{키}.npz 에 CSR 배열 (data, indices, indptr)을
+#   비압축으로 저장하고, 읽을 때는 zip 안의 배열 위치를 찾아 np.memmap으로 엶 (복사 없음, 여러 프로세스가 공유)
+#   같은 프로세스 안에서는 한 번 연 가중치를 다시 사용 (키마다 lock: 여러 스레드가 같은 가중치를 동시에 계산하지 않음)
+#   같은 파일 (경로 + 수정 시각)이면 격자를 다시 읽지 않고 바로 반환
+# cache_dir가 없으면 계산만 하고 저장하지 않음
+# ---------------------------------------------------------------------------
+WEIGHTS_CACHE_DIR = os.environ.get('ATLANTIS_WEIGHTS_CACHE')
+_WEIGHTS_VERSION = 2
+_WEIGHT_MATRICES = ('box', 'face_u', 'face_v')
+_WEIGHTS = {}
+_WEIGHTS_FILES = {}
+_WEIGHTS_LOCKS = {}
+_WEIGHTS_LOCKS_LOCK = threading.Lock()
+
+
+def box_weights_key(bgm_file, cum_depths, ocean_grid):
+    h = hashlib.sha1()
+    with open(bgm_file, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    for kind in ('lon', 'lat', 'depth'):
+        coord = np.ascontiguousarray(ocean_grid[kind], dtype=np.float64)
+        h.update(f"{kind}{coord.shape}".encode())
+        h.update(coord.tobytes())
+    h.update(np.asarray(cum_depths, dtype=np.float64).tobytes())
+    h.update(f"v{_WEIGHTS_VERSION}".encode())
+    return h.hexdigest()
+
+
+def save_box_weights(weights, path):
+    arrays = {
+        'version': np.array(_WEIGHTS_VERSION),
+        'counts': np.array([weights['n_boxes'], weights['n_faces'], weights['n_layers'], weights['n_depth']]),
+        'window': np.array(weights['window']),
+        'grid_shape': np.array(weights['grid_shape']),
+        'box_cells': weights['box_cells'],
+        'box_wet': weights['box_wet'],
+    }
+    for name in _WEIGHT_MATRICES:
+        matrix = weights[name].tocsr()
+        arrays[f'{name}_shape'] = np.array(matrix.shape)
+        arrays[f'{name}_data'] = matrix.data
+        arrays[f'{name}_indices'] = matrix.indices
+        arrays[f'{name}_indptr'] = matrix.indptr
+    # 동시 실행 중 다른 프로세스 / 스레드가 반쯤 쓰인 파일을 읽지 않도록 고유한 임시 파일 후 교체 (np.savez는 비압축)
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path)[:-4] + '.', suffix='.tmp.npz',
+                                    dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, **arrays)
+        os.chmod(tmp_path, 0o644)  # mkstemp은 0600으로 만들므로 다른 사용자도 캐시를 읽을 수 있게
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _npz_memmap(path):
+    # 비압축 .npz 의 각 .npy 항목을 파일 안 위치 그대로 memmap
+    arrays = {}
+    with zipfile.ZipFile(path) as zf, open(path, 'rb') as f:
+        for info in zf.infolist():
+            if info.compress_type != zipfile.ZIP_STORED or not info.filename.endswith('.npy'):
+                raise ValueError(f"{path}: 압축된 항목 {info.filename}은 memmap할 수 없습니다.")
+            f.seek(info.header_offset)
+            local = f.read(30)
+            name_len, extra_len = struct.unpack('<HH', local[26:30])
+            f.seek(info.header_offset + 30 + name_len + extra_len)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+            name = info.filename[:-4]
+            if dtype.hasobject:
+                raise ValueError(f"{path}: {name}은 object 배열입니다.")
+            if int(np.prod(shape)) == 0:
+                arrays[name] = np.zeros(shape, dtype=dtype)
+            else:
+                arrays[name] = np.memmap(path, dtype=dtype, mode='r', offset=f.tell(), shape=shape,
+                                         order='F' if fortran else 'C')
+    return arrays
+
+
+def load_box_weights(path):
+    d = _npz_memmap(path)
+    if int(d['version']) != _WEIGHTS_VERSION:
+        return None
+    n_boxes, n_faces, n_layers, n_depth = (int(v) for v in d['counts'])
+    weights = {'n_boxes': n_boxes, 'n_faces': n_faces, 'n_layers': n_layers, 'n_depth': n_depth,
+               'window': tuple(int(v) for v in d['window']), 'grid_shape': tuple(int(v) for v in d['grid_shape']),
+               'box_cells': np.asarray(d['box_cells']), 'box_wet': np.asarray(d['box_wet'])}
+    for name in _WEIGHT_MATRICES:
+        weights[name] = sp.csr_matrix((d[f'{name}_data'], d[f'{name}_indices'], d[f'{name}_indptr']),
+                                      shape=tuple(int(v) for v in d[f'{name}_shape']), copy=False)
+    return weights
+
+
+def _weights_lock(key):
+    with _WEIGHTS_LOCKS_LOCK:
+        return _WEIGHTS_LOCKS.setdefault(key, threading.Lock())
+
+
+def _weights_file_key(bgm_file, cum_depths, nc_file):
+    # 격자를 읽기 전에 찾는 키: 파일 경로 + 수정 시각 + cum_depths
+    return (os.path.abspath(bgm_file), os.path.getmtime(bgm_file), tuple(float(d) for d in cum_depths),
+            os.path.abspath(nc_file), os.path.getmtime(nc_file))
+
+
+def get_box_weights(bgm_file, cum_depths, nc_file, cache_dir=None):
+    file_key = _weights_file_key(bgm_file, cum_depths, nc_file)
+    if file_key in _WEIGHTS_FILES:
+        return _WEIGHTS_FILES[file_key]
+    with _weights_lock(file_key):
+        if file_key not in _WEIGHTS_FILES:
+            # 격자는 lock 안에서만 읽음 (같은 파일을 여러 스레드가 동시에 열지 않음)
+            ocean_grid = read_ocean_grid(nc_file)
+            key = box_weights_key(bgm_file, cum_depths, ocean_grid)
+            with _weights_lock(key):
+                if key not in _WEIGHTS:
+                    _WEIGHTS[key] = _load_or_make_weights(bgm_file, cum_depths, ocean_grid, key, cache_dir)
+            _WEIGHTS_FILES[file_key] = _WEIGHTS[key]
+    return _WEIGHTS_FILES[file_key]
+
+
+def _load_or_make_weights(bgm_file, cum_depths, ocean_grid, key, cache_dir):
+    cache_dir = cache_dir or WEIGHTS_CACHE_DIR
+    cache_file = os.path.join(cache_dir, f"boxw_{key}.npz") if cache_dir else None
+    weights = None
+    if cache_file is not None and os.path.exists(cache_file):
+        try:
+            weights = load_box_weights(cache_file)
+        except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+            weights = None
+        if weights is not None:
+            count('weights_cache_hit')
+    if weights is None:
+        weights = make_box_weights(bgm_file, cum_depths, ocean_grid)
+        if cache_file is not None:
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                save_box_weights(weights, cache_file)
+                count_file('bytes_written', cache_file)
+            except OSError as e:
+                print(f"가중치 캐시 저장 실패 ({cache_file}): {e}")
+    return weights
+
+
+# ---------------------------------------------------------------------------
+# ocean_time_index: 여러 NetCDF 파일에서 해당 연도의 시간 단계 찾기 (파일 이름 순서)
+# 반환: [(파일, time 인덱스 배열)], 시각 (DatetimeIndex), dt (초, 간격이 일정하지 않으면 ValueError)
+# ---------------------------------------------------------------------------
+def ocean_time_index(nc_files, year):
+    selected, times = [], []
+    for nc_file in sorted(nc_files):
+        with _NC_LOCK, netCDF4.Dataset(nc_file) as ds:
+            t_var = ds.variables[_find_coord(ds, 'time')]
+            dates = netCDF4.num2date(t_var[:], t_var.units, getattr(t_var, 'calendar', 'standard'),
+                                     only_use_cftime_datetimes=False, only_use_python_datetimes=True)
+        stamps = pd.to_datetime(np.atleast_1d(dates))
+        idx = np.flatnonzero(stamps.year == year)
+        if len(idx):
+            selected.append((nc_file, idx))
+            times.append(stamps[idx])
+    if not selected:
+        raise ValueError(f"{year}년 자료가 있는 파일이 없습니다: {list(nc_files)[:5]}")
+    times = pd.DatetimeIndex(np.concatenate([t.values for t in times]))
+    steps = np.diff(times.values).astype('timedelta64[s]').astype(float)
+    if len(steps) and (np.any(steps <= 0) or np.any(steps != steps[0])):
+        raise ValueError(f"{year}년 시간 간격이 일정하지 않거나 중복된 시각이 있습니다.")
+    dt = float(steps[0]) if len(steps) else year_seconds(year)
+    return selected, times, dt
+
+
+# ---------------------------------------------------------------------------
+# box_average_year: 1년치 box 평균 수온 / 염분과 face 수송량 계산
+# nc_files: 파일 경로 목록 또는 glob 패턴, weights: make_box_weights / get_box_weights 결과
+# chunk_bytes: 변수 하나를 한 번에 읽는 최대 크기 (time 구간 길이 결정)
+# output_dir을 주면 av_temp_{year}.mat, av_salt_{year}.mat, trans_new_{year}.mat (비압축, memmap 가능) 저장
+# 반환 dict: av_temp, av_salt ([boxes, time, level]), T ([faces, time, level], m^3/s), times, dt
+# ---------------------------------------------------------------------------
+def _read_window(var, idx, window):
+    j0, j1, i0, i1 = window
+    data = var[idx[0]:idx[-1] + 1, :, j0:j1, i0:i1][idx - idx[0]]
+    return np.ma.filled(np.ma.asarray(data, dtype=np.float64), np.nan).reshape(len(idx), -1).T
+
+
+def _fill_empty_layers(mean, box_wet):
+    # mean [boxes, layers, time]: 물이 있는 층 중 NaN (자료 없음)은 같은 box의 가장 가까운 위 층 값,
+    # 위에 값이 없으면 가장 가까운 아래 층 값으로 채움. 물이 없는 층은 NaN 유지
+    n_layers = mean.shape[1]
+    for layer, src in [(k, k - 1) for k in range(1, n_layers)] + [(k, k + 1) for k in range(n_layers - 2, -1, -1)]:
+        gap = np.isnan(mean[:, layer]) & box_wet[:, layer, None]
+        mean[:, layer][gap] = mean[:, src][gap]
+    return mean
+
+
+@traced('boxavg.year', 'year')
+def box_average_year(year, nc_files, weights, output_dir=None, var_names=None, chunk_bytes=BOXAVG_CHUNK_BYTES):
+    if isinstance(nc_files, str):
+        nc_files = glob.glob(nc_files)
+    names = dict(HYCOM_VARS, **(var_names or {}))
+    # 중복 / 불규칙 간격은 ocean_time_index에서 오류. 1년을 넘는 경우만 오류, 모자라면 경고 (make_hydro_grid와 같음)
+    selected, times, dt = ocean_time_index(nc_files, year)
+    expected = year_seconds(year) / dt
+    if len(times) > expected:
+        raise ValueError(f"{year}년 시간 단계 {len(times)}개가 dt={dt:g}초 기준 1년 ({expected:g}개)을 넘습니다.")
+    if len(times) < expected:
+        print(f"경고: {year}년 시간 단계 {len(times)}개가 dt={dt:g}초 기준 1년 ({expected:g}개)보다 적습니다.")
+
+    n_boxes, n_faces, n_layers = weights['n_boxes'], weights['n_faces'], weights['n_layers']
+    box, face_u, face_v = weights['box'], weights['face_u'], weights['face_v']
+    out = {'av_temp': np.empty((n_boxes, len(times), n_layers)),
+           'av_salt': np.empty((n_boxes, len(times), n_layers)),
+           'T': np.empty((n_faces, len(times), n_layers))}
+
+    n_cols = box.shape[1]
+    chunk = max(1, int(chunk_bytes // (8 * n_cols)))
+    pos = 0
+    for nc_file, idx in selected:
+        count_file('bytes_read', nc_file)
+        with _NC_LOCK, netCDF4.Dataset(nc_file) as ds:
+            shape = ds.variables[names['temp']].shape[1:]
+            if tuple(shape) != weights['grid_shape']:
+                raise ValueError(f"{nc_file}의 격자 {tuple(shape)}가 가중치 격자 {weights['grid_shape']}와 다릅니다.")
+            for start in range(0, len(idx), chunk):
+                block = idx[start:start + chunk]
+                stop = pos + len(block)
+                for key, name in (('av_temp', 'temp'), ('av_salt', 'salt')):
+                    data = _read_window(ds.variables[names[name]], block, weights['window'])
+                    valid = np.isfinite(data)
+                    # 육지 / 해저 아래 cell (NaN)은 가중치에서 빼고 평균
+                    total = box @ np.where(valid, data, 0.0)
+                    norm = box @ valid.astype(np.float64)
+                    with np.errstate(invalid='ignore', divide='ignore'):
+                        mean = np.where(norm > 0, total / norm, np.nan)
+                    mean = _fill_empty_layers(mean.reshape(n_boxes, n_layers, len(block)), weights['box_wet'])
+                    out[key][:, pos:stop, :] = mean.transpose(0, 2, 1)
+                u = np.nan_to_num(_read_window(ds.variables[names['u']], block, weights['window']))
+                v = np.nan_to_num(_read_window(ds.variables[names['v']], block, weights['window']))
+                flux = face_u @ u + face_v @ v
+                out['T'][:, pos:stop, :] = flux.reshape(n_faces, n_layers, len(block)).transpose(0, 2, 1)
+                pos = stop
+    count('records', pos)
+
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+        for key, file_name in (('av_temp', f"av_temp_{year}.mat"), ('av_salt', f"av_salt_{year}.mat"),
+                               ('T', f"trans_new_{year}.mat")):
+            mat_file = os.path.join(output_dir, file_name)
+            scipy.io.savemat(mat_file, {key: out[key]}, do_compression=False)
+            count_file('bytes_written', mat_file)
+            print(f"저장 완료: {mat_file} {out[key].shape}")
+    out['times'] = times
+    out['dt'] = dt
+    return out
+
+
+if __name__ == "__main__":
+    # 기본 변수 설정
+    years = [2019]
+    base_path = r"D:\Dropbox\y2025\01_Atlantis\05_hycom"
+    bgm_file = r"D:\Dropbox\y2025\01_Atlantis\03_bgm\model.bgm"
+    cum_depths = [0, 20, 50, 100, 250, 500, 1000]   # make_init_csv와 같은 층 경계
+    ocean_pattern = os.path.join(base_path, "nc", "hycom_{year}_*.nc")
+    cache_dir = os.path.join(base_path, "box_weights")  # 가중치 캐시 (다음 실행부터 계산하지 않음)
+
+    # 가중치는 첫 파일의 격자로 한 번 계산하고 모든 연도에 사용
+    weights = None
+    for year in years:
+        nc_files = sorted(glob.glob(ocean_pattern.format(year=year)))
+        if weights is None:
+            weights = get_box_weights(bgm_file, cum_depths, nc_files[0], cache_dir=cache_dir)
+        box_average_year(year, nc_files, weights, output_dir=os.path.join(base_path, str(year)))
@@ -7,62 +7,46 @@ Created on Wed Mar  5 15:49:09 2025
 자동화 스크립트: 매 월별로 param 파일 수정 후 hydroconstruct.exe 실행 및
 임시 run.bat 파일을 생성하여 출력 파일 이름을 바로 flux_년도_월.txt 등으로 생성
 Created on 2025-02-27
+
+월별 (year, month) 작업마다 별도의 작업 폴더와 param 파일을 만들어 템플릿 param 파일은
+수정하지 않고, 여러 달의 hydroconstruct를 동시에 실행
+
 """
 
 import os
+import shutil
 import subprocess
-import pandas as pd
+import time
 import calendar  # 해당 월의 일수를 계산하기 위해 추가
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-# ----------------- Configuration -----------------
-# Base directory for all files(param, run.bat, hydroconstruct.exe). 경로가 바뀔 경우 이 값만 수정하면 됩니다.
-base_path = r"H:\Dropbox\y2025\01_Atlantis\06_hydro\branches\s1"
-
-# 파일 경로 설정
-template_param_file = os.path.join(base_path, "param_2025.prm")   # param 파일
-original_run_bat    = os.path.join(base_path, "run.bat")           # 원본 run.bat (참고용)
-hydroconstruct_exe  = os.path.join(base_path, "hydroconstruct.exe")# 실행 파일
-
-# geofile 및 llgeofile 파일명과 절대 경로 설정 (param 파일 내 변수로 사용)
-#geofile_filename    = "version2_utm_relax.bgm"
-#llgeofile_filename  = "version2_relax.bgm"
-#geofile_path        = os.path.join(base_path, geofile_filename)
-#llgeofile_path      = os.path.join(base_path, llgeofile_filename)
-
-# --------------------------------------------------
-
-# 처리할 연도
-year = 2019
+import Atlantis_hydro_tools  # noqa: F401  (initial 디렉터리 경로 추가)
+from Atlantis_trace import span, count, count_file, traced, with_parent
 
-# 작업 디렉터리: 입력파일(trans, tempsalt 등)이 위치하는 폴더(연도별)
-working_dir = os.path.join(base_path, str(year))
 
-# 기준 날짜: 2019년 1월 1일 0시 (참고용)
-global_ref = pd.to_datetime(f"{year}-01-01 00:00:00")
-
-# ----------------- Main Loop -----------------
-for month in range(1, 13):
-    # 해당 월의 시작 시각 계산 (필요 시점 계산용)
-    month_start = pd.to_datetime(f"{year}-{month:02d}-01 00:00:00")
+# ---------------------------------------------------------------------------
+# write_month_param: 템플릿 param 파일에서 월별 항목만 교체한 새 param 파일 생성
+# (템플릿 파일은 그대로 둠)
+# ---------------------------------------------------------------------------
+def write_month_param(template_param_file, param_file, year, month, working_dir):
     # tstart는 항상 0으로 고정, tstop은 해당 월의 일수로 설정
     tstart_val = 0
     tstop_val  = calendar.monthrange(year, month)[1]-1
 
-    tstart_line = f"tstart {tstart_val}\n"
-    tstop_line  = f"tstop {tstop_val}\n"
-
     # 입력 nc 파일 경로 (working_dir 기준)
     tempsalt_nc = os.path.join(working_dir, f"avs_{year}_{month:02d}.nc")
     trans_nc    = os.path.join(working_dir, f"trans_{year}_{month:02d}.nc")
     vtrans_nc   = os.path.join(working_dir, f"avs_{year}_{month:02d}.nc")
-    
-    # param 파일 내에 기록할 변수들
-    tempsalt_line  = f"tempsalt0.name {tempsalt_nc}\n"
-    trans_line     = f"trans0.name {trans_nc}\n"
-    vtrans_line    = f"vtrans0.name {vtrans_nc}\n"
-    reference_line = f"reference_year {year}\n"
-#    geofile_line   = f"geofile {geofile_path}\n"
-#    llgeofile_line = f"llgeofile {llgeofile_path}\n"
+
+    # param 파일 내에 기록할 변수들 (줄 앞부분 -> 새 줄)
+    replacements = [
+        ("tempsalt0.name", f"tempsalt0.name {tempsalt_nc}\n"),
+        ("vtrans0.name",   f"vtrans0.name {vtrans_nc}\n"),
+        ("trans0.name",    f"trans0.name {trans_nc}\n"),
+        ("reference_year", f"reference_year {year}\n"),
+        ("tstart",         f"tstart {tstart_val}\n"),
+        ("tstop",          f"tstop {tstop_val}\n"),
+    ]
 
     # 템플릿 param 파일 읽기 및 수정 (필요 항목만 교체)
     with open(template_param_file, "r", encoding="utf-8") as f:
@@ -71,57 +55,155 @@ for month in range(1, 13):
     new_lines = []
     for line in lines:
         stripped = line.strip()
-        if stripped.startswith("tempsalt0.name"):
-            new_lines.append(tempsalt_line)
-        elif stripped.startswith("vtrans0.name"):
-            new_lines.append(vtrans_line)
-        elif stripped.startswith("trans0.name"):
-            new_lines.append(trans_line)
-        elif stripped.startswith("reference_year"):
-            new_lines.append(reference_line)
-        elif stripped.startswith("tstart"):
-            new_lines.append(tstart_line)
-        elif stripped.startswith("tstop"):
-            new_lines.append(tstop_line)
-       # elif stripped.startswith("geofile"):
-       #     new_lines.append(geofile_line)
-       # elif stripped.startswith("llgeofile"):
-       #     new_lines.append(llgeofile_line)
+        for prefix, new_line in replacements:
+            if stripped.startswith(prefix):
+                new_lines.append(new_line)
+                break
         else:
             new_lines.append(line)
 
-    # 수정된 param 파일 내용 저장 (덮어쓰기)
-    with open(template_param_file, "w", encoding="utf-8") as f:
+    with open(param_file, "w", encoding="utf-8") as f:
         f.writelines(new_lines)
-
-    # 임시 배치 파일(temp_run.bat) 생성 (working_dir 내)
-    bat_content = (
-        f'"{hydroconstruct_exe}" '
-        f'-f flow_{year}_{month:02d}.txt '
-        f'-s salt_{year}_{month:02d}.txt '
-        f'-t temp_{year}_{month:02d}.txt '
-        f'-r "{template_param_file}"\n'
-    )
-    temp_run_bat = os.path.join(working_dir, "temp_run.bat")
-    with open(temp_run_bat, "w", encoding="utf-8") as f:
-        f.write(bat_content)
-
-    print(f"[{year}-{month:02d}] 임시 배치 파일 생성 완료: {temp_run_bat}")
-    print(f"    내용: {bat_content.strip()}")
-
-    # 임시 배치 파일 실행
-    result = subprocess.run(temp_run_bat, shell=True, cwd=working_dir)
-    print(result.stdout)
-    print(result.stderr)
-      
-    if result.returncode != 0:
-        print(f"[{year}-{month:02d}] hydroconstruct.exe 실행 중 오류 발생!")
-        os.remove(temp_run_bat)
-        continue
-    else:
-        print(f"[{year}-{month:02d}] hydroconstruct.exe 실행 완료.")
-
-    # 실행 후 임시 배치 파일 삭제
-    os.remove(temp_run_bat)
-
-print("모든 월별 작업이 완료되었습니다.")
+    return new_lines
+
+
+# ---------------------------------------------------------------------------
+# param_input_files: param 파일이 상대 경로로 참조하는 입력 파일 (geofile, llgeofile 등)
+# working_dir 기준으로 실제로 존재하는 파일만 (param 파일에 적힌 이름, 절대 경로) 목록으로 반환
+# ---------------------------------------------------------------------------
+def param_input_files(param_lines, working_dir):
+    files = []
+    for line in param_lines:
+        parts = line.split()
+        if len(parts) < 2 or parts[0].startswith('#'):
+            continue
+        for token in parts[1:]:
+            if os.path.isabs(token):
+                continue
+            src = os.path.join(working_dir, token)
+            if os.path.isfile(src) and (token, src) not in files:
+                files.append((token, src))
+    return files
+
+
+def _copy_param_inputs(param_lines, working_dir, job_dir):
+    # hydroconstruct는 작업 폴더에서 실행되므로 상대 경로 입력 파일은 같은 이름으로 작업 폴더에 복사
+    # (geofile 등을 절대 경로로 바꾸면 출력 CDL에 경로가 그대로 들어가 ncgen 변환 시 오류가 나므로
+    #  param 파일은 그대로 두고 파일을 복사)
+    for token, src in param_input_files(param_lines, working_dir):
+        dst = os.path.join(job_dir, token)
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        shutil.copy2(src, dst)
+
+
+def _resolve_exe(hydroconstruct_exe):
+    # 실행 파일 경로 또는 명령 목록 -> 목록 (작업 폴더에서 실행되므로 존재하는 파일 경로는 절대 경로로)
+    exe = [hydroconstruct_exe] if isinstance(hydroconstruct_exe, str) else list(hydroconstruct_exe)
+    return [os.path.abspath(p) if os.path.isfile(p) else p for p in exe]
+
+
+# ---------------------------------------------------------------------------
+# run_hydroconstruct_month: (year, month) 작업 폴더에서 hydroconstruct 한 번 실행
+# hydroconstruct_exe: 실행 파일 경로 또는 명령 목록 (테스트용 스텁 사용 가능)
+# 성공하면 flow/salt/temp_{year}_{month}.txt 를 working_dir로 옮기고 작업 폴더 삭제,
+# 실패하면 확인할 수 있도록 작업 폴더를 남김
+# 종료 코드가 0이어도 출력 .txt 중 하나라도 없으면 실패 (아무것도 옮기지 않음)
+# 반환: 성공 여부 (ok), 오류 메시지 (error), 종료 코드, stdout/stderr, 실행 시간 등을 담은 dict
+# ---------------------------------------------------------------------------
+def run_hydroconstruct_month(year, month, template_param_file, working_dir, hydroconstruct_exe,
+                             timeout=None, keep_job_dir=False):
+    # hydroconstruct는 작업 폴더에서 실행되므로 입력 경로는 절대 경로로 기록
+    working_dir = os.path.abspath(working_dir)
+    job_dir = os.path.join(working_dir, f"hydro_job_{year}_{month:02d}")
+    os.makedirs(job_dir, exist_ok=True)
+    param_file = os.path.join(job_dir, f"param_{year}_{month:02d}.prm")
+    param_lines = write_month_param(template_param_file, param_file, year, month, working_dir)
+    _copy_param_inputs(param_lines, working_dir, job_dir)
+
+    outputs = [f"flow_{year}_{month:02d}.txt", f"salt_{year}_{month:02d}.txt", f"temp_{year}_{month:02d}.txt"]
+    cmd = _resolve_exe(hydroconstruct_exe) + ["-f", outputs[0], "-s", outputs[1], "-t", outputs[2], "-r", os.path.basename(param_file)]
+
+    job = {'year': year, 'month': month, 'cmd': cmd, 'job_dir': job_dir, 'outputs': [], 'ok': False, 'error': None}
+    with span('hydro.hydroconstruct_month', year=year, month=month) as fields:
+        t0 = time.perf_counter()
+        try:
+            result = subprocess.run(cmd, cwd=job_dir, capture_output=True, text=True, timeout=timeout)
+            job.update(returncode=result.returncode, stdout=result.stdout, stderr=result.stderr)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            job.update(returncode=None, stdout=getattr(e, 'stdout', None) or "", stderr=str(e))
+        job['elapsed'] = time.perf_counter() - t0
+        fields['returncode'] = job['returncode']
+        count('stdout_bytes', len(job['stdout'] or ""))
+        if job['returncode'] != 0:
+            job['error'] = f"종료 코드 {job['returncode']}"
+        else:
+            missing = [name for name in outputs if not os.path.exists(os.path.join(job_dir, name))]
+            if missing:
+                job['error'] = f"종료 코드는 0이지만 출력 파일이 없음: {missing}"
+        fields['ok'] = job['ok'] = job['error'] is None
+        if not job['ok']:
+            # 실패한 작업은 원인과 stderr 끝부분을 기록에 남김
+            fields['error'] = job['error']
+            fields['stderr_tail'] = (job['stderr'] or "")[-2000:]
+        else:
+            for name in outputs:
+                dst = os.path.join(working_dir, name)
+                os.replace(os.path.join(job_dir, name), dst)
+                job['outputs'].append(dst)
+                count_file('bytes_written', dst)
+            if not keep_job_dir:
+                shutil.rmtree(job_dir, ignore_errors=True)
+    return job
+
+
+# ---------------------------------------------------------------------------
+# run_hydroconstruct_year: 1년치 월별 hydroconstruct 작업을 n_workers 개씩 동시에 실행
+# ---------------------------------------------------------------------------
+@traced('hydro.hydroconstruct_year', 'year')
+def run_hydroconstruct_year(year, template_param_file, working_dir, hydroconstruct_exe,
+                            months=range(1, 13), n_workers=None, timeout=None):
+    months = list(months)
+    n_workers = n_workers or max(1, min(len(months), os.cpu_count() or 1))
+    jobs = []
+    with ThreadPoolExecutor(max_workers=n_workers) as pool:
+        futures = [pool.submit(with_parent(run_hydroconstruct_month), year, month, template_param_file,
+                               working_dir, hydroconstruct_exe, timeout) for month in months]
+        for future in as_completed(futures):
+            job = future.result()
+            jobs.append(job)
+            tag = f"[{job['year']}-{job['month']:02d}]"
+            if not job['ok']:
+                print(f"{tag} hydroconstruct.exe 실행 중 오류 발생! ({job['error']}, "
+                      f"{job['elapsed']:.1f}s, 작업 폴더: {job['job_dir']})")
+                if job['stderr']:
+                    print(job['stderr'])
+            else:
+                print(f"{tag} hydroconstruct.exe 실행 완료. ({job['elapsed']:.1f}s)")
+    return sorted(jobs, key=lambda j: j['month'])
+
+
+if __name__ == "__main__":
+    # ----------------- Configuration -----------------
+    # Base directory for all files(param, hydroconstruct.exe). 경로가 바뀔 경우 이 값만 수정하면 됩니다.
+    base_path = r"H:\Dropbox\y2025\01_Atlantis\06_hydro\branches\s1"
+
+    # 파일 경로 설정
+    template_param_file = os.path.join(base_path, "param_2025.prm")   # param 파일 (템플릿, 수정하지 않음)
+    hydroconstruct_exe  = os.path.join(base_path, "hydroconstruct.exe")# 실행 파일
+    n_workers = 4  # 동시에 실행할 hydroconstruct 개수
+
+    # --------------------------------------------------
+
+    # 처리할 연도
+    year = 2019
+
+    # 작업 디렉터리: 입력파일(trans, tempsalt 등)이 위치하는 폴더(연도별)
+    working_dir = os.path.join(base_path, str(year))
+
+    # ----------------- Main -----------------
+    jobs = run_hydroconstruct_year(year, template_param_file, working_dir, hydroconstruct_exe,
+                                   n_workers=n_workers)
+    failed = [job['month'] for job in jobs if not job['ok']]
+    if failed:
+        print(f"실패한 월: {failed}")
+    print("모든 월별 작업이 완료되었습니다.")
@@ -1,84 +1,497 @@
 import os
+import re
+import shutil
 import subprocess
-import xarray as xr
 import pandas as pd
 import numpy as np
+import netCDF4
 
-year = 2019
-# 처리할 변수 목록: "salt", "temp", "flow"
-variables = ['salt', 'temp', 'flow']
+import Atlantis_hydro_tools  # noqa: F401  (initial 디렉터리 경로 추가)
+from Atlantis_trace import count, count_file, traced
 
-input_dir = rf"H:\Dropbox\y2025\01_Atlantis\06_hydro\branches\s1\{year}"
-output_dir = rf"H:\Dropbox\y2025\01_Atlantis\06_hydro\branches\s1\{year}"
 
-if not os.path.exists(output_dir):
-    os.makedirs(output_dir)
+# ---------------------------------------------------------------------------
+# cdl_to_netcdf: hydroconstruct 텍스트(CDL) 출력을 ncgen 없이 직접 NetCDF로 변환
+# 헤더(dimensions / variables / 속성)를 읽어 변수를 만들고, data 구역은 한 줄씩 읽으면서
+# unlimited 차원 변수는 레코드(시간 단계)가 채워지는 대로 바로 기록
+# append=True 이면 같은 구조의 기존 파일 뒤에 레코드를 이어 씀 (연도별 파일 직접 생성)
+# 반환: 차원 크기 dict (unlimited 차원은 이번에 기록한 레코드 수)
+# ---------------------------------------------------------------------------
+_CDL_TYPES = {
+    'byte': 'i1', 'ubyte': 'u1', 'char': 'S1', 'short': 'i2', 'ushort': 'u2',
+    'int': 'i4', 'long': 'i4', 'uint': 'u4', 'int64': 'i8', 'uint64': 'u8',
+    'float': 'f4', 'real': 'f4', 'double': 'f8',
+}
+_CDL_NAME = r'[A-Za-z_][\w.@+\-]*'
+_CDL_VAR_RE = re.compile(rf'^({"|".join(_CDL_TYPES)})\s+({_CDL_NAME})\s*(?:\((.*)\))?$')
+_CDL_ATT_RE = re.compile(rf'^({_CDL_NAME})?\s*:\s*({_CDL_NAME})\s*=\s*(.*)$', re.S)
+_CDL_DATA_RE = re.compile(rf'\s*({_CDL_NAME})\s*=')
+# 숫자 뒤의 CDL 타입 접미사 (1.5f, 2s, 3b, 4L ...)
+_CDL_SUFFIX_RE = re.compile(r'(?<=[\d.])[fFdDsSbBlLuU]+(?=[\s,;]|$)')
 
-for var in variables:
-    total_time_steps = 0
-    print(f"\n===== {var} 처리 시작 =====")
-    
-    # 1. 월별 텍스트 파일을 NetCDF 파일로 변환
-    for month in range(1, 13):
-        month_str = f"{month:02d}"
-        txt_file = os.path.join(input_dir, f"{var}_{year}_{month_str}.txt")
-        nc_file = os.path.join(output_dir, f"{var}_{year}_{month_str}.nc")
-    
-        if not os.path.exists(txt_file):
-            print(f"파일이 존재하지 않음: {txt_file}")
+
+def _strip_cdl_comment(line):
+    # 따옴표 밖의 // 주석 제거
+    in_str = False
+    for i, ch in enumerate(line):
+        if ch == '"' and (i == 0 or line[i - 1] != '\\'):
+            in_str = not in_str
+        elif not in_str and line.startswith('//', i):
+            return line[:i]
+    return line
+
+
+def _cdl_attribute_value(text):
+    text = text.strip()
+    if text.startswith('"'):
+        return ''.join(re.findall(r'"((?:[^"\\]|\\.)*)"', text))
+    tokens = [t for t in text.replace(',', ' ').split() if t]
+    if any(t[-1] in 'fF' for t in tokens):
+        dtype = np.float32
+    elif any(t[-1] in 'sS' for t in tokens) and all(t[-1] in 'sS' for t in tokens):
+        dtype = np.int16
+    elif any(t[-1] in 'bB' for t in tokens) and all(t[-1] in 'bB' for t in tokens):
+        dtype = np.int8
+    elif all(re.fullmatch(r'[+-]?\d+[lL]?', t) for t in tokens):
+        dtype = np.int32
+    else:
+        dtype = np.float64
+    values = np.array([_CDL_SUFFIX_RE.sub('', t) for t in tokens], dtype=float).astype(dtype)
+    return values[0] if len(values) == 1 else values
+
+
+def _parse_cdl_values(chunk, fill):
+    tokens = _CDL_SUFFIX_RE.sub('', chunk).replace(',', ' ').split()
+    if not tokens:
+        return np.empty(0)
+    if '_' not in tokens:
+        return np.array(tokens, dtype=float)
+    missing = [i for i, t in enumerate(tokens) if t == '_']
+    for i in missing:
+        tokens[i] = 'nan'
+    values = np.array(tokens, dtype=float)
+    values[missing] = fill
+    return values
+
+
+def _read_cdl_header(f):
+    # 반환: (dims {name: size or None}, vars [(name, dtype, dims)], var_atts, global_atts)
+    dims, variables, var_atts, global_atts = {}, [], {}, {}
+    section = None
+    statement = ''
+    for line in f:
+        line = _strip_cdl_comment(line).strip()
+        if not line:
             continue
-    
+        if line.startswith('netcdf'):
+            continue
+        if line in ('dimensions:', 'variables:', 'data:'):
+            section = line[:-1]
+            if section == 'data':
+                return dims, variables, var_atts, global_atts
+            continue
+        statement += ' ' + line
+        if not statement.rstrip().endswith(';'):
+            continue
+        stmt, statement = statement.strip().rstrip(';').strip(), ''
+        if section == 'dimensions':
+            for decl in stmt.split(','):
+                name, _, size = decl.partition('=')
+                size = size.strip()
+                dims[name.strip()] = None if size.upper() == 'UNLIMITED' else int(size)
+        elif section == 'variables':
+            m = _CDL_ATT_RE.match(stmt)
+            if m and (m.group(1) is None or not _CDL_VAR_RE.match(stmt)):
+                target = global_atts if not m.group(1) else var_atts.setdefault(m.group(1), {})
+                target[m.group(2)] = _cdl_attribute_value(m.group(3))
+                continue
+            m = _CDL_VAR_RE.match(stmt)
+            if m is None:
+                raise ValueError(f"CDL 변수 선언을 해석할 수 없음: {stmt}")
+            var_dims = tuple(d.strip() for d in m.group(3).split(',')) if m.group(3) else ()
+            variables.append((m.group(2), _CDL_TYPES[m.group(1)], var_dims))
+    raise ValueError("CDL 파일에 data: 구역이 없습니다.")
+
+
+@traced('hydro.cdl_to_netcdf', 'txt_file', 'nc_file')
+def cdl_to_netcdf(txt_file, nc_file, append=False):
+    count_file('bytes_read', txt_file)
+    with open(txt_file, 'r') as f:
+        dims, variables, var_atts, global_atts = _read_cdl_header(f)
+
+        if append:
+            ds = netCDF4.Dataset(nc_file, 'a')
+            for name, size in dims.items():
+                if size is not None and len(ds.dimensions[name]) != size:
+                    ds.close()
+                    raise ValueError(f"{nc_file}의 {name} 차원 ({len(ds.dimensions[name])})이 {txt_file} ({size})과 다릅니다.")
+        else:
+            ds = netCDF4.Dataset(nc_file, 'w', format='NETCDF4')
+            for name, size in dims.items():
+                ds.createDimension(name, size)
+            for name, dtype, var_dims in variables:
+                atts = dict(var_atts.get(name, {}))
+                fill = atts.pop('_FillValue', None)
+                var = ds.createVariable(name, dtype, var_dims, fill_value=fill)
+                var.setncatts(atts)
+            ds.setncatts(global_atts)
+
+        unlimited = [name for name, size in dims.items() if size is None]
+        offset = len(ds.dimensions[unlimited[0]]) if append and unlimited else 0
+        records = {}
+
+        def is_record_var(name):
+            var_dims = ds.variables[name].dimensions
+            return bool(var_dims) and dims.get(var_dims[0], 0) is None
+
+        def flush(name, buf, final):
+            # 완성된 레코드만 기록하고 남은 값은 버퍼에 유지
+            var = ds.variables[name]
+            values = np.concatenate(buf) if len(buf) > 1 else (buf[0] if buf else np.empty(0))
+            if is_record_var(name):
+                rec_shape = tuple(dims[d] for d in var.dimensions[1:])
+                rec_size = int(np.prod(rec_shape)) if rec_shape else 1
+                n = len(values) // rec_size
+                if n:
+                    start = offset + records.get(name, 0)
+                    var[start:start + n] = values[:n * rec_size].reshape((n,) + rec_shape)
+                    records[name] = records.get(name, 0) + n
+                rest = values[n * rec_size:]
+                if final and len(rest):
+                    raise ValueError(f"{txt_file}: {name}의 값 개수가 레코드 크기의 배수가 아닙니다.")
+                return [rest] if len(rest) else []
+            # 고정 크기 변수는 마지막에 한 번 기록 (append 시에는 첫 파일 값 유지)
+            if not append:
+                var[...] = values.reshape(var.shape)
+            return []
+
+        try:
+            current, buf, pending, streaming = None, [], 0, False
+            for line in f:
+                text = _strip_cdl_comment(line)
+                while text.strip():
+                    if current is None:
+                        m = _CDL_DATA_RE.match(text)
+                        if m is None:
+                            if text.strip() == '}':
+                                break
+                            raise ValueError(f"{txt_file}: data 구역을 해석할 수 없음: {text.strip()}")
+                        current, buf, pending = m.group(1), [], 0
+                        streaming = is_record_var(current)
+                        var = ds.variables[current]
+                        fill = var._FillValue if '_FillValue' in var.ncattrs() else \
+                            netCDF4.default_fillvals.get(var.dtype.str[1:], np.nan)
+                        text = text[m.end():]
+                    end = text.find(';')
+                    values = _parse_cdl_values(text if end < 0 else text[:end], fill)
+                    if len(values):
+                        buf.append(values)
+                        pending += len(values)
+                    if end < 0:
+                        # 레코드 여러 개 분량이 모이면 기록
+                        if streaming and pending >= 1 << 16:
+                            buf = flush(current, buf, False)
+                            pending = sum(len(b) for b in buf)
+                        break
+                    flush(current, buf, True)
+                    current, buf, pending = None, [], 0
+                    text = text[end + 1:]
+        finally:
+            ds.close()
+    count_file('bytes_written', nc_file)
+
+    sizes = {name: (size if size is not None else max(records.values(), default=0))
+             for name, size in dims.items()}
+    return sizes
+
+
+# ---------------------------------------------------------------------------
+# ncgen_month: hydroconstruct 텍스트(CDL) 출력 한 달치를 NetCDF로 변환
+# (ncgen 프로세스 대신 cdl_to_netcdf 사용, 변환 중 't' 차원 크기를 바로 얻음)
+# use_ncgen=True 이면 기존처럼 ncgen 실행
+# 반환: 변환된 파일의 't' 차원 크기 (실패 시 None)
+# ---------------------------------------------------------------------------
+def ncgen_month(var, year, month, input_dir, output_dir, use_ncgen=False):
+    month_str = f"{month:02d}"
+    txt_file = os.path.join(input_dir, f"{var}_{year}_{month_str}.txt")
+    nc_file = os.path.join(output_dir, f"{var}_{year}_{month_str}.nc")
+
+    if not os.path.exists(txt_file):
+        print(f"파일이 존재하지 않음: {txt_file}")
+        return None
+
+    if use_ncgen:
         cmd = ["ncgen", "-o", nc_file, txt_file]
         result = subprocess.run(cmd, capture_output=True, text=True)
         if result.returncode != 0:
             print(f"변환 오류 {txt_file}:\n{result.stderr}")
-        else:
-            print(f"변환 완료: {txt_file} -> {nc_file}")
-    
-            try:
-                ds = xr.open_dataset(nc_file, engine='netcdf4')
-                time_steps = ds.sizes['t']  # ds.dims['t'] 대신 ds.sizes['t'] 사용
-                print(f"{nc_file} 파일에 {time_steps}개의 시간 단계가 포함됨.")
-                total_time_steps += time_steps
-                ds.close()
-            except Exception as e:
-                print(f"{nc_file}의 't' 차원을 읽는 중 오류 발생: {e}")
-    
-    print(f"{var} 파일에서 추출한 총 time step 개수: {total_time_steps}")
-    
-    # 2. 12시간 간격의 날짜 벡터 생성
-    start_time = pd.to_datetime(f"{year}-01-01 00:00:00")
-    end_time = pd.to_datetime(f"{year}-12-31 12:00:00")
-    time_vector = pd.date_range(start=start_time, end=end_time, freq="12h")  # 'H' 대신 'h' 사용
-    
-    # 기준 시간 설정
-    ref_time = pd.to_datetime(f"{year}-01-01 00:00:00")
-    seconds_values_full = (time_vector - ref_time).total_seconds()
-    
-    # 3. 생성된 월별 NetCDF 파일 병합
-    merged_file = os.path.join(output_dir, f"{var}_{year}.nc")
-    
+            return None
+        with netCDF4.Dataset(nc_file) as ds:
+            time_steps = len(ds.dimensions['t'])
+    else:
+        try:
+            time_steps = cdl_to_netcdf(txt_file, nc_file)['t']
+        except (OSError, ValueError, KeyError) as e:
+            print(f"변환 오류 {txt_file}:\n{e}")
+            return None
+    print(f"변환 완료: {txt_file} -> {nc_file} ({time_steps}개의 시간 단계)")
+    return time_steps
+
+
+# ---------------------------------------------------------------------------
+# append_records: NetCDF 파일 하나의 레코드를 열려 있는 대상 파일의 unlimited 't' 뒤에 이어 씀
+# 레코드 변수는 max_bytes 이하의 시간 구간 단위로 복사하므로 메모리 사용량은 파일 크기와 무관
+# 't' 좌표는 t_start (기준 시각부터의 초) + i * dt 로 다시 기록
+# 반환: 이어 쓴 레코드 수
+# ---------------------------------------------------------------------------
+MERGE_MAX_BYTES = 64 * 1024 * 1024
+
+
+def _create_like(src, nc_file, time_dim='t'):
+    # src와 같은 차원/변수/속성을 가진 빈 파일 생성 ('t'는 unlimited), 고정 크기 변수는 그대로 복사
+    ds = netCDF4.Dataset(nc_file, 'w', format='NETCDF4')
+    for name, dim in src.dimensions.items():
+        ds.createDimension(name, None if name == time_dim else len(dim))
+    for name, var in src.variables.items():
+        atts = {k: var.getncattr(k) for k in var.ncattrs()}
+        out = ds.createVariable(name, var.dtype, var.dimensions, fill_value=atts.pop('_FillValue', None))
+        out.setncatts(atts)
+    ds.setncatts({k: src.getncattr(k) for k in src.ncattrs()})
+    ds.set_auto_maskandscale(False)
+    for name, var in src.variables.items():
+        if time_dim not in var.dimensions:
+            ds.variables[name][...] = var[...]
+    return ds
+
+
+def append_records(src_file, ds, t_start, dt, time_dim='t', max_bytes=MERGE_MAX_BYTES):
+    count_file('bytes_read', src_file)
+    with netCDF4.Dataset(src_file) as src:
+        src.set_auto_maskandscale(False)
+        if set(src.variables) != set(ds.variables):
+            raise ValueError(f"{src_file}의 변수 목록이 병합 파일과 다릅니다.")
+        for name, dim in src.dimensions.items():
+            if name != time_dim and len(ds.dimensions[name]) != len(dim):
+                raise ValueError(f"{src_file}의 {name} 차원 ({len(dim)})이 병합 파일 ({len(ds.dimensions[name])})과 다릅니다.")
+
+        n_new = len(src.dimensions[time_dim])
+        offset = len(ds.dimensions[time_dim])
+        for name, var in src.variables.items():
+            if name == time_dim or time_dim not in var.dimensions:
+                continue
+            if var.dimensions[0] != time_dim:
+                raise ValueError(f"{src_file}: {name}의 첫 번째 차원이 {time_dim}이 아닙니다.")
+            rec_bytes = var.dtype.itemsize * int(np.prod(var.shape[1:]))
+            step = max(1, max_bytes // max(rec_bytes, 1))
+            out = ds.variables[name]
+            for start in range(0, n_new, step):
+                stop = min(n_new, start + step)
+                out[offset + start:offset + stop] = var[start:stop]
+        if time_dim in ds.variables:
+            ds.variables[time_dim][offset:offset + n_new] = t_start + np.arange(n_new) * float(dt)
+    return n_new
+
+
+def _time_reference(ds, time_dim='t'):
+    # 't' units ("seconds since YYYY-MM-DD ...")의 기준 시각
+    units = getattr(ds.variables[time_dim], 'units', '')
+    m = re.match(r'\s*seconds since\s+(.+)$', units)
+    if m is None:
+        raise ValueError(f"'{time_dim}' units를 해석할 수 없음: {units!r}")
+    return pd.Timestamp(m.group(1).strip())
+
+
+# ---------------------------------------------------------------------------
+# _check_year_steps: 시간 단계 수가 dt 기준 1년을 넘으면 ValueError, 모자라면 경고
+# ---------------------------------------------------------------------------
+def _check_year_steps(total_steps, year, dt, what):
+    expected_steps = int((pd.Timestamp(f"{year + 1}-01-01") - pd.Timestamp(f"{year}-01-01")).total_seconds() // dt)
+    if total_steps > expected_steps:
+        raise ValueError(f"{what} ({total_steps})이 1년 ({expected_steps})을 넘습니다.")
+    if total_steps < expected_steps:
+        print(f"경고: {what} ({total_steps})이 1년 ({expected_steps})보다 작습니다.")
+    return expected_steps
+
+
+# ---------------------------------------------------------------------------
+# merge_year: 월별 NetCDF 12개를 병합하여 {var}_{year}.nc 생성
+# 기본은 스트리밍 방식: 첫 달 파일 구조로 unlimited 't' 파일을 만들고 월별 레코드를 순서대로 이어 씀
+# (dask / xarray 불필요, 한 번에 max_bytes 이하만 메모리에 올림)
+# merged_file에 기존 (다년) 파일을 주면 해당 연도를 그 뒤에 이어 씀. 't'는 그 파일의 기준 연도부터의 초
+# dt=None 이면 첫 달 파일의 t:dt 속성 사용
+# use_xarray=True 이면 기존 open_mfdataset + to_netcdf 방식
+# 입력이 잘못되었거나 병합에 실패하면 예외 발생 (임시 파일은 삭제, 기존 다년 파일은 그대로)
+# ---------------------------------------------------------------------------
+@traced('hydro.merge_year', 'var', 'year')
+def merge_year(var, year, output_dir, merged_file=None, dt=None, use_xarray=False,
+               max_bytes=MERGE_MAX_BYTES):
+    year_start = pd.Timestamp(f"{year}-01-01 00:00:00")
+
+    append = merged_file is not None and os.path.exists(merged_file)
+    if merged_file is None:
+        merged_file = os.path.join(output_dir, f"{var}_{year}.nc")
+
     # 파일 존재 여부 확인
     file_list = [os.path.join(output_dir, f"{var}_{year}_{month:02d}.nc") for month in range(1, 13)]
     existing_files = [f for f in file_list if os.path.exists(f)]
-    
+
     if len(existing_files) != 12:
         raise ValueError(f"총 12개 파일이 필요하지만 {len(existing_files)}개만 발견됨: {existing_files}")
-    
+
+    if dt is None:
+        with netCDF4.Dataset(existing_files[0]) as src:
+            if 'dt' not in src.variables['t'].ncattrs():
+                raise ValueError(f"{existing_files[0]}의 't'에 dt 속성이 없습니다. dt를 직접 지정하세요.")
+            dt = float(src.variables['t'].dt)
+
+    # 입력 검증을 먼저 끝낸 뒤 파일을 씀 (1년을 넘는 경우만 오류, 모자라면 경고)
+    total_steps = 0
+    for nc_file in existing_files:
+        with netCDF4.Dataset(nc_file) as src:
+            total_steps += len(src.dimensions['t'])
+    _check_year_steps(total_steps, year, dt, "월별 파일의 t 차원 합")
+
+    if use_xarray and not append:
+        return _merge_year_xarray(existing_files, merged_file, year, dt, total_steps)
+
+    if append:
+        with netCDF4.Dataset(merged_file) as ds:
+            t_start = (year_start - _time_reference(ds)).total_seconds()
+            n_old = len(ds.dimensions['t'])
+            file_dt = float(getattr(ds.variables['t'], 'dt', dt))
+            if file_dt != float(dt):
+                raise ValueError(f"{merged_file}의 dt ({file_dt})가 {dt}와 다릅니다.")
+            if n_old and ds.variables['t'][n_old - 1] >= t_start:
+                raise ValueError(f"{merged_file}에 이미 {year}년 이후 자료가 있습니다.")
+
+    # 새 파일이든 다년 파일 이어 쓰기든 임시 파일에 쓴 뒤 완료되면 교체
+    # (이어 쓰기 도중 실패해도 기존 다년 파일은 그대로 남음)
+    tmp_file = merged_file + '.tmp'
+    try:
+        if append:
+            shutil.copy2(merged_file, tmp_file)
+            ds = netCDF4.Dataset(tmp_file, 'a')
+            ds.set_auto_maskandscale(False)
+        else:
+            with netCDF4.Dataset(existing_files[0]) as src:
+                src.set_auto_maskandscale(False)
+                ds = _create_like(src, tmp_file)
+            ds.variables['t'].units = f"seconds since {year}-01-01 00:00:00"
+            ds.variables['t'].dt = float(dt)
+            t_start = 0.0
+
+        try:
+            for nc_file in existing_files:
+                n_new = append_records(nc_file, ds, t_start, dt, max_bytes=max_bytes)
+                t_start += n_new * float(dt)
+        finally:
+            ds.close()
+        os.replace(tmp_file, merged_file)
+    except Exception as e:
+        print(f"NetCDF 병합 중 오류 발생: {e}")
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise
+
+    count('records', total_steps)
+    count_file('bytes_written', merged_file)
+    print(f"최종 NetCDF 파일 생성 완료: {merged_file} ({year}년 {total_steps}개의 시간 단계)")
+    return merged_file
+
+
+def _merge_year_xarray(existing_files, merged_file, year, dt, total_steps):
+    import xarray as xr
+
+    # 기준 시간부터의 초
+    seconds_values_full = np.arange(total_steps) * float(dt)
+
     try:
         ds_merged = xr.open_mfdataset(existing_files, combine='nested', concat_dim='t', engine='netcdf4')
-    
-        if ds_merged.dims['t'] != len(seconds_values_full):
-            raise ValueError(f"병합된 데이터셋의 t 차원 ({ds_merged.dims['t']})이 예상값 ({len(seconds_values_full)})과 다릅니다.")
+
+        if ds_merged.sizes['t'] != len(seconds_values_full):
+            raise ValueError(f"병합된 데이터셋의 t 차원 ({ds_merged.sizes['t']})이 예상값 ({len(seconds_values_full)})과 다릅니다.")
         else:
             ds_merged = ds_merged.assign_coords(t=("t", seconds_values_full.astype(np.float64)))
             ds_merged["t"].attrs["units"] = f"seconds since {year}-01-01 00:00:00"
-            ds_merged["t"].attrs["dt"] = 43200.0
-    
+            ds_merged["t"].attrs["dt"] = float(dt)
+
         ds_merged.to_netcdf(merged_file)
         print(f"최종 NetCDF 파일 생성 완료: {merged_file}")
-    
+
     except Exception as e:
         print(f"NetCDF 병합 중 오류 발생: {e}")
-    
+        if os.path.exists(merged_file):
+            os.remove(merged_file)
+        raise
+    return merged_file
+
+
+# ---------------------------------------------------------------------------
+# convert_year: 변수 하나의 1년치 월별 변환 후 병합
+# direct=True 이면 월별 NetCDF를 만들지 않고 CDL 텍스트에서 연도별 파일을 바로 생성
+# (임시 파일에 쓰고 시간 단계 수를 merge_year와 같이 확인한 뒤 교체)
+# ---------------------------------------------------------------------------
+def convert_year(var, year, input_dir, output_dir, direct=False, dt=None):
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    total_time_steps = 0
+    print(f"\n===== {var} 처리 시작 =====")
+
+    if direct:
+        merged_file = os.path.join(output_dir, f"{var}_{year}.nc")
+        txt_files = [os.path.join(input_dir, f"{var}_{year}_{month:02d}.txt") for month in range(1, 13)]
+        missing = [f for f in txt_files if not os.path.exists(f)]
+        if missing:
+            raise ValueError(f"파일이 존재하지 않음: {missing}")
+        # merge_year와 같이 임시 파일에 쓰고 시간 단계 수를 확인한 뒤 교체 (실패하면 일부만 쓴 파일을 남기지 않음)
+        tmp_file = merged_file + '.tmp'
+        try:
+            for month, txt_file in enumerate(txt_files, start=1):
+                time_steps = cdl_to_netcdf(txt_file, tmp_file, append=month > 1)['t']
+                print(f"변환 완료: {txt_file} -> {merged_file} ({time_steps}개의 시간 단계)")
+                total_time_steps += time_steps
+            # 시간 축을 연초 기준 초 단위로 다시 기록
+            with netCDF4.Dataset(tmp_file, 'a') as ds:
+                if dt is None:
+                    dt = float(ds['t'].dt)  # hydroconstruct 출력의 t:dt
+                _check_year_steps(total_time_steps, year, dt, f"{var} 월별 CDL의 t 합")
+                ds['t'][:] = np.arange(total_time_steps) * float(dt)
+                ds['t'].units = f"seconds since {year}-01-01 00:00:00"
+                ds['t'].dt = float(dt)
+            os.replace(tmp_file, merged_file)
+        except Exception as e:
+            print(f"{var} 연도별 파일 생성 중 오류 발생: {e}")
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+            raise
+        print(f"{var} 파일에서 추출한 총 time step 개수: {total_time_steps}")
+        print(f"최종 NetCDF 파일 생성 완료: {merged_file}")
+        print(f"===== {var} 처리 완료 =====\n")
+        return merged_file
+
+    # 1. 월별 텍스트 파일을 NetCDF 파일로 변환
+    for month in range(1, 13):
+        time_steps = ncgen_month(var, year, month, input_dir, output_dir)
+        if time_steps is not None:
+            total_time_steps += time_steps
+
+    print(f"{var} 파일에서 추출한 총 time step 개수: {total_time_steps}")
+
+    # 2. 생성된 월별 NetCDF 파일 병합
+    merged_file = merge_year(var, year, output_dir, dt=dt)
+
     print(f"===== {var} 처리 완료 =====\n")
+    return merged_file
+
+
+if __name__ == "__main__":
+    year = 2019
+    # 처리할 변수 목록: "salt", "temp", "flow"
+    variables = ['salt', 'temp', 'flow']
+
+    input_dir = rf"H:\Dropbox\y2025\01_Atlantis\06_hydro\branches\s1\{year}"
+    output_dir = rf"H:\Dropbox\y2025\01_Atlantis\06_hydro\branches\s1\{year}"
+
+    for var in variables:
+        convert_year(var, year, input_dir, output_dir, direct=True)
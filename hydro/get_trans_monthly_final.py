@@ -9,66 +9,23 @@ import os
 import scipy.io
 import netCDF4 as nc
 import numpy as np
-import pandas as pd
-from datetime import datetime as dt
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
-# -----------------------------------------------------------------
-# 1. .mat 파일 로드 및 데이터 전처리
-# -----------------------------------------------------------------
-year = 2019
-base_path  = r"D:\Dropbox\y2025\01_Atlantis\05_hycom"
-fpath      = os.path.join(base_path, str(year))
-fnameTrans = f"trans_new_{year}.mat"
-fnameBMG   = 'bgm_v2.mat'
-
-mat_file_name1 = os.path.join(fpath, fnameTrans)
-trans_data     = scipy.io.loadmat(mat_file_name1)
-
-mat_file_name2 = os.path.join(base_path, fnameBMG)
-face_data      = scipy.io.loadmat(mat_file_name2)
-
-# trans: shape = (n_faces, n_time, n_levels) = (548, 729, 6)
-trans = trans_data['T']
-lrdata = face_data['lr']
-pdata1 = face_data['pt1']
-pdata2 = face_data['pt2']
-
-# 차원 정보
-n_faces  = 548
-n_time   = np.size(trans, 1)  # 729 (12시간 간격 1년치)
-n_levels = 6
-
-# 12시간 간격의 날짜·시간 시리즈 생성 (2019년 1월 1일부터 12월 31일까지)
-start_time = pd.to_datetime(f"{year}-01-01 00:00:00")
-end_time   = pd.to_datetime(f"{year}-12-31 12:00:00")
-time_vector = pd.date_range(start=start_time, end=end_time, freq="12H")
-
-
-# trans 데이터의 차원 변환: (548,729,6) -> (729,548,6)
-trans2 = np.transpose(trans, (1, 0, 2))
+from Atlantis_hydro_tools import (share_array, attach_array, release_array, default_workers,
+                                 make_hydro_grid, output_options, open_mat_array)
+# Atlantis_trace는 initial 디렉터리 모듈 (Atlantis_hydro_tools를 import할 때 경로 추가)
+from Atlantis_trace import traced, count_file, with_parent
 
 # -----------------------------------------------------------------
-# 2. 월별로 NetCDF 파일 생성
+# write_trans_month: 한 달치 transport 자료를 NetCDF 파일로 저장
+# dt (초), time_units는 make_hydro_grid 결과, var_opts (압축 / chunk)는 output_options 결과
 # -----------------------------------------------------------------
-for month in range(1, 13):
-    # 해당 월에 해당하는 인덱스 추출
-    month_mask    = time_vector.month == month
-    month_indices = np.where(month_mask)[0]
-    if len(month_indices) == 0:
-        continue  # 해당 월 자료가 없으면 건너뜀
-
+@traced('hydro.write_trans_month', 'nc_filename')
+def write_trans_month(nc_filename, subset_days, subset_trans, pdata1, pdata2, lrdata, dt=43200,
+                      time_units='days since 2019-01-01 00:00:00', var_opts=None):
+    n_faces  = subset_trans.shape[1]
+    n_levels = subset_trans.shape[2]
 
-    subset_time_vector = time_vector[month_mask]
-
-    # 각 월의 첫째 날을 기준으로 경과일(day) 계산
-    month_ref_time = pd.to_datetime(f"{year}-{month:02d}-01 00:00:00")
-    subset_days = (subset_time_vector - month_ref_time).days + (subset_time_vector - month_ref_time).seconds / 86400.0
-
-
-    subset_trans       = trans2[month_mask, :, :]  # shape: (n_time_month, 548, 6)
-
-    # 월별 NetCDF 파일명 생성 (예: "trans_2019_01.nc", "trans_2019_02.nc", …)
-    nc_filename = os.path.join(fpath, f"trans_{year}_{month:02d}.nc")
     if os.path.exists(nc_filename):
         os.remove(nc_filename)
     ds = nc.Dataset(nc_filename, 'w', format='NETCDF4')
@@ -88,13 +45,14 @@ for month in range(1, 13):
     pt2_y        = ds.createVariable('pt2_y', 'f', ('faces',))
     dest_boxid   = ds.createVariable('dest_boxid', 'i', ('faces',))
     source_boxid = ds.createVariable('source_boxid', 'i', ('faces',))
-    transport    = ds.createVariable('transport', 'f', ('time', 'faces', 'level',))
+    transport    = ds.createVariable('transport', 'f', ('time', 'faces', 'level',), fill_value=-10e20,
+                                     **(var_opts or {}))
 
     # 변수 속성 지정
     time_var.long_name = 'time'
-    time_var.units     = 'days since 2019-01-01 00:00:00'
+    time_var.units     = time_units
     time_var.calendar  = 'gregorian'
-    time_var.dt        = 43200  # 12시간 간격이므로 0.5일
+    time_var.dt        = dt  # 초 단위
 
     faces_var.long_name = 'Face IDs'
     level_var.long_name = 'layer index; 1=near-surface'
@@ -117,7 +75,6 @@ for month in range(1, 13):
     transport.long_name = 'flux across face'
     transport.units     = '10^6 m^3/s (= sv)'
     transport.comment   = '+ve is to left, viewing from pt1 to pt2'
-    transport.FillValue = 0
 
     # 변수 데이터 할당
     time_var[:]     = subset_days
@@ -132,4 +89,88 @@ for month in range(1, 13):
     transport[:, :, :] = subset_trans
 
     ds.close()
-    print(f"Saved month {month:02d} data to {nc_filename}")
+    count_file('bytes_written', nc_filename)
+
+
+def _trans_month_worker(trans_spec, start, stop, nc_filename, subset_days, pdata1, pdata2, lrdata, write_kw):
+    # 작업 프로세스: 메모리 매핑된 trans (faces, time, level)에서 해당 월 구간만 읽어 저장
+    trans = attach_array(trans_spec)
+    write_trans_month(nc_filename, subset_days, np.transpose(trans[:, start:stop, :], (1, 0, 2)),
+                      pdata1, pdata2, lrdata, **write_kw)
+    return nc_filename
+
+
+# -----------------------------------------------------------------
+# write_trans_monthly: 12개월 trans_{year}_{month}.nc 파일을 프로세스 풀로 동시에 생성
+# trans: .mat 원본 형상 (n_faces, n_time, n_levels), grid: make_hydro_grid 결과 (시간 축, dt, chunk)
+# 1년치 전치 복사본을 만들지 않고, 각 월은 time 축의 연속 구간만 읽어 전치
+# n_workers=1 이면 현재 프로세스에서 순서대로 실행, months로 일부 월만 생성 가능
+# profile: 'fast' | 'compressed' | 'timeseries' (Atlantis_hydro_tools.OUTPUT_PROFILES)
+# -----------------------------------------------------------------
+@traced('hydro.write_trans_monthly', 'fpath', 'profile')
+def write_trans_monthly(trans, pdata1, pdata2, lrdata, grid, fpath, n_workers=None, months=None, profile='fast'):
+    year = grid['year']
+    write_kw = {'dt': grid['dt'], 'time_units': grid['time_units'],
+                'var_opts': output_options(grid, 'trans', profile)}
+    if len(pdata1) != trans.shape[0] or len(pdata2) != trans.shape[0] or len(lrdata) != trans.shape[0]:
+        raise ValueError(f"face 좌표 / lr 개수 ({len(pdata1)}, {len(pdata2)}, {len(lrdata)})가 "
+                         f"trans의 face 개수 ({trans.shape[0]})와 다릅니다.")
+    jobs = []
+    for month, start, stop, subset_days in grid['months']:
+        if months is not None and month not in months:
+            continue
+        # 월별 NetCDF 파일명 생성 (예: "trans_2019_01.nc", "trans_2019_02.nc", …)
+        nc_filename = os.path.join(fpath, f"trans_{year}_{month:02d}.nc")
+        jobs.append((month, start, stop, nc_filename, subset_days))
+
+    n_workers = n_workers or default_workers(len(jobs))
+    if n_workers == 1:
+        for month, start, stop, nc_filename, subset_days in jobs:
+            write_trans_month(nc_filename, subset_days, np.transpose(trans[:, start:stop, :], (1, 0, 2)),
+                              pdata1, pdata2, lrdata, **write_kw)
+            print(f"Saved month {month:02d} data to {nc_filename}")
+        return [job[3] for job in jobs]
+
+    trans_spec = share_array(trans)
+    try:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            futures = {pool.submit(with_parent(_trans_month_worker), trans_spec, start, stop, nc_filename,
+                                   subset_days, pdata1, pdata2, lrdata, write_kw): month
+                       for month, start, stop, nc_filename, subset_days in jobs}
+            for future in as_completed(futures):
+                print(f"Saved month {futures[future]:02d} data to {future.result()}")
+    finally:
+        release_array(trans_spec)
+    return [job[3] for job in jobs]
+
+
+if __name__ == "__main__":
+    # -----------------------------------------------------------------
+    # 1. .mat 파일 로드 및 데이터 전처리
+    # -----------------------------------------------------------------
+    year = 2019
+    base_path  = r"D:\Dropbox\y2025\01_Atlantis\05_hycom"
+    fpath      = os.path.join(base_path, str(year))
+    fnameTrans = f"trans_new_{year}.mat"
+    fnameBMG   = 'bgm_v2.mat'
+    n_workers  = None  # None이면 CPU 코어 수 (최대 12)
+
+    # trans: shape = (n_faces, n_time, n_levels) = (548, 729, 6)
+    # 전체를 메모리에 올리지 않고 월별 구간만 읽음
+    mat_file_name1 = os.path.join(fpath, fnameTrans)
+    trans          = open_mat_array(mat_file_name1, 'T', precision='float32')  # 읽는 시점에 float32로 변환
+
+    mat_file_name2 = os.path.join(base_path, fnameBMG)
+    face_data      = scipy.io.loadmat(mat_file_name2)
+
+    lrdata = face_data['lr']
+    pdata1 = face_data['pt1']
+    pdata2 = face_data['pt2']
+
+    # 차원 / 시간 축 정보 (dt는 HYDRO_DT = 12시간, time 개수가 1년을 넘으면 ValueError, 모자라면 경고)
+    grid = make_hydro_grid(year, {'trans': trans})
+
+    # -----------------------------------------------------------------
+    # 2. 월별로 NetCDF 파일 생성 (프로세스 풀)
+    # -----------------------------------------------------------------
+    write_trans_monthly(trans, pdata1, pdata2, lrdata, grid, fpath, n_workers=n_workers)
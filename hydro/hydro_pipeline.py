@@ -0,0 +1,455 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Apr  7 09:30:12 2025
+
+@author: Ukjae
+
+hydro 전체 과정을 한 번에 실행하는 파이프라인
+  (격자 NetCDF -> box 평균 .mat) -> .mat -> 월별 avs/trans NetCDF -> hydroconstruct -> CDL 변환(ncgen) -> 연도별 병합 파일
+
+ocean_files (격자 해양 모델 NetCDF)를 지정하면 첫 단계 (boxavg)에서 .mat 입력을 직접 생성
+
+각 단계의 입력(월별 자료 구간, param 템플릿 등)과 출력 파일의 내용 해시를
+manifest (pipeline_manifest_{year}.json)에 기록하고, 입력이 바뀐 단계/월만 다시 실행
+
+여러 연도 실행 (경로 / box, face 개수 / dt 는 JSON 설정 파일로 지정):
+  python hydro_pipeline.py 2000 2020 --config pipeline_config.json
+  python hydro_pipeline.py 2019 --stages avs trans --force
+"""
+
+import os
+import sys
+import json
+import time
+import glob
+import hashlib
+import argparse
+import traceback
+import multiprocessing
+import scipy.io
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from Atlantis_hydro_tools import (OUTPUT_PROFILES, PRECISIONS, make_hydro_grid, open_mat_array, quantization_report,
+                                  check_face_topology, transport_balance)
+# Atlantis_trace는 initial 디렉터리 모듈 (Atlantis_hydro_tools를 import할 때 경로 추가)
+from Atlantis_trace import span, traced, set_trace_file, trace_file, with_parent
+from get_avs_monthly_fianl import write_avs_monthly
+from get_trans_monthly_final import write_trans_monthly
+from get_hydro_final import run_hydroconstruct_year, param_input_files
+from get_hydro_netcdf import ncgen_month, merge_year
+from get_box_average import get_box_weights, box_average_year
+
+# 기본 설정 (config로 덮어씀)
+DEFAULT_CONFIG = {
+    'hycom_dir': r"D:\Dropbox\y2025\01_Atlantis\05_hycom",                    # {year}/av_temp_{year}.mat 등
+    'bgm_mat': r"D:\Dropbox\y2025\01_Atlantis\05_hycom\bgm_v2.mat",
+    'bgm_file': None,     # .bgm 파일: 지정하면 box / face 개수 확인, bgm_mat이 None이면 face 좌표 / lr도 사용
+    'hydro_dir': r"H:\Dropbox\y2025\01_Atlantis\06_hydro\branches\s1",       # {year}/ 작업 폴더
+    'template_param_file': r"H:\Dropbox\y2025\01_Atlantis\06_hydro\branches\s1\param_2025.prm",
+    'hydroconstruct_exe': r"H:\Dropbox\y2025\01_Atlantis\06_hydro\branches\s1\hydroconstruct.exe",
+    'variables': ['salt', 'temp', 'flow'],
+    'ocean_files': None,  # 격자 해양 모델 NetCDF glob 패턴 (예: ".../hycom_{year}_*.nc"). 지정하면 boxavg 단계 실행
+    'cum_depths': None,   # boxavg 층 경계 (누적 깊이, 0부터. make_init_csv와 같은 값)
+    'ocean_vars': None,   # boxavg 변수 이름 {'temp', 'salt', 'u', 'v'} (None이면 HYCOM 이름)
+    'weights_cache_dir': None,  # boxavg 가중치 캐시 (.npz, memmap). None이면 {hycom_dir}/box_weights
+    'dt': 43200,          # 입력 자료 시간 간격 (초, 12시간). time 개수 x dt가 1년을 넘으면 오류
+    'output_dt': None,    # hydroconstruct 출력 시간 간격 (초, 병합 시 확인). None이면 월별 파일의 t:dt 사용
+    'n_boxes': None,      # 지정하면 av_temp / av_salt 의 box 개수 확인
+    'n_faces': None,      # 지정하면 trans 의 face 개수 확인
+    'precision': 'float32',    # .mat 자료를 읽는 시점의 자료형: 'float64' | 'float32' | 'int16'
+    'precision_report': False,  # True 이면 변수별 최대 양자화 오차를 quantization_{year}_{stage}.csv로 저장
+    'output_profile': 'fast',  # 월별 avs / trans 파일: 'fast' | 'compressed' | 'timeseries'
+    'n_workers': None,    # 연도 하나 안에서 월별 작업 수
+    'year_workers': None,  # 동시에 실행할 연도 수
+    'transport_check': True,  # bgm_file이 있으면 trans 단계에서 face 정보 확인 + transport_balance_{year}.csv 저장
+    'trace_file': None,   # 단계별 실행 시간 / 메모리 / 입출력 바이트 기록 (JSON lines, Atlantis_trace)
+}
+
+
+# ---------------------------------------------------------------------------
+# load_config: JSON 설정 파일을 읽어 DEFAULT_CONFIG 위에 덮어씀 (없는 키는 기본값)
+# check_config: 필수 설정 확인 (face 정보를 얻을 bgm_mat 또는 bgm_file 중 하나는 필요)
+# ---------------------------------------------------------------------------
+def check_config(cfg, source="설정"):
+    if not cfg.get('bgm_mat') and not cfg.get('bgm_file'):
+        raise ValueError(f"{source}: bgm_mat (bgm_v2.mat) 또는 bgm_file (.bgm) 중 하나는 지정해야 합니다.")
+    return cfg
+
+
+def load_config(config_file=None):
+    cfg = dict(DEFAULT_CONFIG)
+    if config_file is None:
+        return check_config(cfg)
+    with open(config_file, 'r', encoding='utf-8') as f:
+        user_cfg = json.load(f)
+    unknown = sorted(set(user_cfg) - set(DEFAULT_CONFIG))
+    if unknown:
+        raise ValueError(f"{config_file}: 알 수 없는 설정 항목 {unknown}")
+    cfg.update(user_cfg)
+    return check_config(cfg, config_file)
+
+STAGES = ['boxavg', 'avs', 'trans', 'hydroconstruct', 'ncgen', 'merge']
+
+
+# ---------------------------------------------------------------------------
+# 해시 / manifest
+# ---------------------------------------------------------------------------
+def file_hash(path):
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _digest(*parts):
+    # 문자열 / 배열 / 숫자를 이어 붙인 해시
+    h = hashlib.sha1()
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            h.update(str(part.shape).encode())
+            h.update(np.ascontiguousarray(part).tobytes())
+        else:
+            h.update(str(part).encode())
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+def exe_digest(hydroconstruct_exe):
+    # 실행 파일 경로 또는 명령 목록: 존재하는 파일은 내용 해시, 나머지 (PATH의 명령, 옵션)는 문자열
+    exe = [hydroconstruct_exe] if isinstance(hydroconstruct_exe, str) else list(hydroconstruct_exe)
+    return _digest(*[file_hash(p) if os.path.isfile(p) else p for p in exe])
+
+
+def load_manifest(path):
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+
+def save_manifest(manifest, path):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def is_current(manifest, key, input_digest):
+    # 입력 해시가 같고, 기록된 출력 파일이 모두 그대로 있으면 최신
+    entry = manifest.get(key)
+    if entry is None or entry.get('inputs') != input_digest:
+        return False
+    for path, digest in entry.get('outputs', {}).items():
+        if not os.path.exists(path) or file_hash(path) != digest:
+            return False
+    return True
+
+
+def record(manifest, key, input_digest, outputs):
+    manifest[key] = {
+        'inputs': input_digest,
+        'outputs': {path: file_hash(path) for path in outputs if os.path.exists(path)},
+    }
+
+
+# ---------------------------------------------------------------------------
+# check_transport: 월별 trans 파일에 기록할 face 정보 (bgm_v2.mat 또는 BGM)를 BGM 구조와 비교하고
+# box별 수송량 수지를 transport_balance_{year}.csv로 저장
+# lr / 좌표가 BGM과 다르면 (dest/source box 또는 transport 부호가 틀림) ValueError
+# ---------------------------------------------------------------------------
+_FACE_ERRORS = ('invalid_lr', 'pt_mismatch', 'lr_mismatch')
+
+
+def check_transport(year, trans, face_data, grid, working_dir):
+    topology = grid['topology']
+    result = check_face_topology(topology, face_data['pt1'], face_data['pt2'], face_data['lr'])
+    errors = {name: ids for name, ids in result['issues'].items() if name in _FACE_ERRORS and len(ids)}
+    if errors:
+        raise ValueError(f"[{year}] face 정보가 BGM과 다릅니다: " + ", ".join(f"{k} {len(v)}개" for k, v in errors.items()))
+
+    # trans 파일 chunk와 같은 time 구간씩 읽어 1년치 배열을 메모리에 올리지 않음
+    report = transport_balance(trans, topology, dt=grid['dt'], time_block=grid['chunks']['trans'][0])
+    report_file = os.path.join(working_dir, f"transport_balance_{year}.csv")
+    report.to_csv(report_file, index=False)
+    worst = report.sort_values('rel_imbalance', ascending=False).head(5)
+    print(f"[{year}] box별 수송량 수지 저장: {report_file} (rel_imbalance 상위 5개)\n"
+          f"{worst[['box', 'mean_net', 'mean_gross', 'rel_imbalance']].to_string(index=False)}")
+    return report
+
+
+# ---------------------------------------------------------------------------
+# run_year_pipeline: 1년치 파이프라인 실행. force=True 이면 manifest와 관계없이 전부 실행
+# stages로 일부 단계만 실행 가능. 반환: 단계별로 실제 실행한 항목 목록
+# ---------------------------------------------------------------------------
+@traced('pipeline.year', 'year')
+def run_year_pipeline(year, config=None, force=False, stages=STAGES):
+    cfg = check_config(dict(DEFAULT_CONFIG, **(config or {})))
+    mat_dir = os.path.join(cfg['hycom_dir'], str(year))
+    working_dir = os.path.join(cfg['hydro_dir'], str(year))
+    os.makedirs(working_dir, exist_ok=True)
+    manifest_file = os.path.join(working_dir, f"pipeline_manifest_{year}.json")
+    manifest = {} if force else load_manifest(manifest_file)
+    ran = {stage: [] for stage in STAGES}
+
+    def open_input(file_name, var_name):
+        return open_mat_array(os.path.join(mat_dir, file_name), var_name, cfg['precision'])
+
+    def report_precision(stage, names):
+        # 원본 (float64)과 다시 비교하므로 자료를 한 번 더 읽음
+        if not cfg['precision_report'] or cfg['precision'] == 'float64':
+            return
+        report = quantization_report({var_name: (open_mat_array(os.path.join(mat_dir, file_name), var_name), arr)
+                                      for var_name, (file_name, arr) in names.items()})
+        report_file = os.path.join(working_dir, f"quantization_{year}_{stage}.csv")
+        report.to_csv(report_file, index=False)
+        print(f"[{year}] {stage} 양자화 오차 ({cfg['precision']}):\n{report.to_string(index=False)}")
+
+    def hydro_grid(arrays):
+        return make_hydro_grid(year, arrays, dt=cfg['dt'], bgm_file=cfg['bgm_file'],
+                               n_boxes=cfg['n_boxes'], n_faces=cfg['n_faces'])
+
+    # 0. 격자 해양 모델 NetCDF -> av_temp / av_salt / trans_new .mat (입력: NetCDF 파일 크기 / 수정 시각 + BGM + 층)
+    if 'boxavg' in stages and cfg['ocean_files']:
+        with span('pipeline.boxavg', year=year):
+            if cfg['bgm_file'] is None or cfg['cum_depths'] is None:
+                raise ValueError("boxavg 단계에는 bgm_file과 cum_depths 설정이 필요합니다.")
+            nc_files = sorted(glob.glob(cfg['ocean_files'].format(year=year)))
+            if not nc_files:
+                raise ValueError(f"[{year}] 해양 모델 파일이 없습니다: {cfg['ocean_files'].format(year=year)}")
+            key = "boxavg"
+            digest = _digest(key, file_hash(cfg['bgm_file']), cfg['cum_depths'], cfg['ocean_vars'],
+                             *[(p, os.stat(p).st_size, os.stat(p).st_mtime_ns) for p in nc_files])
+            if not is_current(manifest, key, digest):
+                weights = get_box_weights(cfg['bgm_file'], cfg['cum_depths'], nc_files[0],
+                                          cache_dir=cfg['weights_cache_dir'] or os.path.join(cfg['hycom_dir'], 'box_weights'))
+                box_average_year(year, nc_files, weights, output_dir=mat_dir, var_names=cfg['ocean_vars'])
+                record(manifest, key, digest, [os.path.join(mat_dir, name) for name in
+                                               (f"av_temp_{year}.mat", f"av_salt_{year}.mat", f"trans_new_{year}.mat")])
+                ran['boxavg'].append(year)
+                save_manifest(manifest, manifest_file)
+
+    # 1. 월별 수온/염분 NetCDF (입력: 해당 월의 temp/salt 자료 구간)
+    if 'avs' in stages:
+        with span('pipeline.avs', year=year):
+            temp = open_input(f"av_temp_{year}.mat", 'av_temp')
+            salt = open_input(f"av_salt_{year}.mat", 'av_salt')
+            grid = hydro_grid({'temp': temp, 'salt': salt})
+            report_precision('avs', {'av_temp': (f"av_temp_{year}.mat", temp), 'av_salt': (f"av_salt_{year}.mat", salt)})
+            digests = {}
+            for month, start, stop, days in grid['months']:
+                key = f"avs/{month:02d}"
+                digests[month] = _digest(key, days, cfg['output_profile'], cfg['precision'],
+                                         np.asarray(temp[:, start:stop, :]), np.asarray(salt[:, start:stop, :]))
+                if not is_current(manifest, key, digests[month]):
+                    ran['avs'].append(month)
+            if ran['avs']:
+                write_avs_monthly(temp, salt, grid, working_dir, n_workers=cfg['n_workers'], months=ran['avs'],
+                                  profile=cfg['output_profile'])
+                for month in ran['avs']:
+                    record(manifest, f"avs/{month:02d}", digests[month],
+                           [os.path.join(working_dir, f"avs_{year}_{month:02d}.nc")])
+                save_manifest(manifest, manifest_file)
+
+    # 2. 월별 transport NetCDF (입력: 해당 월의 trans 자료 구간 + bgm_v2.mat 또는 .bgm)
+    if 'trans' in stages:
+        with span('pipeline.trans', year=year):
+            trans = open_input(f"trans_new_{year}.mat", 'T')
+            grid = hydro_grid({'trans': trans})
+            report_precision('trans', {'T': (f"trans_new_{year}.mat", trans)})
+            bgm_digest = file_hash(cfg['bgm_mat'] or cfg['bgm_file'])
+            digests = {}
+            for month, start, stop, days in grid['months']:
+                key = f"trans/{month:02d}"
+                digests[month] = _digest(key, days, bgm_digest, cfg['output_profile'], cfg['precision'],
+                                         np.asarray(trans[:, start:stop, :]))
+                if not is_current(manifest, key, digests[month]):
+                    ran['trans'].append(month)
+            if ran['trans']:
+                face_data = scipy.io.loadmat(cfg['bgm_mat']) if cfg['bgm_mat'] else grid
+                if cfg['transport_check'] and 'topology' in grid:
+                    check_transport(year, trans, face_data, grid, working_dir)
+                write_trans_monthly(trans, face_data['pt1'], face_data['pt2'], face_data['lr'], grid, working_dir,
+                                    n_workers=cfg['n_workers'], months=ran['trans'], profile=cfg['output_profile'])
+                for month in ran['trans']:
+                    record(manifest, f"trans/{month:02d}", digests[month],
+                           [os.path.join(working_dir, f"trans_{year}_{month:02d}.nc")])
+                save_manifest(manifest, manifest_file)
+
+    # 3. hydroconstruct (입력: 월별 avs/trans NetCDF + param 템플릿 + 실행 파일)
+    if 'hydroconstruct' in stages:
+        with span('pipeline.hydroconstruct', year=year):
+            # param 템플릿, 실행 파일, param이 참조하는 geofile 등 입력 파일 내용이 바뀌면 다시 실행
+            with open(cfg['template_param_file'], 'r', encoding='utf-8') as f:
+                param_files = param_input_files(f.readlines(), working_dir)
+            param_digest = _digest(file_hash(cfg['template_param_file']), exe_digest(cfg['hydroconstruct_exe']),
+                                   *[f"{token}={file_hash(path)}" for token, path in param_files])
+            digests = {}
+            for month in range(1, 13):
+                inputs = [os.path.join(working_dir, f"{kind}_{year}_{month:02d}.nc") for kind in ('avs', 'trans')]
+                if not all(os.path.exists(p) for p in inputs):
+                    continue
+                key = f"hydroconstruct/{month:02d}"
+                digests[month] = _digest(key, param_digest, *[file_hash(p) for p in inputs])
+                if not is_current(manifest, key, digests[month]):
+                    ran['hydroconstruct'].append(month)
+            if ran['hydroconstruct']:
+                jobs = run_hydroconstruct_year(year, cfg['template_param_file'], working_dir, cfg['hydroconstruct_exe'],
+                                               months=ran['hydroconstruct'], n_workers=cfg['n_workers'])
+                for job in jobs:
+                    if job['ok']:
+                        record(manifest, f"hydroconstruct/{job['month']:02d}", digests[job['month']], job['outputs'])
+                save_manifest(manifest, manifest_file)
+
+    # 4. CDL -> NetCDF 변환 (입력: 월별 hydroconstruct 텍스트 출력)
+    if 'ncgen' in stages:
+        with span('pipeline.ncgen', year=year):
+            todo = []
+            for var in cfg['variables']:
+                for month in range(1, 13):
+                    txt_file = os.path.join(working_dir, f"{var}_{year}_{month:02d}.txt")
+                    if not os.path.exists(txt_file):
+                        continue
+                    key = f"ncgen/{var}/{month:02d}"
+                    digest = _digest(key, file_hash(txt_file))
+                    if not is_current(manifest, key, digest):
+                        todo.append((var, month, key, digest))
+            if todo:
+                # CDL 변환은 파이썬 안에서 실행되므로 프로세스 풀 사용
+                with ProcessPoolExecutor(max_workers=cfg['n_workers'] or os.cpu_count()) as pool:
+                    results = list(pool.map(with_parent(ncgen_month), [job[0] for job in todo], [year] * len(todo),
+                                            [job[1] for job in todo], [working_dir] * len(todo),
+                                            [working_dir] * len(todo)))
+                for (var, month, key, digest), time_steps in zip(todo, results):
+                    if time_steps is not None:
+                        record(manifest, key, digest, [os.path.join(working_dir, f"{var}_{year}_{month:02d}.nc")])
+                        ran['ncgen'].append(f"{var}_{month:02d}")
+                save_manifest(manifest, manifest_file)
+
+    # 5. 연도별 병합 (입력: 월별 NetCDF 12개)
+    if 'merge' in stages:
+        with span('pipeline.merge', year=year):
+            for var in cfg['variables']:
+                monthly = [os.path.join(working_dir, f"{var}_{year}_{month:02d}.nc") for month in range(1, 13)]
+                if not all(os.path.exists(p) for p in monthly):
+                    print(f"[{year}] {var}: 월별 NetCDF가 모두 있지 않아 병합을 건너뜀")
+                    continue
+                key = f"merge/{var}"
+                digest = _digest(key, *[file_hash(p) for p in monthly])
+                if is_current(manifest, key, digest):
+                    continue
+                # 병합 실패는 예외로 전달되어 해당 연도가 실패로 기록됨
+                # 병합 대상은 hydroconstruct 출력이므로 입력 .mat의 dt가 아니라 출력 파일의 t:dt (또는 output_dt) 사용
+                merged_file = merge_year(var, year, working_dir, dt=cfg['output_dt'])
+                record(manifest, key, digest, [merged_file])
+                ran['merge'].append(var)
+                save_manifest(manifest, manifest_file)
+
+    for stage in STAGES:
+        print(f"[{year}] {stage}: 실행 {len(ran[stage])}건 {ran[stage]}")
+    return ran
+
+
+# ---------------------------------------------------------------------------
+# run_years: 여러 연도를 동시에 실행. 한 연도의 실패는 다른 연도에 영향을 주지 않음
+# netCDF4는 thread-safe 하지 않고 연도 안에서 다시 프로세스 풀을 만들므로 연도마다 별도 프로세스 (spawn)로 실행
+# (year_workers가 1이면 현재 프로세스에서 차례로 실행)
+# n_workers를 지정하지 않으면 CPU 수를 동시 실행 연도 수로 나눠 씀
+# 반환: {year: {'status': 'ok' | 'failed', 'ran', 'error', 'elapsed'}}
+# ---------------------------------------------------------------------------
+def _run_year_safe(year, cfg, force, stages):
+    start = time.time()
+    try:
+        ran = run_year_pipeline(year, cfg, force=force, stages=stages)
+        return {'status': 'ok', 'ran': ran, 'error': None, 'elapsed': time.time() - start}
+    except Exception as e:
+        traceback.print_exc()
+        return {'status': 'failed', 'ran': None, 'error': f"{type(e).__name__}: {e}",
+                'elapsed': time.time() - start}
+
+
+def run_years(years, config=None, force=False, stages=STAGES, year_workers=None):
+    cfg = check_config(dict(DEFAULT_CONFIG, **(config or {})))
+    years = sorted(set(years))
+    year_workers = max(1, min(len(years), year_workers or cfg['year_workers'] or os.cpu_count() or 1))
+    if cfg['n_workers'] is None:
+        cfg['n_workers'] = max(1, (os.cpu_count() or 1) // year_workers)
+
+    # 환경 변수로 전달되므로 월별 작업 프로세스도 같은 파일에 기록. 끝나면 이전 설정으로 되돌림
+    previous_trace = trace_file()
+    if cfg['trace_file']:
+        set_trace_file(cfg['trace_file'])
+
+    results = {}
+    print(f"{len(years)}개 연도 실행 ({years[0]}-{years[-1]}), 동시 실행 {year_workers}개, 연도별 작업 {cfg['n_workers']}개")
+    def report(done, year):
+        status = "완료" if results[year]['status'] == 'ok' else f"실패 - {results[year]['error']}"
+        print(f"[{done}/{len(years)}] {year}년 {status} ({results[year]['elapsed']:.1f}초)")
+
+    try:
+        if year_workers == 1:
+            for done, year in enumerate(years, start=1):
+                results[year] = _run_year_safe(year, cfg, force, stages)
+                report(done, year)
+        else:
+            # fork는 스레드가 있는 부모 상태를 복사하므로 spawn 사용 (trace 파일은 환경 변수로 전달)
+            with ProcessPoolExecutor(max_workers=year_workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+                futures = {pool.submit(with_parent(_run_year_safe), year, cfg, force, stages): year for year in years}
+                for done, future in enumerate(as_completed(futures), start=1):
+                    year = futures[future]
+                    try:
+                        results[year] = future.result()
+                    except Exception as e:
+                        # 작업 프로세스가 비정상 종료한 경우 (BrokenProcessPool 등)
+                        results[year] = {'status': 'failed', 'ran': None, 'error': f"{type(e).__name__}: {e}",
+                                         'elapsed': 0.0}
+                    report(done, year)
+    finally:
+        set_trace_file(previous_trace)
+
+    failed = [year for year in years if results[year]['status'] != 'ok']
+    if failed:
+        print(f"실패한 연도: {failed}")
+    return {year: results[year] for year in years}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Atlantis hydro 파이프라인 (여러 연도)")
+    parser.add_argument('start_year', type=int)
+    parser.add_argument('end_year', type=int, nargs='?', help="마지막 연도 (포함, 생략하면 start_year만)")
+    parser.add_argument('--config', help="JSON 설정 파일 (경로, n_boxes, n_faces, dt 등)")
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES)
+    parser.add_argument('--force', action='store_true', help="manifest와 관계없이 모두 다시 실행")
+    parser.add_argument('--year-workers', type=int, help="동시에 실행할 연도 수")
+    parser.add_argument('--workers', type=int, help="연도 하나 안에서 월별 작업 수")
+    parser.add_argument('--precision', choices=PRECISIONS, help=".mat 자료를 읽는 시점의 자료형")
+    parser.add_argument('--precision-report', action='store_true', help="변수별 최대 양자화 오차 저장")
+    parser.add_argument('--profile', choices=list(OUTPUT_PROFILES), help="월별 avs / trans 파일 출력 profile")
+    parser.add_argument('--trace', help="단계별 실행 기록 파일 (JSON lines)")
+    args = parser.parse_args(argv)
+
+    end_year = args.end_year if args.end_year is not None else args.start_year
+    if end_year < args.start_year:
+        parser.error("end_year는 start_year보다 작을 수 없습니다.")
+    try:
+        cfg = load_config(args.config)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.workers is not None:
+        cfg['n_workers'] = args.workers
+    if args.precision is not None:
+        cfg['precision'] = args.precision
+    if args.precision_report:
+        cfg['precision_report'] = True
+    if args.profile is not None:
+        cfg['output_profile'] = args.profile
+    if args.trace is not None:
+        cfg['trace_file'] = args.trace
+    results = run_years(range(args.start_year, end_year + 1), cfg, force=args.force,
+                        stages=args.stages, year_workers=args.year_workers)
+    return 0 if all(r['status'] == 'ok' for r in results.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,61 +6,294 @@ Created on Tue Mar 25 14:03:58 2025
 """
 import os
 import re
+import fnmatch
+import hashlib
+import tempfile
 import numpy as np
 import pandas as pd
 from netCDF4 import Dataset
+from Atlantis_trace import traced, count, count_file, event
 
 # ---------------------------------------------------------------------------
-# make_map_data_init: BGM 파일과 누적 깊이(cum_depths) 벡터를 이용하여 각 상자의
-# 지오메트리 정보를 계산 (MATLAB: makeMapDataInit.m)
+# read_bgm: BGM 파일을 한 번만 읽어 상자(box), 면(face), 꼭짓점(vertex), 헤더 키를
+# 인덱스 구조로 정리 (파일 크기에 선형인 단일 패스 파서)
 # ---------------------------------------------------------------------------
-def make_map_data_init(bgm_file, cum_depths):
+_BGM_KEY_RE = re.compile(r'^(box|face)(\d+)\.(\w+)$')
+
+# 상자/면 항목 중 스칼라 또는 고정 길이 벡터로 저장되는 키와 컬럼 이름
+_BGM_BOX_COLUMNS = {
+    'label': ['label'],
+    'inside': ['inside_x', 'inside_y'],
+    'nconn': ['nconn'],
+    'botz': ['botz'],
+    'area': ['area'],
+    'vertmix': ['vertmix'],
+    'horizmix': ['horizmix'],
+}
+_BGM_FACE_COLUMNS = {
+    'p1': ['p1_x', 'p1_y'],
+    'p2': ['p2_x', 'p2_y'],
+    'length': ['length'],
+    'cs': ['cs_x', 'cs_y'],
+    'lr': ['left', 'right'],
+}
+# 숫자가 아닌 원문 그대로 보관하는 키 (누락 값은 '')
+_BGM_TEXT_KEYS = {'label'}
+# 상자별 가변 길이 목록 (연결 면, 이웃 상자, 연결 길이)
+_BGM_BOX_LISTS = ['iface', 'ibox', 'ilength']
+
+
+def _to_float(token):
+    try:
+        return float(token)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _bgm_table(raw, count, columns):
+    # raw: {index: {key: tokens}} -> columns 순서의 DataFrame (누락 값은 NaN)
+    # _BGM_TEXT_KEYS에 속한 키 (label)는 문자열 컬럼으로 보관
+    names = [c for cols in columns.values() for c in cols]
+    values = np.full((count, len(names)), np.nan)
+    texts = {key: [''] * count for key in columns if key in _BGM_TEXT_KEYS}
+    for i, entry in raw.items():
+        if i >= count:
+            continue
+        j = 0
+        for key, cols in columns.items():
+            tokens = entry.get(key, [])
+            if key in texts:
+                texts[key][i] = ' '.join(tokens)
+            else:
+                for k in range(len(cols)):
+                    if k < len(tokens):
+                        values[i, j + k] = _to_float(tokens[k])
+            j += len(cols)
+    table = pd.DataFrame(values, columns=names)
+    for key, vals in texts.items():
+        table[columns[key][0]] = vals
+    return table
+
+
+@traced('bgm.parse', 'bgm_file')
+def read_bgm(bgm_file):
+    count_file('bytes_read', bgm_file)
+    header = {}
+    bnd_vert = []
+    boxes_raw = {}
+    faces_raw = {}
+    box_vert = {}
+
     with open(bgm_file, 'r') as f:
-        lines = f.readlines()
-    
-    numboxes = 0
-    # BGM 파일에서 "nbox" 행을 찾아 상자 개수를 결정
-    for line in lines:
-        if line.strip().startswith("nbox"):
-            parts = re.split(r'\s+', line.strip())
-            try:
-                numboxes = int(float(parts[1]))
-            except:
-                numboxes = 0
+        for line in f:
+            parts = line.split()
+            if not parts or parts[0].startswith('#'):
+                continue
+            key, tokens = parts[0], parts[1:]
+            m = _BGM_KEY_RE.match(key)
+            if m is None:
+                # 헤더 키 (nbox, nface, projection, maxwcbotz 등)
+                if key == 'bnd_vert':
+                    bnd_vert.append([_to_float(t) for t in tokens[:2]])
+                else:
+                    header[key] = ' '.join(tokens)
+                continue
+            kind, idx, attr = m.group(1), int(m.group(2)), m.group(3)
+            if kind == 'box':
+                if attr == 'vert':
+                    box_vert.setdefault(idx, []).append([_to_float(t) for t in tokens[:2]])
+                else:
+                    boxes_raw.setdefault(idx, {})[attr] = tokens
+            else:
+                faces_raw.setdefault(idx, {})[attr] = tokens
+
+    def _count(name, raw):
+        # 헤더에 개수가 없거나 잘못되어 있으면 실제 항목 수로 대체
+        try:
+            return int(float(header[name].split()[0]))
+        except (KeyError, IndexError, ValueError):
+            return max(raw) + 1 if raw else 0
+
+    numboxes = _count('nbox', boxes_raw)
+    numfaces = _count('nface', faces_raw)
+
+    boxes = _bgm_table(boxes_raw, numboxes, _BGM_BOX_COLUMNS)
+    boxes.insert(0, 'boxid', np.arange(numboxes))
+    faces = _bgm_table(faces_raw, numfaces, _BGM_FACE_COLUMNS)
+    faces.insert(0, 'faceid', np.arange(numfaces))
+
+    bgm = {
+        'header': header,
+        'numboxes': numboxes,
+        'numfaces': numfaces,
+        'boxes': boxes,
+        'faces': faces,
+        'bnd_vert': np.array(bnd_vert, dtype=float).reshape(-1, 2),
+        'box_vert': [np.array(box_vert.get(i, []), dtype=float).reshape(-1, 2)
+                     for i in range(numboxes)],
+    }
+    for key in _BGM_BOX_LISTS:
+        dtype = float if key == 'ilength' else int
+        bgm[f'box_{key}'] = [np.array([dtype(float(t)) for t in boxes_raw.get(i, {}).get(key, [])],
+                                      dtype=dtype)
+                             for i in range(numboxes)]
+    return bgm
+
+# ---------------------------------------------------------------------------
+# load_bgm: read_bgm 결과를 BGM 내용 해시 + 수정 시각(mtime)을 키로 하는 .npz 캐시에
+# 저장/재사용. 캐시 디렉터리 전체 크기가 max_cache_bytes를 넘으면 오래 사용하지 않은
+# 파일부터 삭제 (LRU)
+# ---------------------------------------------------------------------------
+BGM_CACHE_DIR = os.environ.get('ATLANTIS_BGM_CACHE')
+BGM_CACHE_MAX_BYTES = 256 * 1024 ** 2
+_BGM_CACHE_VERSION = 2
+
+
+def _bgm_cache_key(bgm_file):
+    h = hashlib.sha1()
+    with open(bgm_file, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    h.update(f"{os.stat(bgm_file).st_mtime_ns}-{_BGM_CACHE_VERSION}".encode())
+    return h.hexdigest()
+
+
+def _pack_ragged(arrays, dtype):
+    # 가변 길이 목록 -> (연결된 값, 시작 위치) 쌍
+    ptr = np.zeros(len(arrays) + 1, dtype=np.int64)
+    ptr[1:] = np.cumsum([len(a) for a in arrays])
+    if len(arrays) and ptr[-1] > 0:
+        flat = np.concatenate(arrays).astype(dtype)
+    else:
+        flat = np.zeros((0,) + (arrays[0].shape[1:] if arrays else ()), dtype=dtype)
+    return flat, ptr
+
+
+def _unpack_ragged(flat, ptr):
+    return [flat[ptr[i]:ptr[i + 1]] for i in range(len(ptr) - 1)]
+
+
+def _split_text_columns(table):
+    # 숫자 컬럼 (float 행렬로 저장)과 문자열 컬럼 (label 등) 이름 분리
+    text = [c for c in table.columns if not pd.api.types.is_numeric_dtype(table[c])]
+    return [c for c in table.columns if c not in text], text
+
+
+def _save_bgm_cache(bgm, path):
+    box_num, box_text = _split_text_columns(bgm['boxes'])
+    arrays = {
+        'version': np.array(_BGM_CACHE_VERSION),
+        'header_keys': np.array(list(bgm['header'].keys()), dtype=str),
+        'header_values': np.array(list(bgm['header'].values()), dtype=str),
+        'counts': np.array([bgm['numboxes'], bgm['numfaces']]),
+        'boxes': bgm['boxes'][box_num].to_numpy(dtype=float),
+        'boxes_columns': np.array(box_num, dtype=str),
+        'boxes_text': bgm['boxes'][box_text].to_numpy(dtype=str).reshape(bgm['numboxes'], len(box_text)),
+        'boxes_text_columns': np.array(box_text, dtype=str),
+        'boxes_order': np.array(bgm['boxes'].columns, dtype=str),
+        'faces': bgm['faces'].to_numpy(dtype=float),
+        'faces_columns': np.array(bgm['faces'].columns, dtype=str),
+        'bnd_vert': bgm['bnd_vert'],
+    }
+    arrays['box_vert'], arrays['box_vert_ptr'] = _pack_ragged(bgm['box_vert'], float)
+    for key in _BGM_BOX_LISTS:
+        dtype = float if key == 'ilength' else int
+        arrays[f'box_{key}'], arrays[f'box_{key}_ptr'] = _pack_ragged(bgm[f'box_{key}'], dtype)
+    # 동시 실행 중 다른 프로세스 / 스레드가 반쯤 쓰인 파일을 읽지 않도록 고유한 임시 파일 후 교체
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path)[:-4] + '.', suffix='.tmp.npz',
+                                    dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, **arrays)
+        os.chmod(tmp_path, 0o644)  # mkstemp은 0600으로 만들므로 다른 사용자도 캐시를 읽을 수 있게
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _load_bgm_cache(path):
+    with np.load(path, allow_pickle=False) as d:
+        if int(d['version']) != _BGM_CACHE_VERSION:
+            return None
+        numboxes, numfaces = (int(v) for v in d['counts'])
+        bgm = {
+            'header': dict(zip(d['header_keys'].tolist(), d['header_values'].tolist())),
+            'numboxes': numboxes,
+            'numfaces': numfaces,
+            'boxes': pd.DataFrame(d['boxes'], columns=d['boxes_columns'].tolist()),
+            'faces': pd.DataFrame(d['faces'], columns=d['faces_columns'].tolist()),
+            'bnd_vert': d['bnd_vert'],
+            'box_vert': _unpack_ragged(d['box_vert'], d['box_vert_ptr']),
+        }
+        for key in _BGM_BOX_LISTS:
+            bgm[f'box_{key}'] = _unpack_ragged(d[f'box_{key}'], d[f'box_{key}_ptr'])
+        for j, name in enumerate(d['boxes_text_columns'].tolist()):
+            bgm['boxes'][name] = d['boxes_text'][:, j].astype(object)
+        bgm['boxes'] = bgm['boxes'][d['boxes_order'].tolist()].copy()
+    bgm['boxes']['boxid'] = bgm['boxes']['boxid'].astype(int)
+    bgm['faces']['faceid'] = bgm['faces']['faceid'].astype(int)
+    return bgm
+
+
+def _evict_bgm_cache(cache_dir, max_cache_bytes):
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.startswith('bgm_') and name.endswith('.npz') and '.tmp.' not in name:
+            st = os.stat(os.path.join(cache_dir, name))
+            entries.append((st.st_mtime, st.st_size, name))
+    total = sum(e[1] for e in entries)
+    for _, size, name in sorted(entries):
+        if total <= max_cache_bytes:
             break
+        try:
+            os.remove(os.path.join(cache_dir, name))
+        except OSError:
+            continue
+        total -= size
+
+
+@traced('bgm.load', 'bgm_file')
+def load_bgm(bgm_file, cache_dir=None, max_cache_bytes=BGM_CACHE_MAX_BYTES):
+    cache_dir = cache_dir or BGM_CACHE_DIR
+    if not cache_dir:
+        return read_bgm(bgm_file)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    cache_file = os.path.join(cache_dir, f"bgm_{_bgm_cache_key(bgm_file)}.npz")
+    if os.path.exists(cache_file):
+        try:
+            bgm = _load_bgm_cache(cache_file)
+        except (OSError, KeyError, ValueError):
+            bgm = None
+        if bgm is not None:
+            # 최근 사용 시각 갱신 (LRU 삭제 기준)
+            os.utime(cache_file)
+            event('bgm.cache_hit', cache_file=cache_file)
+            count_file('bytes_read', cache_file)
+            return bgm
+
+    bgm = read_bgm(bgm_file)
+    try:
+        _save_bgm_cache(bgm, cache_file)
+        _evict_bgm_cache(cache_dir, max_cache_bytes)
+    except OSError as e:
+        print(f"BGM 캐시 저장 실패 ({cache_file}): {e}")
+    return bgm
+
+# ---------------------------------------------------------------------------
+# make_map_data_init: BGM 파일과 누적 깊이(cum_depths) 벡터를 이용하여 각 상자의
+# 지오메트리 정보를 계산 (MATLAB: makeMapDataInit.m)
+# ---------------------------------------------------------------------------
+@traced('init.map_data', 'bgm_file')
+def make_map_data_init(bgm_file, cum_depths, cache_dir=None):
+    bgm = load_bgm(bgm_file, cache_dir)
+    numboxes = bgm['numboxes']
 
-    # 각 상자의 바닥 깊이 (botz)와 면적을 추출
-    z = []
-    area = []
-    for i in range(numboxes):
-        # botz 추출
-        pattern_botz = f"box{i}.botz"
-        botz_val = np.nan
-        for line in lines:
-            if pattern_botz in line:
-                parts = re.split(r'\s+', line.strip())
-                if len(parts) >= 2:
-                    try:
-                        botz_val = float(parts[1])
-                    except:
-                        botz_val = np.nan
-                break
-        z.append(botz_val)
-        # area 추출
-        pattern_area = f"box{i}.area"
-        area_val = np.nan
-        for line in lines:
-            if pattern_area in line:
-                parts = re.split(r'\s+', line.strip())
-                if len(parts) >= 2:
-                    try:
-                        area_val = float(parts[1])
-                    except:
-                        area_val = np.nan
-                break
-        area.append(area_val)
-    z = np.array(z)
-    area = np.array(area)
+    # 각 상자의 바닥 깊이 (botz)와 면적
+    z = bgm['boxes']['botz'].to_numpy()
+    area = bgm['boxes']['area'].to_numpy()
     # R 코드에서 total_depth = -z
     total_depth = -z
     # 부피 계산 (섬의 경우 부호 반전)
@@ -68,20 +301,22 @@ def make_map_data_init(bgm_file, cum_depths):
     is_island = total_depth <= 0.0
     volume[is_island] = -volume[is_island]
     
-    # 각 상자에 대해 물층 수 계산
-    max_layers = len(cum_depths) - 1
-    numlayers = np.array([min(np.sum(td > np.array(cum_depths)), max_layers) for td in total_depth])
-    
-    # 각 상자에서 불완전한(최상위) 물층의 깊이 계산 (volume 계산에 필요)
-    deepest_depth = []
-    max_layer_depth = max(cum_depths)
-    for td, nl in zip(total_depth, numlayers):
-        if nl > 0:
-            d = min(td, max_layer_depth) - cum_depths[int(nl)]
-        else:
-            d = 0.0
-        deepest_depth.append(d)
-    deepest_depth = np.array(deepest_depth)
+    # 각 상자에 대해 물층 수 계산: total_depth보다 얕은 층 경계의 개수 (NaN 깊이는 0층)
+    cum = np.asarray(cum_depths, dtype=float)
+    max_layers = len(cum) - 1
+    wet_depth = np.nan_to_num(total_depth, nan=-np.inf)
+    numlayers = np.minimum(np.searchsorted(cum, wet_depth, side='left'), max_layers)
+
+    # 상자 x 물층(표층 -> 저층, cum_depths 순서) 두께와 부피 행렬
+    layer_top = cum[:-1]
+    layer_bot = cum[1:]
+    layer_dz = np.clip(np.minimum(wet_depth[:, None], layer_bot[None, :]) - layer_top[None, :], 0.0, None)
+    layer_volume = layer_dz * np.nan_to_num(area)[:, None]
+
+    # 각 상자에서 불완전한(최하위) 물층의 두께 (volume 계산에 필요)
+    deepest_depth = np.zeros(numboxes)
+    has_water = numlayers > 0
+    deepest_depth[has_water] = layer_dz[has_water, numlayers[has_water] - 1]
     
     # 결과를 DataFrame에 저장
     box_data = pd.DataFrame({
@@ -93,12 +328,14 @@ def make_map_data_init(bgm_file, cum_depths):
         'deepest_depth': deepest_depth,
         'is_island': is_island
     })
-    return {'numboxes': numboxes, 'boxData': box_data, 'cumDepths': cum_depths}
+    return {'numboxes': numboxes, 'boxData': box_data, 'cumDepths': cum_depths,
+            'layerThickness': layer_dz, 'layerVolume': layer_volume}
 
 # ---------------------------------------------------------------------------
 # generate_vars_init: 그룹 CSV 파일과 Attribute Template를 이용하여 각 그룹의
 # 생물학적 변수 정보를 생성 (MATLAB: generateVarsInit.m)
 # ---------------------------------------------------------------------------
+@traced('init.generate_vars', 'grp_file')
 def generate_vars_init(grp_file, cum_depths, df_atts, ice_model=False):
     # 그룹 CSV 읽기
     df_grp = pd.read_csv(grp_file)
@@ -128,131 +365,179 @@ def generate_vars_init(grp_file, cum_depths, df_atts, ice_model=False):
     lightAdpnGrps = ['DINOFLAG', 'MICROPHTYBENTHOS', 'SM_PHY', 'MED_PHY', 'LG_PHY']
     df_grp['needsLight'] = df_grp['GroupType'].isin(lightAdpnGrps)
     
-    # Invert 변수 (그룹이 needsNums가 False인 경우)
-    Variables = []
-    long_name = []
-    att_index = []
-    for idx, row in df_grp.iterrows():
-        if not row['needsNums']:
-            if not row['multiN']:
-                Variables.append(f"{row['Name']}_N")
-                target = f"{row['GroupType']}_N"
-                indx = df_atts.index[df_atts['name'] == target]
-                if len(indx) > 0:
-                    indx_val = indx[0]
-                    long_name.append(f"{row['Name']} {df_atts.loc[indx_val, 'long_name']}")
-                else:
-                    indx_val = -1
-                    long_name.append(f"{row['Name']} N")
-                att_index.append(indx_val)
-            else:
-                for j in range(int(row['NumCohorts'])):
-                    Variables.append(f"{row['Name']}_N{j+1}")
-                    target = f"{row['GroupType']}_N"
-                    indx = df_atts.index[df_atts['name'] == target]
-                    if len(indx) > 0:
-                        indx_val = indx[0]
-                        long_name.append(f"{row['Name']} cohort {j+1} {df_atts.loc[indx_val, 'long_name']}")
-                    else:
-                        indx_val = -1
-                        long_name.append(f"{row['Name']} N{j+1}")
-                    att_index.append(indx_val)
-            if row['IsCover'] == 1:
-                Variables.append(f"{row['Name']}_Cover")
-                indx = df_atts.index[df_atts['name'] == 'Cover']
-                if len(indx) > 0:
-                    indx_val = indx[0]
-                    long_name.append(f"Percent cover by {row['Name']}")
-                else:
-                    indx_val = -1
-                    long_name.append(f"{row['Name']} Cover")
-                att_index.append(indx_val)
-            if row['IsSiliconDep'] == 1:
-                Variables.append(f"{row['Name']}_S")
-                # MATLAB 코드: 사용된 이름은 'Si3D'
-                indx = df_atts.index[df_atts['name'] == 'Si3D']
-                if len(indx) > 0:
-                    indx_val = indx[0]
-                    long_name.append(f"{row['Name']} Silicon")
-                else:
-                    indx_val = -1
-                    long_name.append(f"{row['Name']} S")
-                att_index.append(indx_val)
-            if row['needsLight']:
-                Variables.append(f"Light_Adaptn_{row['Code']}")
-                indx = df_atts.index[df_atts['name'] == 'Light3D']
-                if len(indx) > 0:
-                    indx_val = indx[0]
-                    long_name.append(f"Light adaption of {row['Name']}")
-                else:
-                    indx_val = -1
-                    long_name.append(f"Light_{row['Name']}")
-                att_index.append(indx_val)
-    dfInvert = pd.DataFrame({
-        'Variable': Variables,
-        'long_name': long_name,
-        'att_index': att_index
-    })
-    
-    # Vertebrate 변수 (needsNums == True)
-    Variables = []
-    long_name = []
-    att_index = []
-    for idx, row in df_grp.iterrows():
-        if row['needsNums']:
-            Variables.append(f"{row['Name']}_N")
-            target = f"{row['GroupType']}_N"
-            indx = df_atts.index[df_atts['name'] == target]
-            if len(indx) > 0:
-                indx_val = indx[0]
-                long_name.append(f"{row['Name']} {df_atts.loc[indx_val, 'long_name']}")
-            else:
-                indx_val = -1
-                long_name.append(f"{row['Name']} N")
-            att_index.append(indx_val)
-            for j in range(int(row['NumCohorts'])):
-                Variables.append(f"{row['Name']}{j+1}_Nums")
-                indx = df_atts.index[df_atts['name'] == 'Nums3D']
-                if len(indx) > 0:
-                    indx_val = indx[0]
-                    long_name.append(f"Numbers of {row['Name']} cohort {j+1}")
-                else:
-                    indx_val = -1
-                    long_name.append(f"{row['Name']} Nums{j+1}")
-                att_index.append(indx_val)
-            for j in range(int(row['NumCohorts'])):
-                Variables.append(f"{row['Name']}{j+1}_StructN")
-                indx = df_atts.index[df_atts['name'] == 'StructN3D']
-                if len(indx) > 0:
-                    indx_val = indx[0]
-                    long_name.append(f"Individual structural N for {row['Name']} cohort {j+1}")
-                else:
-                    indx_val = -1
-                    long_name.append(f"{row['Name']} StructN{j+1}")
-                att_index.append(indx_val)
-            for j in range(int(row['NumCohorts'])):
-                Variables.append(f"{row['Name']}{j+1}_ResN")
-                indx = df_atts.index[df_atts['name'] == 'ResN3D']
-                if len(indx) > 0:
-                    indx_val = indx[0]
-                    long_name.append(f"Individual reserve N for {row['Name']} cohort {j+1}")
-                else:
-                    indx_val = -1
-                    long_name.append(f"{row['Name']} ResN{j+1}")
-                att_index.append(indx_val)
-    dfVert = pd.DataFrame({
-        'Variable': Variables,
-        'long_name': long_name,
-        'att_index': att_index
-    })
-    dfreturn = pd.concat([dfInvert, dfVert], ignore_index=True)
+    # Attribute Template 이름 -> (첫 번째 행 인덱스, long_name) 사전 (한 번만 생성)
+    first = ~df_atts['name'].duplicated()
+    att_lookup = dict(zip(df_atts.loc[first, 'name'], df_atts.index[first]))
+    att_long = dict(zip(df_atts.loc[first, 'name'], df_atts.loc[first, 'long_name']))
+
+    name = df_grp['Name'].astype(str)
+    n_target = df_grp['GroupType'] + '_N'
+    inv = ~df_grp['needsNums']
+    vert = df_grp['needsNums']
+    multi = inv & df_grp['multiN']
+
+    # 변수 종류별 테이블: (구역, 순서, 대상 그룹 마스크, 코호트 전개 여부, 변수명, 템플릿 이름,
+    #                      템플릿이 있을 때 long_name, 없을 때 long_name)
+    # 구역 0 = Invert (needsNums False), 1 = Vertebrate (needsNums True)
+    var_table = [
+        (0, 0, inv & ~multi, False,
+         lambda g, c: g['Name'] + '_N', lambda g: g['GroupType'] + '_N',
+         lambda g, c, t: g['Name'] + ' ' + t, lambda g, c: g['Name'] + ' N'),
+        (0, 0, multi, True,
+         lambda g, c: g['Name'] + '_N' + c, lambda g: g['GroupType'] + '_N',
+         lambda g, c, t: g['Name'] + ' cohort ' + c + ' ' + t, lambda g, c: g['Name'] + ' N' + c),
+        (0, 1, inv & (df_grp['IsCover'] == 1), False,
+         lambda g, c: g['Name'] + '_Cover', 'Cover',
+         lambda g, c, t: 'Percent cover by ' + g['Name'], lambda g, c: g['Name'] + ' Cover'),
+        # MATLAB 코드: 사용된 이름은 'Si3D'
+        (0, 2, inv & (df_grp['IsSiliconDep'] == 1), False,
+         lambda g, c: g['Name'] + '_S', 'Si3D',
+         lambda g, c, t: g['Name'] + ' Silicon', lambda g, c: g['Name'] + ' S'),
+        (0, 3, inv & df_grp['needsLight'], False,
+         lambda g, c: 'Light_Adaptn_' + g['Code'].astype(str), 'Light3D',
+         lambda g, c, t: 'Light adaption of ' + g['Name'], lambda g, c: 'Light_' + g['Name']),
+        (1, 0, vert, False,
+         lambda g, c: g['Name'] + '_N', lambda g: g['GroupType'] + '_N',
+         lambda g, c, t: g['Name'] + ' ' + t, lambda g, c: g['Name'] + ' N'),
+        (1, 1, vert, True,
+         lambda g, c: g['Name'] + c + '_Nums', 'Nums3D',
+         lambda g, c, t: 'Numbers of ' + g['Name'] + ' cohort ' + c, lambda g, c: g['Name'] + ' Nums' + c),
+        (1, 2, vert, True,
+         lambda g, c: g['Name'] + c + '_StructN', 'StructN3D',
+         lambda g, c, t: 'Individual structural N for ' + g['Name'] + ' cohort ' + c,
+         lambda g, c: g['Name'] + ' StructN' + c),
+        (1, 3, vert, True,
+         lambda g, c: g['Name'] + c + '_ResN', 'ResN3D',
+         lambda g, c, t: 'Individual reserve N for ' + g['Name'] + ' cohort ' + c,
+         lambda g, c: g['Name'] + ' ResN' + c),
+    ]
+
+    df_base = df_grp.assign(Name=name)
+    frames = []
+    for section, order, mask, by_cohort, var_fn, target, long_hit, long_miss in var_table:
+        g = df_base[mask]
+        if by_cohort:
+            # 코호트 수만큼 행을 한 번에 전개 (1..NumCohorts)
+            g = g.loc[g.index.repeat(g['NumCohorts'].astype(int).to_numpy())]
+            cohort = g.groupby(level=0).cumcount() + 1
+        else:
+            cohort = pd.Series(0, index=g.index)
+        c = cohort.astype(str)
+        targets = target(g) if callable(target) else pd.Series(target, index=g.index)
+        indx = targets.map(att_lookup)
+        found = indx.notna()
+        long_name = long_miss(g, c).where(~found, long_hit(g, c, targets.map(att_long)))
+        frames.append(pd.DataFrame({
+            'Variable': var_fn(g, c),
+            'long_name': long_name,
+            'att_index': indx.fillna(-1).astype(np.int64),
+            '_section': section,
+            '_group': g.index,
+            '_order': order,
+            '_cohort': cohort,
+        }))
+
+    # MATLAB 루프와 같은 순서: Invert 전체 -> Vertebrate 전체, 그룹 순서, 변수 종류, 코호트
+    dfreturn = pd.concat(frames, ignore_index=True)
+    dfreturn = dfreturn.sort_values(['_section', '_group', '_order', '_cohort'], kind='stable')
+    dfreturn = dfreturn[['Variable', 'long_name', 'att_index']].reset_index(drop=True)
+    count('variables', len(dfreturn))
     return dfreturn
 
+# ---------------------------------------------------------------------------
+# make_horiz_distribution: 변수별 horizontal 분포 규칙 (spec)을 box 표 (make_map_data_init의 boxData)에
+# 한꺼번에 적용해 변수 x box 행렬 생성
+# spec (CSV 경로 또는 DataFrame) 컬럼:
+#   Variable    : 변수 이름 또는 와일드카드 (예: '*_N', 'Grp1?_Nums'). 여러 행이 맞으면 뒤의 행 적용
+#   pattern     : 'uniform' (모든 box에 value) | 'area' (value를 box 면적 비율로 나눔, 합 = value)
+#   value       : 값 (uniform) 또는 전체 합 (area)
+#   depth_min, depth_max : 선택. total_depth가 [depth_min, depth_max) 인 box만 (그 밖은 0)
+#   habitat     : 선택. habitat 표의 컬럼 이름. 해당 값 (0~1)을 곱함 (area는 면적 x 값 비율)
+#   island_zero : 선택 (기본 1). 1이면 섬 box는 0
+# habitat: box 순서의 DataFrame 또는 CSV (boxid 컬럼이 있으면 그 순서로 정렬)
+# var_names: 분포를 만들 변수 이름 목록 (와일드카드 대상)
+# 반환: DataFrame (Variable, box0 .. boxN)
+# ---------------------------------------------------------------------------
+HORIZ_PATTERNS = ('uniform', 'area')
+
+
+def _spec_column(spec, name, default):
+    if name not in spec.columns:
+        return np.full(len(spec), default)
+    values = spec[name]
+    return values.where(values.notna(), default).to_numpy()
+
+
+def make_horiz_distribution(box_data, spec, var_names, habitat=None):
+    if isinstance(spec, str):
+        spec = pd.read_csv(spec)
+    if isinstance(habitat, str):
+        habitat = pd.read_csv(habitat)
+    spec = spec.reset_index(drop=True)
+    numboxes = len(box_data)
+
+    patterns = spec['pattern'].fillna('uniform').astype(str).str.strip().str.lower()
+    unknown = sorted(set(patterns) - set(HORIZ_PATTERNS))
+    if unknown:
+        raise ValueError(f"알 수 없는 horizontal pattern {unknown} (가능: {list(HORIZ_PATTERNS)})")
+
+    # 변수 -> spec 행 번호 (뒤의 행이 우선)
+    var_names = list(dict.fromkeys(var_names))
+    row_of = {}
+    for i, pattern in enumerate(spec['Variable'].astype(str).str.strip()):
+        for name in fnmatch.filter(var_names, pattern):
+            row_of[name] = i
+    names = [name for name in var_names if name in row_of]
+    rows = np.array([row_of[name] for name in names], dtype=int)
+
+    # spec 행 x box 가중치 (규칙 개수만큼만 계산하고 변수로 펼침)
+    depth = box_data['total_depth'].to_numpy(dtype=float)
+    area = np.nan_to_num(box_data['area'].to_numpy(dtype=float))
+    is_island = box_data['is_island'].to_numpy(dtype=bool)
+    d_min = _spec_column(spec, 'depth_min', -np.inf).astype(float)
+    d_max = _spec_column(spec, 'depth_max', np.inf).astype(float)
+    mask = (depth[None, :] >= d_min[:, None]) & (depth[None, :] < d_max[:, None])
+    island_zero = _spec_column(spec, 'island_zero', 1).astype(float) != 0
+    mask &= ~(island_zero[:, None] & is_island[None, :])
+    weight = mask.astype(float)
+
+    hab_names = _spec_column(spec, 'habitat', '')
+    if any(str(h).strip() for h in hab_names):
+        if habitat is None:
+            raise ValueError("spec에 habitat이 있지만 habitat 표가 없습니다.")
+        if 'boxid' in habitat.columns:
+            habitat = habitat.set_index('boxid').reindex(np.arange(numboxes))
+        if len(habitat) != numboxes:
+            raise ValueError(f"habitat 표의 box 수 ({len(habitat)})가 BGM ({numboxes})과 다릅니다.")
+        for i, h in enumerate(hab_names):
+            h = str(h).strip()
+            if not h:
+                continue
+            if h not in habitat.columns:
+                raise ValueError(f"habitat 표에 {h} 컬럼이 없습니다.")
+            weight[i] *= np.nan_to_num(habitat[h].to_numpy(dtype=float))
+
+    value = _spec_column(spec, 'value', 0.0).astype(float)
+    is_area = (patterns == 'area').to_numpy()
+    share = weight * area[None, :]
+    total = share.sum(axis=1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        share = np.where(total > 0, share / total, 0.0)
+    per_rule = value[:, None] * np.where(is_area[:, None], share, weight)
+
+    df = pd.DataFrame(per_rule[rows], columns=[f"box{i}" for i in range(numboxes)])
+    df.insert(0, "Variable", names)
+    return df
+
 # ---------------------------------------------------------------------------
 # make_init_csv: 그룹 파일, BGM 파일, 누적 깊이 정보를 이용해 초기 조건 CSV 템플릿과 
 # horizontal distribution CSV 템플릿을 생성 (MATLAB: makeInitCsv.m)
+# horiz_spec (make_horiz_distribution 참고)을 주면 해당 변수의 box 값을 계산해 _horiz.csv에 기록하고
+# _init.csv의 wc.hor.pattern을 custom으로 바꿈 (그 밖의 custom 변수는 0)
 # ---------------------------------------------------------------------------
-def make_init_csv(grp_file, bgm_file, cum_depths, csv_name, ice_model=False):
+@traced('init.make_csv', 'csv_name')
+def make_init_csv(grp_file, bgm_file, cum_depths, csv_name, ice_model=False, cache_dir=None,
+                  horiz_spec=None, habitat=None):
     # def.att.file 경로 (여기서는 현재 작업 폴더의 파일로 가정)
     def_att_file = "AttributeTemplate.csv"
     df_atts = pd.read_csv(def_att_file, header=0, dtype=str)
@@ -264,7 +549,7 @@ def make_init_csv(grp_file, bgm_file, cum_depths, csv_name, ice_model=False):
     layer_depth = [cum_depths[i+1] - cum_depths[i] for i in range(numlayers)]
     numsed = 1
 
-    map_data = make_map_data_init(bgm_file, cum_depths)
+    map_data = make_map_data_init(bgm_file, cum_depths, cache_dir)
     numboxes = map_data['numboxes']
     box_data = map_data['boxData']
     
@@ -276,57 +561,377 @@ def make_init_csv(grp_file, bgm_file, cum_depths, csv_name, ice_model=False):
     
     # 그룹 관련 변수 추가
     grp_data = generate_vars_init(grp_file, cum_depths, df_atts, ice_model)
+    # 그룹 변수에도 템플릿 속성을 복사 (make_init_nc가 _init.csv만으로 NetCDF를 만들 수 있도록)
+    grp_atts = df_atts.reindex(grp_data['att_index']).reset_index(drop=True)
+    grp_atts['name'] = grp_data['Variable'].to_numpy()
+    grp_atts['long_name'] = grp_data['long_name'].to_numpy()
+    grp_data = pd.concat([grp_atts, grp_data[['Variable', 'att_index']]], axis=1)
     df_return = pd.concat([df_return, grp_data], ignore_index=True)
-    
+
+    # 템플릿 컬럼 이름은 'wc.hor.pattern'
+    hor_col = 'wc.hor.pattern' if 'wc.hor.pattern' in df_return.columns else 'wc_hor_pattern'
+    df_filled = None
+    if horiz_spec is not None:
+        df_filled = make_horiz_distribution(box_data, horiz_spec, df_return['name'].dropna().tolist(), habitat)
+        df_return.loc[df_return['name'].isin(df_filled['Variable']), hor_col] = "custom"
+        count('horiz_variables', len(df_filled))
+
     df_return.to_csv(f"{csv_name}_init.csv", index=False)
+    count_file('bytes_written', f"{csv_name}_init.csv")
     
     # 사용자 지정 horizontal distribution을 위한 템플릿 생성
-    if 'wc_hor_pattern' in df_return.columns:
-        custom_vars = df_return.loc[df_return['wc_hor_pattern'].str.strip() == "custom", 'name'].tolist()
+    if hor_col in df_return.columns:
+        custom_vars = df_return.loc[df_return[hor_col].astype(str).str.strip() == "custom", 'name']
+        custom_vars = list(dict.fromkeys(custom_vars))
     else:
         custom_vars = []
     n_custom = len(custom_vars)
     ma_vals = np.zeros((n_custom, numboxes))
+    if df_filled is not None:
+        # 계산한 변수는 행렬 그대로 채움 (나머지 custom 변수는 0)
+        filled = df_filled.set_index('Variable').reindex(custom_vars)
+        ma_vals = np.nan_to_num(filled.to_numpy(dtype=float))
     df_custom = pd.DataFrame(ma_vals, columns=[f"box{i}" for i in range(numboxes)])
     df_custom.insert(0, "Variable", custom_vars)
     df_custom.to_csv(f"{csv_name}_horiz.csv", index=False)
+    count_file('bytes_written', f"{csv_name}_horiz.csv")
+
+
+# ---------------------------------------------------------------------------
+# make_init_nc: _init.csv / _horiz.csv 템플릿과 make_map_data_init 지오메트리로
+# 초기 조건 NetCDF 파일을 생성 (MATLAB: makeInitNc.m)
+# 변수 하나씩 (b, z) 배열을 만들어 바로 압축/청크 NETCDF4 변수로 기록하므로
+# 전체 box x layer x variable 큐브를 메모리에 올리지 않음
+# ---------------------------------------------------------------------------
+# NetCDF 속성으로 기록하지 않는 템플릿 컬럼
+_INIT_NON_ATTS = ['name', 'required', 'dimensions', 'dimnames', 'fill.value', 'wc.hor.pattern',
+                  'wc.ver.pattern', 'sediment', 'wc.hor.scalar', 'Variable', 'att_index']
+
+
+def _init_value(value, default=0.0):
+    value = _to_float(value)
+    return default if np.isnan(value) else value
+
+
+def _init_attribute(value):
+    # 숫자로 읽히면 숫자, 아니면 문자열 그대로
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return str(value).strip()
+    return int(number) if number.is_integer() and '.' not in str(value) else number
+
+
+def _atlantis_layer_order(numlayers, wcnz):
+    # Atlantis z 인덱스: 0 = 최하층 물층 ... numlayers-1 = 표층, 이후 빈 층, 마지막 = 퇴적층
+    # 반환: (상자 x wcnz) 표층 기준 층 번호, 사용하지 않는 슬롯은 -1
+    k = np.arange(wcnz)[None, :]
+    nl = np.asarray(numlayers)[:, None]
+    return np.where(k < nl, nl - 1 - k, -1)
+
+
+@traced('init.make_nc', 'nc_file')
+def make_init_nc(bgm_file, cum_depths, init_file, horiz_file, nc_file, vert_file=None,
+                 ice_model=False, cache_dir=None, sed_depth=1.0, n_ice_layers=1, complevel=4):
+    map_data = make_map_data_init(bgm_file, cum_depths, cache_dir)
+    numboxes = map_data['numboxes']
+    box_data = map_data['boxData']
+    numlayers = box_data['numlayers'].to_numpy().astype(int)
+    area = np.nan_to_num(box_data['area'].to_numpy())
+    cum = np.asarray(cum_depths, dtype=float)
+    wcnz = len(cum) - 1
+    sednz = 1
+    nz = wcnz + sednz
+
+    # 표층 기준 (상자 x 물층) 행렬을 Atlantis z 순서 (상자 x nz)로 변환
+    layer_order = _atlantis_layer_order(numlayers, wcnz)
+    wet_slot = layer_order >= 0
+
+    def to_atlantis_z(wc_values, sed_value):
+        out = np.zeros((numboxes, nz))
+        out[:, :wcnz] = np.where(wet_slot, np.take_along_axis(wc_values, np.maximum(layer_order, 0), axis=1), 0.0)
+        out[:, wcnz:] = np.asarray(sed_value, dtype=float).reshape(-1, 1)
+        return out
+
+    nominal_dz = np.broadcast_to(np.diff(cum), (numboxes, wcnz))
+    calculated = {
+        'volume': lambda: to_atlantis_z(map_data['layerVolume'], area * sed_depth),
+        'dz': lambda: to_atlantis_z(map_data['layerThickness'], sed_depth),
+        'nominal_dz': lambda: to_atlantis_z(nominal_dz, sed_depth),
+        'numlayers': lambda: numlayers.astype(float),
+    }
+
+    df_init = pd.read_csv(init_file, dtype=str)
+    if 'Variable' in df_init.columns:
+        df_init['name'] = df_init['name'].fillna(df_init['Variable'])
+    df_horiz = pd.read_csv(horiz_file, index_col=0) if horiz_file and os.path.exists(horiz_file) else None
+    df_vert = pd.read_csv(vert_file, index_col=0) if vert_file and os.path.exists(vert_file) else None
+
+    ds = Dataset(nc_file, 'w', format='NETCDF4')
+    ds.createDimension('t', None)
+    ds.createDimension('b', numboxes)
+    ds.createDimension('z', nz)
+    t_var = ds.createVariable('t', 'f8', ('t',))
+    t_var.units = 'seconds since 1990-01-01 00:00:00 +10'
+    t_var.dt = 43200.0
+    t_var[0] = 0.0
+    ds.geometry = os.path.basename(bgm_file)
+    ds.title = os.path.splitext(os.path.basename(nc_file))[0]
+    ds.wcnz = wcnz
+    ds.sednz = sednz
+
+    written = set()
+    skipped = []
+    missing_horiz = []
+    for _, row in df_init.iterrows():
+        name = str(row['name']).strip()
+        if name in written or name == 'nan':
+            continue
+        if pd.isna(row.get('dimnames')):
+            skipped.append(name)
+            continue
+        dims = str(row['dimnames']).strip('[] ').split()
+        if 'icenz' in dims and 'icenz' not in ds.dimensions:
+            if not ice_model:
+                continue
+            ds.createDimension('icenz', n_ice_layers)
+        # CSV의 [ z b ] 순서를 NetCDF의 (t, b, z) 순서로
+        nc_dims = ('t',) + tuple(reversed(dims))
+        fill_value = _init_value(row.get('fill.value'))
+        var = ds.createVariable(name, 'f8', nc_dims, zlib=True, complevel=complevel, shuffle=True,
+                                chunksizes=(1,) + tuple(len(ds.dimensions[d]) for d in nc_dims[1:]),
+                                fill_value=fill_value)
+        for key, value in row.items():
+            if key not in _INIT_NON_ATTS and pd.notna(value):
+                var.setncattr(key.replace('.', '_'), _init_attribute(value))
+
+        hor = str(row.get('wc.hor.pattern', '')).strip()
+        ver = str(row.get('wc.ver.pattern', '')).strip()
+        if hor == 'calculated' or ver == 'calculated':
+            if name not in calculated:
+                print(f"계산 방법이 정의되지 않은 변수: {name} (0으로 기록)")
+                values = np.zeros(var.shape[1:])
+            else:
+                values = calculated[name]()
+        else:
+            if hor == 'custom':
+                if df_horiz is not None and name in df_horiz.index:
+                    horiz = df_horiz.loc[name].to_numpy(dtype=float)[:numboxes]
+                else:
+                    missing_horiz.append(name)
+                    horiz = np.zeros(numboxes)
+            else:
+                horiz = np.full(numboxes, _init_value(row.get('wc.hor.scalar')))
 
+            if len(var.shape) == 2:
+                values = horiz
+            elif nc_dims[2] != 'z':
+                # 얼음층 등 물층 구조가 없는 3차원 변수는 모든 층에 같은 값
+                values = np.repeat(horiz[:, None], var.shape[2], axis=1)
+            else:
+                if ver == 'surface':
+                    profile = np.zeros(wcnz)
+                    profile[0] = 1.0
+                elif ver == 'custom' and df_vert is not None and name in df_vert.index:
+                    profile = df_vert.loc[name].to_numpy(dtype=float)[:wcnz]
+                else:
+                    profile = np.ones(wcnz)
+                values = to_atlantis_z(horiz[:, None] * profile[None, :],
+                                       _init_value(row.get('sediment')))
+        var[0] = values
+        written.add(name)
+
+    ds.close()
+    count_file('bytes_written', nc_file)
+    count('variables', len(written))
+    if skipped:
+        print(f"템플릿 속성이 없어 건너뛴 변수 {len(skipped)}개: {skipped}")
+    if missing_horiz:
+        print(f"horizontal 분포가 없어 0으로 기록한 custom 변수 {len(missing_horiz)}개: {missing_horiz}")
+    print(f"초기 조건 NetCDF 생성 완료: {nc_file} (변수 {len(written)}개)")
 
 # ---------------------------------------------------------------------------
 # get_init_nc: NetCDF 파일의 초기 조건 값을 읽어 CSV 파일로 저장 (MATLAB: getInitNc.m)
+# var_filter (정규식 또는 변수 이름 목록), time_index / layer_index ('t' / 'z' 차원 선택)로
+# 필요한 부분만 읽고, chunk_vars 개 변수마다 CSV 또는 Parquet (.parquet) 행으로 바로 기록
 # ---------------------------------------------------------------------------
-def get_init_nc(nc_file, output_file):
-    import numpy as np
-    import pandas as pd
-    from netCDF4 import Dataset
+class _TableWriter:
+    # CSV / Parquet 파일에 DataFrame 조각을 이어서 기록
+    def __init__(self, output_file):
+        self.output_file = output_file
+        self.parquet = output_file.lower().endswith(('.parquet', '.pq'))
+        self.writer = None
+        self.started = False
+
+    def write(self, df):
+        if self.parquet:
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+            except ImportError:
+                raise ImportError("Parquet 출력에는 pyarrow 패키지가 필요합니다.")
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self.writer is None:
+                self.writer = pq.ParquetWriter(self.output_file, table.schema)
+            self.writer.write_table(table)
+        else:
+            df.to_csv(self.output_file, mode='a' if self.started else 'w', header=not self.started, index=False)
+        self.started = True
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        count_file('bytes_written', self.output_file)
+
+
+def _select_var_names(var_names, var_filter):
+    if var_filter is None:
+        return list(var_names)
+    if isinstance(var_filter, str):
+        pattern = re.compile(var_filter)
+        return [v for v in var_names if pattern.search(v)]
+    wanted = set(var_filter)
+    return [v for v in var_names if v in wanted]
+
 
+def _selection_key(var, time_index, layer_index):
+    key = []
+    for dim in var.dimensions:
+        if dim == 't' and time_index is not None:
+            key.append(time_index)
+        elif dim == 'z' and layer_index is not None:
+            key.append(layer_index)
+        else:
+            key.append(slice(None))
+    return tuple(key)
+
+
+def _read_flat_head(var, key, n):
+    # 선택이 없으면 앞쪽 n개 값을 얻는 데 필요한 첫 번째 축 범위만 읽음
+    if var.ndim == 0:
+        return np.array(var[...], dtype=float).flatten()
+    if all(k == slice(None) for k in key):
+        per_row = int(np.prod(var.shape[1:])) if var.ndim > 1 else 1
+        rows = max(1, -(-n // max(per_row, 1)))
+        data = var[:rows]
+    else:
+        data = var[key]
+    return np.array(data, dtype=float).flatten()[:n]
+
+
+@traced('init.read_nc', 'nc_file', 'output_file')
+def get_init_nc(nc_file, output_file, var_filter=None, time_index=None, layer_index=None, chunk_vars=256):
     nc = Dataset(nc_file, 'r')
+    count_file('bytes_read', nc_file)
     var_names_all = list(nc.variables.keys())
     # 'reef' 변수가 있다면 상자 수 추출, 없으면 다른 변수에서 추정
     if "reef" in nc.variables:
-        reef_var = nc.variables["reef"][:]
-        numboxes = int(max(reef_var.shape))
+        numboxes = int(max(nc.variables["reef"].shape))
     else:
         dims = [nc.variables[v].shape for v in var_names_all if len(nc.variables[v].shape) > 0]
         numboxes = int(max([max(shape) for shape in dims]))
-    
-    m_data = []
-    for var_name in var_names_all:
-        data_all = nc.variables[var_name][:]
-        # 데이터를 float 형으로 변환한 후 flatten
-        data_flat = np.array(data_all, dtype=float).flatten()
-        # 강제로 길이를 numboxes로 맞춤: 짧으면 np.nan 패딩, 길면 자름
-        if len(data_flat) < numboxes:
-            data_flat = np.pad(data_flat, (0, numboxes - len(data_flat)), constant_values=np.nan)
-        else:
-            data_flat = data_flat[:numboxes]
-        m_data.append(data_flat)
-    m_data = np.array(m_data)
-    columns = ["Variable"] + [f"box{i}" for i in range(numboxes)]
-    df_out = pd.DataFrame(m_data, index=var_names_all, columns=columns[1:])
-    df_out.insert(0, "Variable", var_names_all)
-    df_out.to_csv(output_file, index=False)
-    nc.close()
+
+    var_names = _select_var_names(var_names_all, var_filter)
+    columns = [f"box{i}" for i in range(numboxes)]
+    writer = _TableWriter(output_file)
+    try:
+        for start in range(0, max(len(var_names), 1), chunk_vars):
+            names = var_names[start:start + chunk_vars]
+            m_data = np.full((len(names), numboxes), np.nan)
+            for i, var_name in enumerate(names):
+                var = nc.variables[var_name]
+                # 데이터를 float 형으로 변환한 후 flatten
+                data_flat = _read_flat_head(var, _selection_key(var, time_index, layer_index), numboxes)
+                # 강제로 길이를 numboxes로 맞춤: 짧으면 np.nan 패딩, 길면 자름
+                m_data[i, :len(data_flat)] = data_flat
+            df_out = pd.DataFrame(m_data, columns=columns)
+            df_out.insert(0, "Variable", names)
+            writer.write(df_out)
+    finally:
+        writer.close()
+        nc.close()
+
+# ---------------------------------------------------------------------------
+# get_init_nc_layers: 각 변수를 실제 t / b / z 차원대로 읽어 층별 표로 저장
+# 같은 차원 구성(dimension signature)의 변수들을 묶어 한 번에 읽고 변환
+#   layout='long' : Variable, t, b, z, value (없는 차원은 -1)
+#   layout='wide' : Variable, t, z, box0..boxN (층/시간마다 한 행)
+# t, b 이외의 차원 (z, icenz 등)은 'z' 컬럼 하나로 펼침
+# ---------------------------------------------------------------------------
+def _keep_dim(index):
+    # 정수 선택도 차원을 유지하도록 길이 1 slice로 변환
+    if isinstance(index, (int, np.integer)):
+        return slice(index, index + 1 if index != -1 else None)
+    return index
+
+
+@traced('init.read_nc_layers', 'nc_file', 'output_file', 'layout')
+def get_init_nc_layers(nc_file, output_file, layout='long', var_filter=None, time_index=None,
+                       layer_index=None, chunk_vars=64):
+    if layout not in ('long', 'wide'):
+        raise ValueError(f"layout은 'long' 또는 'wide'여야 합니다: {layout}")
+    nc = Dataset(nc_file, 'r')
+    count_file('bytes_read', nc_file)
+    var_names = _select_var_names(list(nc.variables.keys()), var_filter)
+    numboxes = len(nc.dimensions['b']) if 'b' in nc.dimensions else 1
+
+    # 차원 구성별 변수 묶음
+    groups = {}
+    for v in var_names:
+        var = nc.variables[v]
+        groups.setdefault((var.dimensions, var.shape), []).append(v)
+
+    writer = _TableWriter(output_file)
+    try:
+        for (dims, shape), group in groups.items():
+            key = tuple(_keep_dim(k) for k in _selection_key(nc.variables[group[0]], time_index, layer_index))
+            # 각 축의 원래 인덱스 값
+            axis_index = [np.arange(n)[k] for n, k in zip(shape, key)]
+            t_axes = [i for i, d in enumerate(dims) if d == 't']
+            b_axes = [i for i, d in enumerate(dims) if d == 'b']
+            z_axes = [i for i, d in enumerate(dims) if d not in ('t', 'b')]
+            t_idx = axis_index[t_axes[0]] if t_axes else np.array([-1])
+            b_idx = axis_index[b_axes[0]] if b_axes else np.array([-1])
+            if len(z_axes) == 1:
+                z_idx = axis_index[z_axes[0]]
+            elif z_axes:
+                z_idx = np.arange(int(np.prod([len(axis_index[i]) for i in z_axes])))
+            else:
+                z_idx = np.array([-1])
+            nt, nb, nzl = len(t_idx), len(b_idx), len(z_idx)
+
+            for start in range(0, len(group), chunk_vars):
+                batch = group[start:start + chunk_vars]
+                data = np.stack([np.array(nc.variables[v][key], dtype=float).reshape(
+                    [len(a) for a in axis_index]) for v in batch])
+                # (변수, t, b, z) 순서로 정렬
+                data = data.transpose([0] + [a + 1 for a in t_axes + b_axes + z_axes])
+                data = data.reshape(len(batch), nt, nb, nzl)
+
+                if layout == 'long':
+                    grid_t, grid_b, grid_z = np.meshgrid(t_idx, b_idx, z_idx, indexing='ij')
+                    n = nt * nb * nzl
+                    df_out = pd.DataFrame({
+                        'Variable': np.repeat(batch, n),
+                        't': np.tile(grid_t.ravel(), len(batch)),
+                        'b': np.tile(grid_b.ravel(), len(batch)),
+                        'z': np.tile(grid_z.ravel(), len(batch)),
+                        'value': data.ravel(),
+                    })
+                else:
+                    # (변수, t, z, b) -> 행: 변수 x t x z, 열: 상자
+                    rows = data.transpose(0, 1, 3, 2).reshape(-1, nb)
+                    m_data = np.full((rows.shape[0], numboxes), np.nan)
+                    m_data[:, :min(nb, numboxes)] = rows[:, :numboxes]
+                    grid_t, grid_z = np.meshgrid(t_idx, z_idx, indexing='ij')
+                    df_out = pd.DataFrame(m_data, columns=[f"box{i}" for i in range(numboxes)])
+                    df_out.insert(0, 'z', np.tile(grid_z.ravel(), len(batch)))
+                    df_out.insert(0, 't', np.tile(grid_t.ravel(), len(batch)))
+                    df_out.insert(0, 'Variable', np.repeat(batch, nt * nzl))
+                writer.write(df_out)
+    finally:
+        writer.close()
+        nc.close()
 
 # ---------------------------------------------------------------------------
 # 예제 사용법
@@ -346,7 +951,9 @@ if __name__ == "__main__":
     # 초기 CSV 템플릿 생성
     make_init_csv(grp_file, bgm_file, cum_depths, csv_name, ice_model=True)
     
-    # (여기서는 NetCDF 생성 함수는 별도로 작성하지 않았으므로, 필요시 추가 구현)
+    # 초기 조건 NetCDF 생성
+    make_init_nc(bgm_file, cum_depths, f"{csv_name}_init.csv", f"{csv_name}_horiz.csv", nc_file,
+                 vert_file=vert_file, ice_model=True)
     
     # NetCDF에서 초기조건 CSV 추출
     get_init_nc(nc_file, "initial_conditions_output.csv")
@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Apr 15 13:22:08 2025
+
+@author: Ukjae
+
+initial / hydro 단계별 실행 시간, 메모리, 읽기/쓰기 바이트를 JSON lines 파일로 기록
+
+  with span('bgm.parse', file=bgm_file):      # 구간 시작/종료, 실행 시간, 메모리 기록
+      count('bytes_read', os.path.getsize(bgm_file))
+
+기록 파일은 환경 변수 ATLANTIS_TRACE 또는 set_trace_file(path)로 지정 (지정하지 않으면 기록하지 않음)
+set_trace_file은 환경 변수도 설정하므로 작업 프로세스 (spawn / fork)도 같은 파일에 이어서 기록
+작업 스레드 / 프로세스에 넘기는 함수는 with_parent(func)로 감싸면 그 안의 구간이 제출한 구간의 하위 구간으로 기록
+summarize_trace(path)로 구간 이름별 합계 / 평균 / 최대 메모리 집계
+"""
+
+import os
+import json
+import time
+import socket
+import inspect
+import threading
+import contextlib
+import functools
+import itertools
+
+TRACE_ENV = 'ATLANTIS_TRACE'
+
+_local = threading.local()
+_write_lock = threading.Lock()
+_span_ids = itertools.count(1)
+
+
+def set_trace_file(path):
+    # None 이면 기록 중지
+    if path is None:
+        os.environ.pop(TRACE_ENV, None)
+    else:
+        os.environ[TRACE_ENV] = os.path.abspath(path)
+
+
+def trace_file():
+    return os.environ.get(TRACE_ENV) or None
+
+
+def enabled():
+    return trace_file() is not None
+
+
+# ---------------------------------------------------------------------------
+# memory_mb: (현재 RSS, 최대 RSS) MB
+# Linux는 /proc/self/status (VmRSS, VmHWM), 그 밖에는 psutil, 둘 다 없으면 resource의 ru_maxrss
+# ---------------------------------------------------------------------------
+def memory_mb():
+    try:
+        with open('/proc/self/status', 'r') as f:
+            status = dict(line.split(':', 1) for line in f if ':' in line)
+        return int(status['VmRSS'].split()[0]) / 1024, int(status['VmHWM'].split()[0]) / 1024
+    except (OSError, KeyError, ValueError):
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return info.rss / 1024 ** 2, getattr(info, 'peak_wset', info.rss) / 1024 ** 2
+    except ImportError:
+        pass
+    try:
+        import resource
+        import sys
+        unit = 1 if sys.platform == 'darwin' else 1024
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * unit / 1024 ** 2
+        return None, peak
+    except ImportError:
+        return None, None
+
+
+def _stack():
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+
+def current_span_id():
+    # 현재 구간 id (구간 밖이면 with_parent로 넘겨받은 상위 구간 id, 없으면 None)
+    stack = _stack()
+    return stack[-1]['id'] if stack else getattr(_local, 'parent', None)
+
+
+# ---------------------------------------------------------------------------
+# with_parent: 작업 스레드 / 프로세스에서 실행할 함수를 현재 구간 id와 묶음
+# (스레드별 구간 스택은 작업자에게 전달되지 않으므로 상위 구간 id를 인자로 넘김)
+#   pool.submit(with_parent(func), *args)
+# 작업자 쪽 최상위 구간은 parent에 그 id, remote=True로 기록되고, 카운터는 summarize_trace에서
+# 상위 구간들에 합산. 기록하지 않을 때는 func를 그대로 반환. func는 pickle 가능해야 함 (모듈 수준 함수)
+# ---------------------------------------------------------------------------
+def with_parent(func):
+    if not enabled():
+        return func
+    return functools.partial(_call_with_parent, current_span_id(), func)
+
+
+def _call_with_parent(parent_id, func, *args, **kwargs):
+    # fork로 만든 작업 프로세스는 제출한 스레드의 구간 스택 복사본을 물려받으므로 빈 스택에서 시작
+    previous = getattr(_local, 'parent', None), _stack()
+    _local.parent, _local.stack = parent_id, []
+    try:
+        return func(*args, **kwargs)
+    finally:
+        _local.parent, _local.stack = previous
+
+
+def _write(record):
+    path = trace_file()
+    if path is None:
+        return
+    line = json.dumps(record, default=str, ensure_ascii=False) + '\n'
+    with _write_lock:
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(line)
+
+
+# ---------------------------------------------------------------------------
+# span: 구간 측정 context manager. 종료 시 한 줄 기록
+#   name, fields (키워드 인자), 시작 시각, 실행 시간 (wall / cpu), 시작/종료 RSS, 최대 RSS,
+#   counters (구간 안에서 count로 더한 값), 상위 구간 id, pid, thread, 오류 (예외 발생 시)
+#   같은 스레드의 하위 구간 카운터는 종료 시 상위 구간에 합산, with_parent로 넘겨받은 상위 구간은 remote=True
+# 기록하지 않을 때는 아무 것도 측정하지 않음. yield 값 (dict)에 fields를 추가할 수 있음
+# ---------------------------------------------------------------------------
+@contextlib.contextmanager
+def span(name, **fields):
+    if not enabled():
+        yield fields
+        return
+    stack = _stack()
+    record = {'span': name, 'id': f"{os.getpid()}-{next(_span_ids)}",
+              'parent': current_span_id(), 'pid': os.getpid(),
+              'thread': threading.current_thread().name, 'host': socket.gethostname(),
+              'start': time.time(), 'fields': fields, 'counters': {}}
+    if not stack and record['parent'] is not None:
+        record['remote'] = True
+    record['rss_start_mb'], _ = memory_mb()
+    stack.append(record)
+    wall0, cpu0 = time.perf_counter(), time.process_time()
+    try:
+        yield fields
+    except BaseException as e:
+        record['error'] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        record['wall_s'] = time.perf_counter() - wall0
+        record['cpu_s'] = time.process_time() - cpu0
+        record['rss_end_mb'], record['peak_rss_mb'] = memory_mb()
+        stack.pop()
+        if stack:
+            # 하위 구간의 카운터는 상위 구간에도 합산
+            for key, value in record['counters'].items():
+                stack[-1]['counters'][key] = stack[-1]['counters'].get(key, 0) + value
+        _write(record)
+
+
+# ---------------------------------------------------------------------------
+# count: 현재 구간의 카운터에 값 추가 (bytes_read, bytes_written, records 등)
+# count_file: 파일 크기를 카운터에 추가 (없는 파일은 무시)
+# ---------------------------------------------------------------------------
+def count(key, value=1):
+    stack = _stack() if enabled() else None
+    if stack:
+        counters = stack[-1]['counters']
+        counters[key] = counters.get(key, 0) + value
+
+
+def count_file(key, path):
+    if enabled() and path is not None and os.path.exists(path):
+        count(key, os.path.getsize(path))
+
+
+def event(name, **fields):
+    # 시간 구간이 없는 단일 기록 (예: 캐시 적중)
+    if not enabled():
+        return
+    stack = _stack()
+    memory = memory_mb()
+    _write({'event': name, 'parent': current_span_id(), 'pid': os.getpid(),
+            'thread': threading.current_thread().name, 'start': time.time(), 'fields': fields,
+            'rss_mb': memory[0], 'peak_rss_mb': memory[1]})
+
+
+def traced(name, *arg_names):
+    # 함수 전체를 하나의 구간으로 기록하는 decorator. arg_names의 인자 값은 fields로 기록
+    def decorator(func):
+        signature = inspect.signature(func) if arg_names else None
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled():
+                return func(*args, **kwargs)
+            fields = {}
+            if signature is not None:
+                bound = signature.bind_partial(*args, **kwargs)
+                fields = {key: bound.arguments.get(key) for key in arg_names if key in bound.arguments}
+            with span(name, **fields):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# ---------------------------------------------------------------------------
+# read_trace / summarize_trace: JSON lines 기록 읽기 및 구간 이름별 집계
+# 반환: DataFrame (span, calls, errors, wall_total_s, wall_mean_s, wall_max_s, cpu_total_s,
+#                  peak_rss_mb, 카운터별 합계)
+# 다른 스레드 / 프로세스의 하위 구간 (remote) 카운터는 상위 구간들에 더해서 집계
+# top_level_only=True 이면 상위 구간이 없는 구간만 집계
+# ---------------------------------------------------------------------------
+def read_trace(path):
+    records = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                records.append(json.loads(line))
+    return records
+
+
+def _rollup_remote(spans):
+    # 반환: {id: 하위 구간 (remote 포함) 카운터를 합산한 counters}
+    by_id = {r['id']: r for r in spans}
+    totals = {r['id']: dict(r['counters']) for r in spans}
+    for r in spans:
+        if not r.get('remote'):
+            continue
+        parent = by_id.get(r['parent'])
+        while parent is not None:
+            target = totals[parent['id']]
+            for key, value in r['counters'].items():
+                target[key] = target.get(key, 0) + value
+            parent = by_id.get(parent['parent'])
+    return totals
+
+
+def summarize_trace(path, top_level_only=False):
+    import pandas as pd
+    spans = [r for r in read_trace(path) if 'span' in r]
+    totals = _rollup_remote(spans)
+    spans = [r for r in spans if not top_level_only or r['parent'] is None]
+    if not spans:
+        return pd.DataFrame(columns=['span', 'calls', 'errors', 'wall_total_s', 'wall_mean_s', 'wall_max_s',
+                                     'cpu_total_s', 'peak_rss_mb'])
+    df = pd.DataFrame({
+        'span': [r['span'] for r in spans],
+        'error': [r.get('error') is not None for r in spans],
+        'wall_s': [r['wall_s'] for r in spans],
+        'cpu_s': [r['cpu_s'] for r in spans],
+        'peak_rss_mb': [r['peak_rss_mb'] for r in spans],
+    })
+    counters = pd.DataFrame([totals[r['id']] for r in spans]).fillna(0)
+    df = pd.concat([df, counters], axis=1)
+    grouped = df.groupby('span', sort=False)
+    summary = pd.DataFrame({
+        'calls': grouped.size(),
+        'errors': grouped['error'].sum(),
+        'wall_total_s': grouped['wall_s'].sum(),
+        'wall_mean_s': grouped['wall_s'].mean(),
+        'wall_max_s': grouped['wall_s'].max(),
+        'cpu_total_s': grouped['cpu_s'].sum(),
+        'peak_rss_mb': grouped['peak_rss_mb'].max(),
+    })
+    for key in counters.columns:
+        summary[key] = grouped[key].sum()
+    return summary.sort_values('wall_total_s', ascending=False).reset_index()
+
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) < 2:
+        print("사용법: python Atlantis_trace.py trace.jsonl [--top]")
+        sys.exit(1)
+    print(summarize_trace(sys.argv[1], top_level_only='--top' in sys.argv).to_string(index=False))
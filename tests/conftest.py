@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 10:12:41 2026
+
+@author: Ukjae
+"""
+import os
+import sys
+
+# hydro / initial 스크립트는 패키지가 아니므로 디렉터리를 import 경로에 추가
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for _sub in ('initial', 'hydro'):
+    _path = os.path.join(_ROOT, _sub)
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 10:40:21 2026
+
+@author: Ukjae
+"""
+import netCDF4
+import numpy as np
+import pytest
+
+from Atlantis_hydro_tools import make_hydro_grid, output_options
+from get_avs_monthly_fianl import write_avs_month
+
+
+@pytest.mark.parametrize('profile', [None, 'fast', 'timeseries'])
+def test_avs_month_writes_zero_vertical_flux(tmp_path, profile):
+    temp = np.random.default_rng(0).random((3, 5, 2)).astype(np.float32)
+    temp[2, :, 1] = np.nan   # botz 아래 층
+    salt = np.full_like(temp, 35.0)
+    grid = make_hydro_grid(2019, {'temp': np.zeros((3, 730, 2)), 'salt': np.zeros((3, 730, 2))})
+    var_opts = output_options(grid, 'avs', profile) if profile else None
+    nc_file = str(tmp_path / 'avs_2019_01.nc')
+    write_avs_month(nc_file, np.arange(5) / 2.0, temp, salt, var_opts=var_opts)
+
+    with netCDF4.Dataset(nc_file) as ds:
+        vflux = ds.variables['verticalflux']
+        assert '_FillValue' not in vflux.ncattrs()
+        data = vflux[:]
+        # mask 없이 0 (fill value로만 두면 읽을 때 전부 mask 됨)
+        assert not np.ma.is_masked(data)
+        np.testing.assert_array_equal(np.ma.getdata(data), 0.0)
+        assert data.shape == (5, 3, 2)
+        t = ds.variables['temperature'][:]
+        assert t.mask[:, 2, 1].all() and not t.mask[:, :2].any()
+        np.testing.assert_allclose(t[:, :2], temp[:2].transpose(1, 0, 2))
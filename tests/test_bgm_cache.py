@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 11:05:12 2026
+
+@author: Ukjae
+"""
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from Atlantis_init_tools import _load_bgm_cache, _save_bgm_cache, load_bgm, read_bgm
+from test_box_average import write_test_bgm
+
+
+def _assert_same_bgm(a, b):
+    assert a['header'] == b['header']
+    assert (a['numboxes'], a['numfaces']) == (b['numboxes'], b['numfaces'])
+    pd.testing.assert_frame_equal(a['boxes'], b['boxes'], check_dtype=False)
+    pd.testing.assert_frame_equal(a['faces'], b['faces'], check_dtype=False)
+    for key in ('box_vert', 'box_iface', 'box_ibox'):
+        for x, y in zip(a[key], b[key]):
+            np.testing.assert_array_equal(x, y)
+
+
+def test_load_bgm_cache_round_trip(tmp_path):
+    bgm_file = write_test_bgm(str(tmp_path / 'test.bgm'))
+    cache_dir = str(tmp_path / 'cache')
+    first = load_bgm(bgm_file, cache_dir=cache_dir)
+    cached = load_bgm(bgm_file, cache_dir=cache_dir)
+    _assert_same_bgm(read_bgm(bgm_file), first)
+    _assert_same_bgm(first, cached)
+    assert cached['boxes']['label'].tolist() == ['Box0', 'Box1', 'Box2']
+
+
+def test_save_bgm_cache_from_threads(tmp_path):
+    # 같은 키를 여러 스레드가 동시에 저장해도 임시 파일이 겹치지 않음
+    bgm = read_bgm(write_test_bgm(str(tmp_path / 'test.bgm')))
+    path = str(tmp_path / 'bgm_key.npz')
+    barrier = threading.Barrier(8)
+    errors = []
+
+    def job():
+        try:
+            barrier.wait(timeout=30)
+            _save_bgm_cache(bgm, path)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=job) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=60)
+    assert errors == []
+    assert [n for n in os.listdir(tmp_path) if '.tmp.' in n] == []
+    _assert_same_bgm(bgm, _load_bgm_cache(path))
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 16:02:19 2026
+
+@author: Ukjae
+"""
+import datetime
+
+import netCDF4
+import numpy as np
+import pytest
+
+from get_box_average import box_average_year, get_box_weights, make_box_weights, read_ocean_grid
+
+CUM_DEPTHS = [0, 20, 50, 100]
+DEPTHS = np.array([5.0, 15.0, 35.0, 75.0])   # 층 경계 0, 10, 25, 55, 115
+
+
+# ---------------------------------------------------------------------------
+# 테스트 BGM (경위도): box0 [0,1]x[0,1], box1 [1,2]x[0,1] (botz -100),
+# box2 [2,2.04]x[0,0.04] (botz -30, 격자 cell 하나보다 작음)
+# ---------------------------------------------------------------------------
+def write_test_bgm(path):
+    boxes = [((0, 0), (1, 0), (1, 1), (0, 1)), ((1, 0), (2, 0), (2, 1), (1, 1)),
+             ((2, 0), (2.04, 0), (2.04, 0.04), (2, 0.04))]
+    botz = [-100, -100, -30]
+    iface = [[0], [0, 1], [1]]
+    ibox = [[1], [0, 2], [1]]
+    lines = ['# test bgm', 'projection proj=lonlat', 'nbox 3', 'nface 2', 'maxwcbotz -100']
+    for b, verts in enumerate(boxes):
+        xs, ys = zip(*verts)
+        lines += [f'box{b}.label Box{b}', f'box{b}.inside {np.mean(xs):g} {np.mean(ys):g}',
+                  f'box{b}.nconn {len(iface[b])}', f"box{b}.iface {' '.join(map(str, iface[b]))}",
+                  f"box{b}.ibox {' '.join(map(str, ibox[b]))}", f'box{b}.botz {botz[b]}', f'box{b}.area 1e6']
+        lines += [f'box{b}.vert {x:g} {y:g}' for x, y in verts + (verts[0],)]
+    for f, (p1, p2, lr) in enumerate([((1, 0), (1, 1), (0, 1)), ((2, 0), (2, 0.04), (1, 2))]):
+        lines += [f'face{f}.p1 {p1[0]:g} {p1[1]:g}', f'face{f}.p2 {p2[0]:g} {p2[1]:g}',
+                  f'face{f}.length 1000', f'face{f}.cs 1 0', f'face{f}.lr {lr[0]} {lr[1]}']
+    with open(path, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+    return path
+
+
+def write_test_ocean(path, n_time=2):
+    # 수온 = 20 - depth index, box1 영역 (1 < lon < 2)은 35 m 이하 NaN (모델 수심이 BGM보다 얕음)
+    lon = np.arange(-0.05, 2.2, 0.1)
+    lat = np.arange(-0.05, 1.1, 0.1)
+    with netCDF4.Dataset(path, 'w') as ds:
+        ds.createDimension('time', None)
+        for name, values in (('depth', DEPTHS), ('lat', lat), ('lon', lon)):
+            ds.createDimension(name, len(values))
+            ds.createVariable(name, 'f8', (name,))[:] = values
+        t = ds.createVariable('time', 'f8', ('time',))
+        t.units = 'hours since 2019-01-01 00:00:00'
+        t[:] = 24.0 * np.arange(n_time)
+        temp = np.broadcast_to((20.0 - np.arange(len(DEPTHS)))[:, None, None],
+                               (len(DEPTHS), len(lat), len(lon))).copy()
+        temp[2:, :, (lon > 1) & (lon < 2)] = np.nan
+        for name, field in (('water_temp', temp), ('salinity', np.full_like(temp, 35.0)),
+                            ('water_u', np.ones_like(temp)), ('water_v', np.zeros_like(temp))):
+            var = ds.createVariable(name, 'f4', ('time', 'depth', 'lat', 'lon'), fill_value=-30000.0)
+            var[:] = np.ma.masked_invalid(np.repeat(field[None], n_time, 0))
+    return path
+
+
+def test_empty_boxes_and_layers_are_filled(tmp_path):
+    bgm_file = write_test_bgm(str(tmp_path / 'test.bgm'))
+    nc_file = write_test_ocean(str(tmp_path / 'ocean_2019.nc'))
+    weights = make_box_weights(bgm_file, CUM_DEPTHS, read_ocean_grid(nc_file))
+    assert weights['box_cells'][2] == 0
+    np.testing.assert_array_equal(weights['box_wet'], [[1, 1, 1], [1, 1, 1], [1, 1, 0]])
+
+    out = box_average_year(2019, [nc_file], weights)
+    temp = out['av_temp']
+    assert temp.shape == (3, 2, 3)
+    # box0 층 2 (50-100 m): 35 m (5 m 겹침), 75 m (45 m 겹침)
+    np.testing.assert_allclose(temp[0, :, 2], (5 * 18 + 45 * 17) / 50.0)
+    # box1 층 2는 자료가 없으므로 위 층 (15 m만 유효 -> 19) 값
+    np.testing.assert_allclose(temp[1, :, 1], 19.0)
+    np.testing.assert_allclose(temp[1, :, 2], 19.0)
+    # box2는 가장 가까운 cell 사용, botz (30 m) 아래 층만 NaN
+    np.testing.assert_allclose(temp[2, :, 0], 19.5)
+    np.testing.assert_allclose(temp[2, :, 1], 18.5)
+    assert np.isnan(temp[2, :, 2]).all()
+    assert not np.isnan(temp[:2]).any()
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 16:48:10 2026
+
+@author: Ukjae
+"""
+import os
+import mmap
+import threading
+
+import numpy as np
+import pytest
+
+import get_box_average
+from get_box_average import (_npz_memmap, get_box_weights, load_box_weights, make_box_weights, read_ocean_grid,
+                             save_box_weights)
+from test_box_average import CUM_DEPTHS, write_test_bgm, write_test_ocean
+
+
+@pytest.fixture
+def inputs(tmp_path):
+    bgm_file = write_test_bgm(str(tmp_path / 'test.bgm'))
+    nc_file = write_test_ocean(str(tmp_path / 'ocean_2019.nc'))
+    return bgm_file, nc_file
+
+
+@pytest.fixture
+def clear_weights():
+    # 프로세스 안 가중치 캐시를 비우고 시작 / 끝
+    get_box_average._WEIGHTS.clear()
+    get_box_average._WEIGHTS_FILES.clear()
+    yield
+    get_box_average._WEIGHTS.clear()
+    get_box_average._WEIGHTS_FILES.clear()
+
+
+def _is_mapped(arr):
+    # base를 따라가면 mmap 객체가 나오면 파일을 그대로 memory map 한 배열
+    while arr is not None:
+        if isinstance(arr, mmap.mmap):
+            return True
+        arr = getattr(arr, 'base', None)
+    return False
+
+
+def _assert_same_weights(a, b):
+    for key in ('n_boxes', 'n_faces', 'n_layers', 'n_depth', 'window', 'grid_shape'):
+        assert a[key] == b[key]
+    np.testing.assert_array_equal(a['box_cells'], b['box_cells'])
+    np.testing.assert_array_equal(a['box_wet'], b['box_wet'])
+    for name in ('box', 'face_u', 'face_v'):
+        assert a[name].shape == b[name].shape
+        np.testing.assert_array_equal(a[name].indptr, b[name].indptr)
+        np.testing.assert_array_equal(a[name].indices, b[name].indices)
+        np.testing.assert_array_equal(a[name].data, b[name].data)
+
+
+def test_saved_weights_round_trip_as_memmap(tmp_path, inputs):
+    bgm_file, nc_file = inputs
+    built = make_box_weights(bgm_file, CUM_DEPTHS, read_ocean_grid(nc_file))
+    path = str(tmp_path / 'boxw_test.npz')
+    save_box_weights(built, path)
+    assert [name for name in os.listdir(tmp_path) if '.tmp.' in name] == []
+
+    loaded = load_box_weights(path)
+    _assert_same_weights(built, loaded)
+    # CSR 배열은 파일을 그대로 memory map (복사 없음)
+    assert isinstance(_npz_memmap(path)['box_data'], np.memmap)
+    for name in ('box', 'face_u', 'face_v'):
+        assert _is_mapped(loaded[name].data) and _is_mapped(loaded[name].indices)
+    # 같은 행렬 곱 결과
+    x = np.random.default_rng(0).random(built['box'].shape[1])
+    np.testing.assert_array_equal(built['box'] @ x, loaded['box'] @ x)
+
+
+def test_get_box_weights_builds_once_across_threads(tmp_path, inputs, monkeypatch, clear_weights):
+    bgm_file, nc_file = inputs
+    calls, grid_reads = [], []
+    real = get_box_average.make_box_weights
+    real_grid = get_box_average.read_ocean_grid
+    barrier = threading.Barrier(4)
+
+    def counted(*args, **kwargs):
+        calls.append(threading.get_ident())
+        return real(*args, **kwargs)
+
+    def counted_grid(nc_file):
+        grid_reads.append(threading.get_ident())
+        return real_grid(nc_file)
+
+    results = [None] * 4
+
+    def job(i):
+        # 네 스레드가 동시에 같은 키를 요청
+        barrier.wait(timeout=30)
+        results[i] = get_box_weights(bgm_file, CUM_DEPTHS, nc_file, cache_dir=str(tmp_path / 'cache'))
+
+    monkeypatch.setattr(get_box_average, 'make_box_weights', counted)
+    monkeypatch.setattr(get_box_average, 'read_ocean_grid', counted_grid)
+    threads = [threading.Thread(target=job, args=(i,)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=60)
+    # 격자 (netCDF4)는 lock 안에서 한 스레드만 읽음
+    assert len(calls) == 1 and len(grid_reads) == 1
+    assert all(r is not None for r in results)
+    assert all(r is results[0] for r in results)
+
+    # 캐시 파일에서 다시 읽은 가중치도 같음
+    get_box_average._WEIGHTS.clear()
+    get_box_average._WEIGHTS_FILES.clear()
+    cached = get_box_weights(bgm_file, CUM_DEPTHS, nc_file, cache_dir=str(tmp_path / 'cache'))
+    assert len(calls) == 1
+    _assert_same_weights(results[0], cached)
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 11:02:37 2026
+
+@author: Ukjae
+"""
+import os
+import shutil
+import subprocess
+
+import netCDF4
+import numpy as np
+import pytest
+
+from get_hydro_netcdf import cdl_to_netcdf, convert_year
+
+
+# ---------------------------------------------------------------------------
+# hydroconstruct 출력과 같은 형식의 CDL: unlimited 't', 속성 (_FillValue, 지수 표기),
+# 여러 줄에 걸친 값, 결측값 '_', 타입 접미사
+# ---------------------------------------------------------------------------
+def _cdl(t0, temps):
+    lines = [
+        'netcdf temp_2019_01 {',
+        'dimensions:',
+        '\tt = UNLIMITED ; // (2 currently)',
+        '\tb = 3 ;',
+        '\tz = 2 ;',
+        'variables:',
+        '\tdouble t(t) ;',
+        '\t\tt:units = "seconds since 2019-01-01 00:00:00 +10" ;',
+        '\t\tt:dt = 43200. ;',
+        '\tdouble temperature(t, b, z) ;',
+        '\t\ttemperature:_FillValue = -1e+20 ;',
+        '\t\ttemperature:valid_min = -2.5e0, 4.0E+1 ;',
+        '\t\ttemperature:units = "degree_C" ;',
+        '\tint nominal_dz(z) ;',
+        '',
+        '// global attributes:',
+        '\t\t:title = "trivial" ;',
+        '\t\t:geometry = "g.bgm" ;',
+        'data:',
+        '',
+        f' t = {t0}, {t0 + 43200} ;',
+        '',
+        ' nominal_dz = 10, 20 ;',
+        '',
+        ' temperature =',
+    ]
+    rows = [', '.join(row) for row in temps]
+    lines += ['  ' + row + (' ;' if i == len(rows) - 1 else ',') for i, row in enumerate(rows)]
+    lines.append('}')
+    return '\n'.join(lines) + '\n'
+
+
+_TEMPS_1 = [['1.5', '2.5e-1'], ['_', '3E+2'], ['-4.25', '_'],
+            ['5', '6.0'], ['7.5', '8'], ['9.', '-1.0e+20']]
+_TEMPS_2 = [['10', '11'], ['12', '13'], ['14', '15'],
+            ['16', '17'], ['_', '_'], ['18', '19']]
+
+
+def _expected(temps):
+    return np.array([[-1e20 if v == '_' else float(v) for v in row] for row in temps]).reshape(2, 3, 2)
+
+
+def _read(nc_file):
+    with netCDF4.Dataset(nc_file) as ds:
+        ds.set_auto_mask(False)
+        return {name: ds.variables[name][...] for name in ds.variables}, \
+            {name: ds.variables[name].__dict__ for name in ds.variables}, ds.__dict__
+
+
+def test_cdl_to_netcdf_values_and_attributes(tmp_path):
+    txt_file = tmp_path / 'temp_2019_01.txt'
+    txt_file.write_text(_cdl(0, _TEMPS_1))
+    nc_file = str(tmp_path / 'temp_2019_01.nc')
+    sizes = cdl_to_netcdf(str(txt_file), nc_file)
+    assert sizes == {'t': 2, 'b': 3, 'z': 2}
+
+    values, atts, global_atts = _read(nc_file)
+    np.testing.assert_array_equal(values['t'], [0, 43200])
+    np.testing.assert_array_equal(values['nominal_dz'], [10, 20])
+    np.testing.assert_array_equal(values['temperature'], _expected(_TEMPS_1))
+    assert atts['temperature']['_FillValue'] == -1e20
+    np.testing.assert_array_equal(atts['temperature']['valid_min'], [-2.5, 40.0])
+    assert atts['temperature']['units'] == 'degree_C'
+    assert atts['t']['dt'] == 43200.0
+    assert global_atts == {'title': 'trivial', 'geometry': 'g.bgm'}
+
+
+def test_cdl_to_netcdf_append(tmp_path):
+    first, second = tmp_path / 'm01.txt', tmp_path / 'm02.txt'
+    first.write_text(_cdl(0, _TEMPS_1))
+    second.write_text(_cdl(86400, _TEMPS_2))
+    nc_file = str(tmp_path / 'temp_2019.nc')
+    cdl_to_netcdf(str(first), nc_file)
+    assert cdl_to_netcdf(str(second), nc_file, append=True)['t'] == 2
+
+    values, _, _ = _read(nc_file)
+    np.testing.assert_array_equal(values['t'], [0, 43200, 86400, 129600])
+    np.testing.assert_array_equal(values['temperature'],
+                                  np.concatenate([_expected(_TEMPS_1), _expected(_TEMPS_2)]))
+    # 고정 크기 변수는 첫 파일 값 유지
+    np.testing.assert_array_equal(values['nominal_dz'], [10, 20])
+
+
+def test_cdl_to_netcdf_rejects_partial_record(tmp_path):
+    txt_file = tmp_path / 'bad.txt'
+    txt_file.write_text(_cdl(0, _TEMPS_1).replace('-4.25, _', '-4.25'))
+    with pytest.raises(ValueError):
+        cdl_to_netcdf(str(txt_file), str(tmp_path / 'bad.nc'))
+
+
+def _write_year(input_dir, bad_month=None):
+    for month in range(1, 13):
+        text = _cdl(0, _TEMPS_1)
+        if month == bad_month:
+            text = text.replace('-4.25, _', '-4.25')
+        (input_dir / f'temp_2019_{month:02d}.txt').write_text(text)
+
+
+def test_convert_year_direct(tmp_path):
+    _write_year(tmp_path)
+    merged_file = convert_year('temp', 2019, str(tmp_path), str(tmp_path), direct=True)
+    assert merged_file == str(tmp_path / 'temp_2019.nc')
+    assert not os.path.exists(merged_file + '.tmp')
+    values, atts, _ = _read(merged_file)
+    np.testing.assert_array_equal(values['t'], np.arange(24) * 43200.0)
+    assert atts['t']['units'] == 'seconds since 2019-01-01 00:00:00'
+    np.testing.assert_array_equal(values['temperature'], np.concatenate([_expected(_TEMPS_1)] * 12))
+
+
+@pytest.mark.parametrize('bad_month, dt', [(5, None), (None, 30 * 86400.0)])
+def test_convert_year_direct_failure_keeps_previous_file(tmp_path, bad_month, dt):
+    # 5월 CDL이 잘못되었거나 시간 단계 수가 dt 기준 1년 (12개)을 넘으면 기존 파일 유지, 임시 파일 삭제
+    merged_file = tmp_path / 'temp_2019.nc'
+    merged_file.write_bytes(b'previous')
+    _write_year(tmp_path, bad_month=bad_month)
+    with pytest.raises(ValueError):
+        convert_year('temp', 2019, str(tmp_path), str(tmp_path), direct=True, dt=dt)
+    assert merged_file.read_bytes() == b'previous'
+    assert not os.path.exists(str(merged_file) + '.tmp')
+
+
+@pytest.mark.skipif(shutil.which('ncgen') is None, reason='ncgen 없음')
+def test_cdl_to_netcdf_matches_ncgen(tmp_path):
+    txt_file = tmp_path / 'temp_2019_01.txt'
+    txt_file.write_text(_cdl(0, _TEMPS_1))
+    ours, ref = str(tmp_path / 'ours.nc'), str(tmp_path / 'ncgen.nc')
+    cdl_to_netcdf(str(txt_file), ours)
+    subprocess.run(['ncgen', '-o', ref, str(txt_file)], check=True)
+
+    ours_values, ours_atts, ours_global = _read(ours)
+    ref_values, ref_atts, ref_global = _read(ref)
+    assert ours_values.keys() == ref_values.keys()
+    for name in ref_values:
+        np.testing.assert_array_equal(ours_values[name], ref_values[name])
+        assert ours_atts[name].keys() == ref_atts[name].keys()
+    assert ours_global == ref_global
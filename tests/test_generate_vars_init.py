@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 11:58:44 2026
+
+@author: Ukjae
+"""
+import os
+
+import pandas as pd
+import pytest
+
+from Atlantis_init_tools import generate_vars_init
+
+TEMPLATE = os.path.join(os.path.dirname(__file__), os.pardir, 'initial', 'AttributeTemplate.csv')
+
+
+# ---------------------------------------------------------------------------
+# 이전 구현 (그룹마다 iterrows, 변수마다 템플릿 검색)을 그대로 옮긴 기준 함수
+# ---------------------------------------------------------------------------
+def _baseline_vars_init(grp_file, df_atts):
+    df_grp = pd.read_csv(grp_file)
+    if 'InvertType' in df_grp.columns:
+        df_grp = df_grp.rename(columns={'InvertType': 'GroupType'})
+    df_grp['GroupType'] = df_grp['GroupType'].astype(str)
+    for col in ['IsCover', 'NumCohorts', 'IsSiliconDep']:
+        if col in df_grp.columns:
+            df_grp[col] = pd.to_numeric(df_grp[col], errors='coerce')
+    df_grp['multiN'] = ((df_grp['IsCover'] == 1) & (df_grp['NumCohorts'] > 1)) | \
+                       ((df_grp['GroupType'] == 'PWN') & (df_grp['NumCohorts'] > 1)) | \
+                       ((df_grp['GroupType'] == 'CEP') & (df_grp['NumCohorts'] > 1))
+    df_grp['needsNums'] = df_grp['GroupType'].isin(['FISH', 'BIRD', 'SHARK', 'MAMMAL', 'REPTILE', 'FISH_INVERT'])
+    df_grp['needsLight'] = df_grp['GroupType'].isin(['DINOFLAG', 'MICROPHTYBENTHOS', 'SM_PHY', 'MED_PHY', 'LG_PHY'])
+
+    rows = []
+
+    def add(variable, target, hit, miss):
+        indx = df_atts.index[df_atts['name'] == target]
+        if len(indx) > 0:
+            rows.append((variable, hit(df_atts.loc[indx[0], 'long_name']), indx[0]))
+        else:
+            rows.append((variable, miss, -1))
+
+    for _, row in df_grp.iterrows():
+        if row['needsNums']:
+            continue
+        name, target = row['Name'], f"{row['GroupType']}_N"
+        if not row['multiN']:
+            add(f"{name}_N", target, lambda t: f"{name} {t}", f"{name} N")
+        else:
+            for j in range(int(row['NumCohorts'])):
+                add(f"{name}_N{j+1}", target, lambda t: f"{name} cohort {j+1} {t}", f"{name} N{j+1}")
+        if row['IsCover'] == 1:
+            add(f"{name}_Cover", 'Cover', lambda t: f"Percent cover by {name}", f"{name} Cover")
+        if row['IsSiliconDep'] == 1:
+            add(f"{name}_S", 'Si3D', lambda t: f"{name} Silicon", f"{name} S")
+        if row['needsLight']:
+            add(f"Light_Adaptn_{row['Code']}", 'Light3D', lambda t: f"Light adaption of {name}", f"Light_{name}")
+    for _, row in df_grp.iterrows():
+        if not row['needsNums']:
+            continue
+        name = row['Name']
+        add(f"{name}_N", f"{row['GroupType']}_N", lambda t: f"{name} {t}", f"{name} N")
+        for j in range(int(row['NumCohorts'])):
+            add(f"{name}{j+1}_Nums", 'Nums3D', lambda t: f"Numbers of {name} cohort {j+1}", f"{name} Nums{j+1}")
+        for j in range(int(row['NumCohorts'])):
+            add(f"{name}{j+1}_StructN", 'StructN3D', lambda t: f"Individual structural N for {name} cohort {j+1}",
+                f"{name} StructN{j+1}")
+        for j in range(int(row['NumCohorts'])):
+            add(f"{name}{j+1}_ResN", 'ResN3D', lambda t: f"Individual reserve N for {name} cohort {j+1}",
+                f"{name} ResN{j+1}")
+    return pd.DataFrame(rows, columns=['Variable', 'long_name', 'att_index'])
+
+
+# 합성 그룹: cover (1 / 여러 코호트), PWN / CEP 다중 코호트, 규소 의존, 빛 적응, 척추동물 다중 코호트,
+# 템플릿에 없는 그룹 유형, 빈 값
+_GROUPS = [
+    # Code, Name, GroupType, IsCover, NumCohorts, IsSiliconDep
+    ('FVO', 'Fish_a', 'FISH', 0, 10, 0),
+    ('CRL', 'Coral', 'CORAL', 1, 1, 0),
+    ('SG', 'Seagrass', 'SEAGRASS', 1, 3, 1),
+    ('PWN', 'Prawn', 'PWN', 0, 2, 0),
+    ('CEP', 'Squid', 'CEP', 0, 1, 0),
+    ('DF', 'Diatom', 'LG_PHY', 0, 1, 1),
+    ('PS', 'Pico', 'SM_PHY', 0, 1, ''),
+    ('MB', 'MicroBen', 'MICROPHTYBENTHOS', 1, 2, 1),
+    ('SHB', 'Bird', 'BIRD', 0, 1, 0),
+    ('WHB', 'Whale', 'MAMMAL', 0, 4, 0),
+    ('ZZ', 'Mystery', 'UNKNOWN_TYPE', 0, 3, 1),
+    ('BB', 'Bact', 'PL_BACT', '', 1, 0),
+    ('SHK', 'Shark', 'SHARK', 0, 2, 0),
+]
+
+
+@pytest.fixture(params=['GroupType', 'InvertType'])
+def grp_file(tmp_path, request):
+    path = str(tmp_path / 'groups.csv')
+    pd.DataFrame(_GROUPS, columns=['Code', 'Name', request.param, 'IsCover', 'NumCohorts', 'IsSiliconDep'])\
+        .to_csv(path, index=False)
+    return path
+
+
+def _templates():
+    full = pd.read_csv(TEMPLATE, header=0, dtype=str)
+    # 템플릿에 없는 항목 (long_name 기본값, att_index -1)
+    partial = full[~full['name'].isin(['Cover', 'Si3D', 'Nums3D', 'FISH_N', 'PWN_N', 'LG_PHY_N'])]
+    # 같은 이름이 두 번 있으면 첫 행 사용
+    duplicated = pd.concat([full, full[full['name'].isin(['CORAL_N', 'ResN3D', 'Light3D'])]\
+                            .assign(long_name='second copy')], ignore_index=True)
+    return {'full': full, 'partial': partial, 'duplicated': duplicated}
+
+
+@pytest.mark.parametrize('template', ['full', 'partial', 'duplicated'])
+def test_generate_vars_init_matches_baseline(grp_file, template):
+    df_atts = _templates()[template]
+    expected = _baseline_vars_init(grp_file, df_atts)
+    result = generate_vars_init(grp_file, [0, 20, 50], df_atts)
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+    assert result['att_index'].dtype.kind == 'i'
+    # 모든 분기가 포함되었는지 확인
+    variables = set(result['Variable'])
+    assert {'Seagrass_N3', 'Seagrass_Cover', 'Seagrass_S', 'Prawn_N2', 'Squid_N', 'Light_Adaptn_PS',
+            'Whale4_ResN', 'Mystery_N', 'Mystery_S', 'MicroBen_N2'} <= variables
+    assert len(result) == len(expected) == 78
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 12:20:31 2026
+
+@author: Ukjae
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from Atlantis_init_tools import make_horiz_distribution
+
+# box0 섬, box1-4 물 (수심 10, 50, 150, 400 m)
+BOX_DATA = pd.DataFrame({
+    'total_depth': [0.0, 10.0, 50.0, 150.0, 400.0],
+    'area': [5.0, 1.0, 2.0, 3.0, 4.0],
+    'is_island': [True, False, False, False, False],
+})
+VAR_NAMES = ['Fish_N', 'Fish1_Nums', 'Fish2_Nums', 'Coral_N', 'Coral_Cover', 'NH3']
+
+
+def _values(df, name):
+    return df.set_index('Variable').loc[name].to_numpy(dtype=float)
+
+
+def test_uniform_and_area_normalisation():
+    spec = pd.DataFrame({'Variable': ['NH3', 'Fish_N'], 'pattern': ['uniform', 'area'], 'value': [2.0, 100.0]})
+    df = make_horiz_distribution(BOX_DATA, spec, VAR_NAMES)
+    assert df.columns.tolist() == ['Variable', 'box0', 'box1', 'box2', 'box3', 'box4']
+    np.testing.assert_array_equal(_values(df, 'NH3'), [0, 2, 2, 2, 2])
+    # area: 물 box의 면적 비율로 나눠 합이 value
+    fish = _values(df, 'Fish_N')
+    assert fish.sum() == pytest.approx(100.0)
+    np.testing.assert_allclose(fish, 100.0 * np.array([0, 1, 2, 3, 4]) / 10.0)
+
+
+def test_island_zero():
+    spec = pd.DataFrame({'Variable': ['NH3', 'Fish_N'], 'pattern': ['uniform', 'area'], 'value': [1.0, 15.0],
+                         'island_zero': [0, np.nan]})
+    df = make_horiz_distribution(BOX_DATA, spec, VAR_NAMES)
+    # island_zero = 0 이면 섬 box도 값, 비어 있으면 기본 1 (섬 box 0)
+    np.testing.assert_array_equal(_values(df, 'NH3'), [1, 1, 1, 1, 1])
+    np.testing.assert_allclose(_values(df, 'Fish_N'), [0, 1.5, 3, 4.5, 6])
+
+
+def test_depth_window():
+    spec = pd.DataFrame({'Variable': ['NH3', 'Fish_N', 'Coral_N'], 'pattern': ['uniform', 'area', 'uniform'],
+                         'value': [1.0, 10.0, 3.0], 'depth_min': [50, 10, np.nan], 'depth_max': [400, 150, 50]})
+    df = make_horiz_distribution(BOX_DATA, spec, VAR_NAMES)
+    # [depth_min, depth_max): 50 포함, 400 제외
+    np.testing.assert_array_equal(_values(df, 'NH3'), [0, 0, 1, 1, 0])
+    # 면적 비율도 창 안의 box끼리 (box1, box2)
+    np.testing.assert_allclose(_values(df, 'Fish_N'), [0, 10 / 3, 20 / 3, 0, 0])
+    # depth_min이 없으면 아래 제한 없음 (섬 box는 island_zero로 0)
+    np.testing.assert_array_equal(_values(df, 'Coral_N'), [0, 3, 0, 0, 0])
+
+
+def test_wildcards_later_rows_win():
+    spec = pd.DataFrame({'Variable': ['*_N', 'Fish?_Nums', 'Coral_N'], 'pattern': ['uniform', 'uniform', 'uniform'],
+                         'value': [1.0, 2.0, 5.0]})
+    df = make_horiz_distribution(BOX_DATA, spec, VAR_NAMES + ['Fish_N'])
+    # var_names 순서 (중복 제거), 맞는 규칙이 없는 변수 (Coral_Cover, NH3)는 없음
+    assert df['Variable'].tolist() == ['Fish_N', 'Fish1_Nums', 'Fish2_Nums', 'Coral_N']
+    np.testing.assert_array_equal(_values(df, 'Fish_N'), [0, 1, 1, 1, 1])
+    np.testing.assert_array_equal(_values(df, 'Fish2_Nums'), [0, 2, 2, 2, 2])
+    np.testing.assert_array_equal(_values(df, 'Coral_N'), [0, 5, 5, 5, 5])
+
+
+def test_habitat_weights():
+    # boxid 컬럼이 있으면 box 순서로 정렬
+    habitat = pd.DataFrame({'boxid': [4, 3, 2, 1, 0], 'reef': [0.0, 0.5, 1.0, 0.0, 1.0]})
+    spec = pd.DataFrame({'Variable': ['Coral_N', 'Coral_Cover', 'NH3'], 'pattern': ['area', 'uniform', 'uniform'],
+                         'value': [10.0, 0.8, 1.0], 'habitat': ['reef', 'reef', np.nan]})
+    df = make_horiz_distribution(BOX_DATA, spec, VAR_NAMES, habitat=habitat)
+    # area: 면적 x habitat (box2 = 2 x 1.0, box3 = 3 x 0.5)
+    np.testing.assert_allclose(_values(df, 'Coral_N'), [0, 0, 10 * 2 / 3.5, 10 * 1.5 / 3.5, 0])
+    np.testing.assert_allclose(_values(df, 'Coral_Cover'), [0, 0, 0.8, 0.4, 0])
+    np.testing.assert_array_equal(_values(df, 'NH3'), [0, 1, 1, 1, 1])
+
+    with pytest.raises(ValueError):
+        make_horiz_distribution(BOX_DATA, spec, VAR_NAMES)
+
+
+def test_unknown_pattern():
+    spec = pd.DataFrame({'Variable': ['NH3'], 'pattern': ['gaussian'], 'value': [1.0]})
+    with pytest.raises(ValueError):
+        make_horiz_distribution(BOX_DATA, spec, VAR_NAMES)
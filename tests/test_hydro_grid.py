@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 13:41:18 2026
+
+@author: Ukjae
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from Atlantis_hydro_tools import HYDRO_DT, make_hydro_grid
+
+
+def test_grid_with_729_steps(capsys):
+    # get_temp3.m 출력처럼 12시간 간격 1년치가 729개 (1년 730개보다 하나 적음)
+    temp = np.zeros((4, 729, 3))
+    grid = make_hydro_grid(2019, {'temp': temp, 'salt': temp})
+    assert grid['dt'] == HYDRO_DT == 43200
+    assert grid['n_time'] == 729
+    assert grid['time_vector'][0] == pd.Timestamp('2019-01-01 00:00:00')
+    assert grid['time_vector'][-1] == pd.Timestamp('2019-12-31 00:00:00')
+    assert '경고' in capsys.readouterr().out
+
+    months = grid['months']
+    assert [m[0] for m in months] == list(range(1, 13))
+    assert months[0][1:3] == (0, 62)
+    assert months[-1][2] - months[-1][1] == 61
+    assert sum(stop - start for _, start, stop, _ in months) == 729
+    # 월별 구간은 연속
+    assert all(a[2] == b[1] for a, b in zip(months, months[1:]))
+
+
+def test_grid_full_year_and_explicit_dt():
+    grid = make_hydro_grid(2020, {'trans': np.zeros((5, 8784, 2))}, dt=3600)
+    assert grid['n_time'] == 8784
+    assert grid['time_vector'][-1] == pd.Timestamp('2020-12-31 23:00:00')
+    assert grid['months'][1][2] - grid['months'][1][1] == 29 * 24
+
+
+def test_grid_rejects_more_than_a_year():
+    with pytest.raises(ValueError):
+        make_hydro_grid(2019, {'temp': np.zeros((4, 731, 3))})
+
+
+def test_grid_rejects_mismatched_counts():
+    with pytest.raises(ValueError):
+        make_hydro_grid(2019, {'temp': np.zeros((4, 729, 3)), 'salt': np.zeros((4, 728, 3))})
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 11:32:08 2026
+
+@author: Ukjae
+"""
+import os
+import sys
+
+import pytest
+
+from get_hydro_final import run_hydroconstruct_month
+
+# hydroconstruct 대신 실행할 스텁: -f / -s / -t 출력 중 argv[1]에 적힌 것만 만들고 종료 코드 0
+_STUB = """import sys
+args = dict(zip(sys.argv[2::2], sys.argv[3::2]))
+for flag in sys.argv[1].split(','):
+    with open(args[flag], 'w') as f:
+        f.write('netcdf x {}')
+"""
+
+
+@pytest.fixture
+def setup(tmp_path):
+    stub = tmp_path / 'stub.py'
+    stub.write_text(_STUB)
+    template = tmp_path / 'param.prm'
+    template.write_text('tstart 0\ntstop 1\nreference_year 2000\n')
+    working_dir = tmp_path / '2019'
+    working_dir.mkdir()
+    return str(stub), str(template), str(working_dir)
+
+
+def test_outputs_moved_on_success(setup):
+    stub, template, working_dir = setup
+    job = run_hydroconstruct_month(2019, 3, template, working_dir, [sys.executable, stub, '-f,-s,-t'])
+    assert job['ok'] and job['error'] is None
+    assert [os.path.basename(p) for p in job['outputs']] == ['flow_2019_03.txt', 'salt_2019_03.txt', 'temp_2019_03.txt']
+    assert all(os.path.exists(p) for p in job['outputs'])
+    assert not os.path.exists(job['job_dir'])
+
+
+def test_missing_output_is_a_failure(setup):
+    stub, template, working_dir = setup
+    job = run_hydroconstruct_month(2019, 3, template, working_dir, [sys.executable, stub, '-f,-s'])
+    assert job['returncode'] == 0
+    assert not job['ok']
+    assert 'temp_2019_03.txt' in job['error']
+    # 일부 출력도 옮기지 않고 확인할 수 있도록 작업 폴더를 남김
+    assert job['outputs'] == []
+    assert not os.path.exists(os.path.join(working_dir, 'flow_2019_03.txt'))
+    assert os.path.exists(os.path.join(job['job_dir'], 'flow_2019_03.txt'))
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 12:51:16 2026
+
+@author: Ukjae
+"""
+import os
+import shutil
+
+import netCDF4
+import numpy as np
+import pandas as pd
+import pytest
+
+from Atlantis_init_tools import get_init_nc, get_init_nc_layers, make_init_csv, make_init_nc
+from test_box_average import CUM_DEPTHS, write_test_bgm
+from test_generate_vars_init import _GROUPS, TEMPLATE
+
+
+@pytest.fixture(scope='module')
+def init_nc(tmp_path_factory):
+    # make_init_csv는 현재 폴더의 AttributeTemplate.csv를 읽음
+    work = tmp_path_factory.mktemp('init')
+    shutil.copy(TEMPLATE, work / 'AttributeTemplate.csv')
+    cwd = os.getcwd()
+    os.chdir(work)
+    try:
+        bgm_file = write_test_bgm(str(work / 'test.bgm'))
+        pd.DataFrame(_GROUPS, columns=['Code', 'Name', 'GroupType', 'IsCover', 'NumCohorts', 'IsSiliconDep'])\
+            .to_csv(work / 'groups.csv', index=False)
+        make_init_csv(str(work / 'groups.csv'), bgm_file, CUM_DEPTHS, str(work / 'test'))
+        make_init_nc(bgm_file, CUM_DEPTHS, str(work / 'test_init.csv'), str(work / 'test_horiz.csv'),
+                     str(work / 'test.nc'))
+    finally:
+        os.chdir(cwd)
+    return str(work / 'test.nc')
+
+
+def _nc_arrays(nc_file):
+    with netCDF4.Dataset(nc_file) as ds:
+        return {name: (var.dimensions, np.array(var[...], dtype=float)) for name, var in ds.variables.items()}
+
+
+def test_get_init_nc_default_and_selection(init_nc, tmp_path):
+    arrays = _nc_arrays(init_nc)
+    numboxes = 3
+    get_init_nc(init_nc, str(tmp_path / 'all.csv'))
+    full = pd.read_csv(tmp_path / 'all.csv')
+    assert full['Variable'].tolist() == list(arrays)
+    # 기본 출력: 변수마다 평탄화한 앞쪽 numboxes개 값 (짧으면 NaN)
+    for _, row in full.iterrows():
+        flat = arrays[row['Variable']][1].ravel()[:numboxes]
+        expected = np.full(numboxes, np.nan)
+        expected[:len(flat)] = flat
+        np.testing.assert_allclose(row[[f'box{i}' for i in range(numboxes)]].to_numpy(dtype=float), expected)
+
+    # 변수 묶음 크기와 관계없이 같은 파일
+    get_init_nc(init_nc, str(tmp_path / 'chunked.csv'), chunk_vars=7)
+    pd.testing.assert_frame_equal(pd.read_csv(tmp_path / 'chunked.csv'), full)
+
+    # var_filter (정규식 / 목록)는 기본 출력의 해당 행과 같음
+    get_init_nc(init_nc, str(tmp_path / 'regex.csv'), var_filter=r'_Nums$')
+    regex = pd.read_csv(tmp_path / 'regex.csv')
+    assert len(regex) and regex['Variable'].str.endswith('_Nums').all()
+    pd.testing.assert_frame_equal(regex, full[full['Variable'].str.endswith('_Nums')].reset_index(drop=True))
+    get_init_nc(init_nc, str(tmp_path / 'list.csv'), var_filter=['volume', 'Coral_N', 'missing'])
+    assert pd.read_csv(tmp_path / 'list.csv')['Variable'].tolist() == ['volume', 'Coral_N']
+
+    # layer_index: (t, b, z) 변수는 해당 층의 box 값
+    get_init_nc(init_nc, str(tmp_path / 'layer.csv'), var_filter=['Coral_N', 'volume', 'numlayers'],
+                time_index=0, layer_index=1)
+    layer = pd.read_csv(tmp_path / 'layer.csv').set_index('Variable')
+    for name in layer.index:
+        dims, data = arrays[name]
+        expected = data[0, :, 1] if dims == ('t', 'b', 'z') else data[0]
+        np.testing.assert_allclose(layer.loc[name].to_numpy(dtype=float), expected)
+
+
+def test_get_init_nc_layers_long_and_wide(init_nc, tmp_path):
+    arrays = _nc_arrays(init_nc)
+    get_init_nc_layers(init_nc, str(tmp_path / 'long.csv'))
+    long = pd.read_csv(tmp_path / 'long.csv')
+    assert set(long['Variable']) == set(arrays)
+    # 모든 값이 NetCDF의 (t, b, z) 위치 값과 같음 (없는 차원은 -1)
+    for name, group in long.groupby('Variable'):
+        dims, data = arrays[name]
+        idx = tuple(group[{'t': 't', 'b': 'b', 'z': 'z'}[d]].to_numpy() for d in dims)
+        np.testing.assert_allclose(group['value'].to_numpy(), data[idx])
+        assert len(group) == data.size
+
+    # 변수 묶음 크기와 관계없이 같은 파일
+    get_init_nc_layers(init_nc, str(tmp_path / 'long_chunked.csv'), chunk_vars=5)
+    pd.testing.assert_frame_equal(pd.read_csv(tmp_path / 'long_chunked.csv'), long)
+
+    # wide: (Variable, t, z) 행마다 box 열 = long 표를 펼친 것
+    get_init_nc_layers(init_nc, str(tmp_path / 'wide.csv'), layout='wide')
+    wide = pd.read_csv(tmp_path / 'wide.csv')
+    spread = long[long['b'] >= 0].pivot(index=['Variable', 't', 'z'], columns='b', values='value')
+    spread.columns = [f'box{b}' for b in spread.columns]
+    wide = wide.set_index(['Variable', 't', 'z'])
+    np.testing.assert_allclose(wide.loc[spread.index].to_numpy(dtype=float), spread.to_numpy(dtype=float))
+    # b 차원이 없는 변수 ('t')는 box0에 값
+    assert len(wide) == len(spread) + 1
+    np.testing.assert_allclose(wide.loc[('t', 0, -1)].to_numpy(dtype=float), [0.0, np.nan, np.nan])
+
+    # var_filter / time_index / layer_index는 기본 long 출력을 거른 것과 같음
+    get_init_nc_layers(init_nc, str(tmp_path / 'sel.csv'), var_filter=r'^(Coral_N|Whale\d_ResN|volume)$',
+                       time_index=0, layer_index=2)
+    sel = pd.read_csv(tmp_path / 'sel.csv')
+    expected = long[long['Variable'].str.match(r'^(Coral_N|Whale\d_ResN|volume)$') & long['z'].isin([2, -1])]
+    pd.testing.assert_frame_equal(sel.sort_values(['Variable', 'b']).reset_index(drop=True),
+                                  expected.sort_values(['Variable', 'b']).reset_index(drop=True))
+
+    with pytest.raises(ValueError):
+        get_init_nc_layers(init_nc, str(tmp_path / 'bad.csv'), layout='tall')
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 10:20:05 2026
+
+@author: Ukjae
+"""
+import numpy as np
+import pytest
+import scipy.io
+
+from Atlantis_hydro_tools import _mat5_memmap, open_mat_array
+
+
+# ---------------------------------------------------------------------------
+# 테스트용 .mat (v5) 파일: hydro 입력과 같은 [boxes, time, level] 배열 + 다른 변수들
+# ---------------------------------------------------------------------------
+def _write_mat(path, compress=False):
+    rng = np.random.default_rng(0)
+    data = {
+        'label': 'bgm',
+        'scalar': np.float64(3.5),
+        'lr': rng.integers(0, 20, size=(30, 2)).astype(np.int32),
+        'av_temp': rng.normal(10.0, 2.0, size=(20, 24, 5)),
+        'T': rng.normal(0.0, 1e5, size=(30, 24, 5)).astype(np.float32),
+    }
+    scipy.io.savemat(path, data, do_compression=compress)
+    return scipy.io.loadmat(path)
+
+
+@pytest.mark.parametrize('name', ['av_temp', 'T', 'lr'])
+def test_mat5_memmap_matches_loadmat(tmp_path, name):
+    path = str(tmp_path / 'hydro.mat')
+    expected = _write_mat(path)[name]
+    arr = _mat5_memmap(path, name)
+    assert isinstance(arr, np.memmap)
+    assert arr.shape == expected.shape
+    assert arr.dtype == expected.dtype
+    np.testing.assert_array_equal(np.asarray(arr), expected)
+    # 시간 구간만 읽어도 같은 값
+    if arr.ndim == 3:
+        np.testing.assert_array_equal(arr[:, 5:9, :], expected[:, 5:9, :])
+
+
+def test_mat5_memmap_missing_variable(tmp_path):
+    path = str(tmp_path / 'hydro.mat')
+    _write_mat(path)
+    assert _mat5_memmap(path, 'salt') is None
+
+
+def test_compressed_mat_falls_back_to_loadmat(tmp_path):
+    path = str(tmp_path / 'hydro_v7.mat')
+    expected = _write_mat(path, compress=True)
+    # 압축 요소는 memmap 할 수 없으므로 None -> open_mat_array가 scipy.io.loadmat으로 읽음
+    assert _mat5_memmap(path, 'av_temp') is None
+    arr = open_mat_array(path, 'av_temp')
+    np.testing.assert_array_equal(np.asarray(arr), expected['av_temp'])
+
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_open_mat_array_float32(tmp_path, compress):
+    path = str(tmp_path / 'hydro.mat')
+    expected = _write_mat(path, compress=compress)['av_temp']
+    arr = open_mat_array(path, 'av_temp', precision='float32')
+    assert arr.shape == expected.shape
+    block = np.asarray(arr[:, 0:12, :])
+    assert block.dtype == np.float32
+    np.testing.assert_array_equal(block, expected[:, 0:12, :].astype(np.float32))
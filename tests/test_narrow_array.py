@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 14:25:52 2026
+
+@author: Ukjae
+"""
+import numpy as np
+import pytest
+
+from Atlantis_hydro_tools import narrow_array, pack_int16
+
+
+def test_int16_round_trip_keeps_nan():
+    rng = np.random.default_rng(1)
+    arr = rng.normal(15.0, 5.0, size=(6, 600, 4))
+    arr[2, 10:20, 3] = np.nan
+    packed = narrow_array(arr, 'int16')
+    restored = np.asarray(packed[:, :, :])
+    assert restored.dtype == np.float32
+    assert np.array_equal(np.isnan(restored), np.isnan(arr))
+    step = (np.nanmax(arr) - np.nanmin(arr)) / 65532.0
+    assert np.nanmax(np.abs(restored - arr)) <= step
+
+
+@pytest.mark.parametrize('value', [np.inf, -np.inf])
+def test_int16_rejects_inf(value):
+    arr = np.zeros((3, 300, 2))
+    arr[1, 280, 0] = value
+    with pytest.raises(ValueError):
+        pack_int16(arr)
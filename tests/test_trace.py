@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sat Oct 17 15:08:33 2026
+
+@author: Ukjae
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pytest
+
+import Atlantis_trace as trace
+
+
+def _worker(n):
+    with trace.span('test.worker', n=n):
+        trace.count('bytes_written', n)
+    return n
+
+
+@pytest.fixture
+def trace_path(tmp_path):
+    previous = trace.trace_file()
+    path = tmp_path / 'trace.jsonl'
+    trace.set_trace_file(str(path))
+    yield str(path)
+    trace.set_trace_file(previous)
+
+
+def _check(path, n_jobs):
+    records = {r['id']: r for r in trace.read_trace(path) if 'span' in r}
+    parent = next(r for r in records.values() if r['span'] == 'test.parent')
+    workers = [r for r in records.values() if r['span'] == 'test.worker']
+    assert len(workers) == n_jobs
+    assert all(r['parent'] == parent['id'] and r.get('remote') for r in workers)
+
+    summary = trace.summarize_trace(path).set_index('span')
+    assert summary.loc['test.worker', 'bytes_written'] == sum(range(1, n_jobs + 1))
+    assert summary.loc['test.parent', 'bytes_written'] == sum(range(1, n_jobs + 1)) + 100
+    top = trace.summarize_trace(path, top_level_only=True)
+    assert top['span'].tolist() == ['test.parent']
+
+
+def test_thread_workers_roll_up(trace_path):
+    with trace.span('test.parent'):
+        trace.count('bytes_written', 100)
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            assert list(pool.map(trace.with_parent(_worker), range(1, 6))) == list(range(1, 6))
+    _check(trace_path, 5)
+
+
+@pytest.mark.parametrize('method', ['fork', 'spawn'])
+def test_process_workers_roll_up(trace_path, method):
+    if method not in multiprocessing.get_all_start_methods():
+        pytest.skip(f"{method} 없음")
+    ctx = multiprocessing.get_context(method)
+    with trace.span('test.parent'):
+        trace.count('bytes_written', 100)
+        with ProcessPoolExecutor(max_workers=2, mp_context=ctx) as pool:
+            assert list(pool.map(trace.with_parent(_worker), range(1, 5))) == list(range(1, 5))
+    _check(trace_path, 4)
+
+
+def test_with_parent_is_noop_without_trace():
+    previous = trace.trace_file()
+    trace.set_trace_file(None)
+    try:
+        assert trace.with_parent(_worker) is _worker
+    finally:
+        trace.set_trace_file(previous)
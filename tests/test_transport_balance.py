@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 10:12:40 2026
+
+@author: Ukjae
+"""
+import numpy as np
+import pytest
+
+from Atlantis_hydro_tools import box_net_flux, make_face_topology, transport_balance
+from test_box_average import write_test_bgm
+
+
+@pytest.fixture
+def topology(tmp_path):
+    return make_face_topology(write_test_bgm(str(tmp_path / 'test.bgm')))
+
+
+def test_box_net_flux_signs(topology):
+    # face0: lr (0, 1) -> +T는 box0 유입, box1 유출
+    trans = np.zeros((2, 1, 1))
+    trans[0] = 5.0
+    net = box_net_flux(trans, topology)
+    np.testing.assert_allclose(net[:, 0, 0], [5.0, -5.0, 0.0])
+
+
+@pytest.mark.parametrize('time_block', [1, 3, 7])
+def test_transport_balance_blocks_match_full_arrays(topology, time_block):
+    rng = np.random.default_rng(1)
+    trans = rng.normal(size=(2, 7, 3))
+    trans[1, :, 2] = np.nan   # 육지 층
+    dt = 43200
+
+    # 한 번에 계산한 box x time x level 배열에서 구한 통계
+    net, total = box_net_flux(trans, topology, gross=True)
+    column_net = net.sum(axis=2)
+    column_gross = total.sum(axis=2) / 2.0
+
+    report = transport_balance(trans, topology, dt=dt, time_block=time_block)
+    np.testing.assert_allclose(report['mean_net'], column_net.mean(axis=1))
+    np.testing.assert_allclose(report['max_abs_net'], np.abs(column_net).max(axis=1))
+    np.testing.assert_allclose(report['mean_gross'], column_gross.mean(axis=1))
+    np.testing.assert_allclose(report['rel_imbalance'], np.abs(column_net).mean(axis=1) / column_gross.mean(axis=1))
+    np.testing.assert_allclose(report['max_layer_net'], np.abs(net).max(axis=(1, 2)))
+    np.testing.assert_allclose(report['net_volume'], column_net.sum(axis=1) * dt)
+    np.testing.assert_array_equal(report['n_faces'], [1, 2, 1])